@@ -1,77 +1,82 @@
-import json
 import logging
-from decimal import Decimal
-from datetime import date, datetime, time
-from typing import Dict, Any, List
-from app.common.openai_clinet import call_openai_api
+from typing import Dict, List, AsyncIterator
+from app.common.openai_clinet import call_openai_api, stream_openai_api
+from app.common.serializer import dumps_str
+from app.database.result_set import ResultSet
 
 logger = logging.getLogger(__name__)
 
+EMPTY_RESULT_ANSWER = "根据您的查询条件，没有找到相关数据。"
 
-def convert_decimals_to_float(obj: Any) -> Any:
-    """递归转换不可JSON序列化的类型"""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    elif isinstance(obj, (date, datetime)):
-        return obj.isoformat()
-    elif isinstance(obj, time):
-        return obj.strftime('%H:%M:%S')
-    elif isinstance(obj, dict):
-        return {key: convert_decimals_to_float(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_decimals_to_float(item) for item in obj]
-    elif isinstance(obj, tuple):
-        return tuple(convert_decimals_to_float(item) for item in obj)
-    else:
-        return obj
+
+def build_answer_messages(
+    user_question: str, query_result: ResultSet
+) -> List[Dict[str, str]]:
+    """构建答案生成的提示消息"""
+    result_summary = f"查询返回了 {len(query_result)} 条记录。"
+
+    sample_size = 3 if len(query_result) <= 5 else 2
+    sample_data = dumps_str(query_result.head(sample_size), indent=True)
+
+    prompt = f"""
+    用户问题: {user_question}
+    
+    查询结果摘要: {result_summary}
+    样本数据: {sample_data}
+    
+    请基于查询结果，用自然语言回答用户的问题。
+    
+    **严格要求：**
+    1. 语言简洁明了
+    2. 突出关键数据
+    3. 如果有多条记录，给出总体概况
+    4. 用中文回答
+    5. 只返回纯文本答案，不要任何格式化标记或解释前缀
+    6. 不要返回JSON格式，只返回自然语言文本
+    """
+
+    return [
+        {
+            "role": "system",
+            "content": "你是一个数据分析助手，根据查询结果回答用户问题。只返回纯文本答案，不要任何格式化或JSON格式。",
+        },
+        {"role": "user", "content": prompt},
+    ]
 
 
 async def generate_natural_answer(
-    user_question: str, query_result: List[Dict[str, Any]]
+    user_question: str, query_result: ResultSet
 ) -> str:
     """基于查询结果生成自然语言答案"""
     try:
         if not query_result:
-            return "根据您的查询条件，没有找到相关数据。"
-
-        result_summary = f"查询返回了 {len(query_result)} 条记录。"
+            return EMPTY_RESULT_ANSWER
 
-        serializable_result = convert_decimals_to_float(query_result)
+        answer = await call_openai_api(build_answer_messages(user_question, query_result))
 
-        if len(serializable_result) <= 5:
-            sample_data = json.dumps(serializable_result[:3], ensure_ascii=False, indent=2)
-        else:
-            sample_data = json.dumps(serializable_result[:2], ensure_ascii=False, indent=2)
+        return answer.strip()
 
-        prompt = f"""
-        用户问题: {user_question}
-        
-        查询结果摘要: {result_summary}
-        样本数据: {sample_data}
-        
-        请基于查询结果，用自然语言回答用户的问题。
-        
-        **严格要求：**
-        1. 语言简洁明了
-        2. 突出关键数据
-        3. 如果有多条记录，给出总体概况
-        4. 用中文回答
-        5. 只返回纯文本答案，不要任何格式化标记或解释前缀
-        6. 不要返回JSON格式，只返回自然语言文本
-        """
+    except Exception as e:
+        logger.error(f"生成自然语言答案失败: {e}")
+        return f"查询成功，共找到 {len(query_result)} 条相关记录。"
 
-        answer = await call_openai_api(
-            [
-                {
-                    "role": "system",
-                    "content": "你是一个数据分析助手，根据查询结果回答用户问题。只返回纯文本答案，不要任何格式化或JSON格式。",
-                },
-                {"role": "user", "content": prompt},
-            ]
-        )
 
-        return answer.strip()
+async def generate_natural_answer_stream(
+    user_question: str, query_result: ResultSet
+) -> AsyncIterator[str]:
+    """流式生成自然语言答案，逐段产出文本"""
+    if not query_result:
+        yield EMPTY_RESULT_ANSWER
+        return
 
+    produced = False
+    try:
+        async for delta in stream_openai_api(
+            build_answer_messages(user_question, query_result)
+        ):
+            produced = True
+            yield delta
     except Exception as e:
-        logger.error(f"生成自然语言答案失败: {e}")
-        return f"查询成功，共找到 {len(query_result)} 条相关记录。" 
\ No newline at end of file
+        logger.error(f"流式生成自然语言答案失败: {e}")
+        if not produced:
+            yield f"查询成功，共找到 {len(query_result)} 条相关记录。"
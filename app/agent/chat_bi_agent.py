@@ -5,7 +5,7 @@ Chat-BI 智能代理协调器
 """
 
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator
 
 from .sql_generator import (
     generate_sql_with_context,
@@ -13,12 +13,13 @@ from .sql_generator import (
     extract_sql_from_response,
     extract_sql_parameters
 )
-from .answer_generator import generate_natural_answer
+from .answer_generator import generate_natural_answer, generate_natural_answer_stream
 from .template_manager import (
     store_new_template,
     generate_template_description
 )
 from .parse_query_to_sql import parse_query_to_sql
+from app.database.result_set import ResultSet
 
 logger = logging.getLogger(__name__)
 
@@ -27,22 +28,31 @@ class ChatBIAgent:
     """Chat-BI智能代理主类"""
     
     @staticmethod
-    async def generate_sql(user_question: str, schema_context: Optional[str] = None) -> str:
+    async def generate_sql(
+        user_question: str,
+        schema_context: Optional[str] = None,
+        user_embedding: Optional[List[float]] = None,
+    ) -> str:
         """生成SQL查询"""
         if schema_context:
             return await parse_query_to_sql(user_question, schema_context)
         else:
-            return await generate_sql_with_context(user_question)
+            return await generate_sql_with_context(user_question, user_embedding)
     
     @staticmethod
-    async def generate_answer(user_question: str, query_result: List[Dict[str, Any]]) -> str:
+    async def generate_answer(user_question: str, query_result: ResultSet) -> str:
         """基于查询结果生成自然语言答案"""
         return await generate_natural_answer(user_question, query_result)
+
+    @staticmethod
+    def stream_answer(user_question: str, query_result: ResultSet) -> AsyncIterator[str]:
+        """流式生成自然语言答案"""
+        return generate_natural_answer_stream(user_question, query_result)
     
     @staticmethod
-    async def save_template(user_question: str, sql_query: str, user_embedding: List[float]):
+    async def save_template(user_question: str, sql_query: str):
         """保存SQL模板"""
-        await store_new_template(user_question, sql_query, user_embedding)
+        await store_new_template(user_question, sql_query)
     
     @staticmethod
     async def create_template_description(user_question: str, sql_query: str) -> str:
@@ -67,7 +77,7 @@ class ChatBIAgent:
 
 async def process_user_query(
     user_question: str, 
-    query_result: Optional[List[Dict[str, Any]]] = None,
+    query_result: Optional[ResultSet] = None,
     user_embedding: Optional[List[float]] = None
 ) -> Dict[str, Any]:
     """处理用户查询的完整流程"""
@@ -82,7 +92,7 @@ async def process_user_query(
             result['answer'] = answer
             
             if user_embedding is not None:
-                await ChatBIAgent.save_template(user_question, sql_query, user_embedding)
+                await ChatBIAgent.save_template(user_question, sql_query)
         
         return {
             'success': True,
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional, Set
+from app.config.app_config import Config
+from app.database.repository import BusinessRepository
+from app.database.table_version import table_version_tracker
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaCache:
+    """进程级Schema快照缓存
+
+    同时缓存结构化Schema与渲染后的提示词文本，
+    在TTL到期、手动刷新或业务表版本变化时重新加载。
+    """
+
+    def __init__(self, ttl: float = Config.SCHEMA_CACHE_TTL):
+        self.ttl = ttl
+        self._schema: Optional[Dict[str, Any]] = None
+        self._description: Optional[str] = None
+        self._loaded_at = 0.0
+        self._stale = False
+        self._lock = asyncio.Lock()
+        table_version_tracker.add_listener(self._on_tables_changed)
+
+    def _on_tables_changed(self, tables: Set[str]):
+        logger.info(f"业务表 {sorted(tables)} 已变更，Schema快照标记为过期")
+        self._stale = True
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._schema is not None
+            and not self._stale
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    async def get_schema(self) -> Dict[str, Any]:
+        """获取结构化Schema快照"""
+        await self._ensure_fresh()
+        return self._schema
+
+    async def get_description(self) -> str:
+        """获取渲染好的Schema提示词文本"""
+        await self._ensure_fresh()
+        return self._description
+
+    async def _ensure_fresh(self):
+        await table_version_tracker.check()
+        if self._is_fresh():
+            return
+
+        async with self._lock:
+            if not self._is_fresh():
+                await self._load()
+
+    async def refresh(self) -> Dict[str, Any]:
+        """强制重新加载Schema快照"""
+        async with self._lock:
+            await self._load()
+        return self._schema
+
+    def invalidate(self):
+        """使当前快照失效，下次访问时重新加载"""
+        self._stale = True
+
+    async def _load(self):
+        start = time.perf_counter()
+        # 先清除过期标记，加载期间发生的变更会重新标记
+        self._stale = False
+        schema = await BusinessRepository.get_database_schema()
+        self._schema = schema
+        self._description = build_schema_description(schema)
+        self._loaded_at = time.monotonic()
+        logger.info(
+            f"Schema快照已加载，{len(schema['tables'])} 个表，"
+            f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self._schema is not None,
+            "stale": self._stale,
+            "age_seconds": (
+                round(time.monotonic() - self._loaded_at, 1) if self._schema else None
+            ),
+            "ttl": self.ttl,
+            "table_count": len(self._schema["tables"]) if self._schema else 0,
+        }
+
+
+def build_schema_description(schema_info: Dict[str, Any]) -> str:
+    """构建数据库Schema文本描述"""
+    description = "数据库表结构:\n\n"
+
+    for table in schema_info.get("tables", []):
+        table_name = table["table_name"]
+        table_comment = table.get("table_comment", "")
+
+        description += f"表名: {table_name}"
+        if table_comment:
+            description += f" ({table_comment})"
+        description += "\n"
+
+        for column in table.get("columns", []):
+            col_name = column["column_name"]
+            col_type = column["data_type"]
+            col_comment = column.get("column_comment", "")
+            is_key = column.get("column_key", "")
+
+            description += f"  - {col_name} ({col_type})"
+            if is_key == "PRI":
+                description += " [主键]"
+            elif is_key == "MUL":
+                description += " [外键]"
+            if col_comment:
+                description += f" // {col_comment}"
+            description += "\n"
+        description += "\n"
+
+    if schema_info.get("relationships"):
+        description += "表关系:\n"
+        for rel in schema_info["relationships"]:
+            description += f"  {rel['table_name']}.{rel['column_name']} -> {rel['referenced_table_name']}.{rel['referenced_column_name']}\n"
+
+    return description
+
+
+# 单例实例
+schema_cache = SchemaCache()
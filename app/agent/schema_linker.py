@@ -0,0 +1,179 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+import numpy as np
+from app.config.app_config import Config
+from app.common.embedding_client import embedding_client, get_text_embedding_async
+from .schema_cache import schema_cache, build_schema_description
+
+logger = logging.getLogger(__name__)
+
+
+def table_document(table: Dict[str, Any]) -> str:
+    """表级描述文本：表名、注释与全部列名"""
+    columns = ", ".join(column["column_name"] for column in table.get("columns", []))
+    return f"{table['table_name']} {table.get('table_comment') or ''}: {columns}"
+
+
+def column_document(table: Dict[str, Any], column: Dict[str, Any]) -> str:
+    return f"{table['table_name']}.{column['column_name']} {column.get('column_comment') or ''}".strip()
+
+
+def foreign_key_closure(tables: Set[str], relationships: List[Dict[str, Any]]) -> Set[str]:
+    """沿外键方向补齐被引用的表（传递闭包），保证 JOIN 路径完整"""
+    references: Dict[str, Set[str]] = {}
+    for rel in relationships:
+        references.setdefault(rel["table_name"], set()).add(rel["referenced_table_name"])
+
+    closure = set(tables)
+    pending = list(tables)
+    while pending:
+        for referenced in references.get(pending.pop(), ()):
+            if referenced not in closure:
+                closure.add(referenced)
+                pending.append(referenced)
+    return closure
+
+
+class SchemaLinker:
+    """按问题相关性裁剪Schema提示词
+
+    表与列的描述文本只嵌入一次（按文本缓存向量，Schema变化时只补充新增部分）；
+    表的相关度取表描述与其各列描述相似度的最大值，选出 top-k 张表，
+    再加入问题中识别到的实体所在表及外键闭包，只渲染这些表。
+    表数量不超过 SCHEMA_PRUNE_MIN_TABLES 时直接使用完整Schema。
+    """
+
+    def __init__(
+        self,
+        top_k: int = Config.SCHEMA_PRUNE_TOP_K,
+        min_tables: int = Config.SCHEMA_PRUNE_MIN_TABLES,
+    ):
+        self.top_k = top_k
+        self.min_tables = min_tables
+        self._schema: Optional[Dict[str, Any]] = None
+        self._doc_vectors: Dict[str, np.ndarray] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._doc_tables: Optional[np.ndarray] = None
+        self._table_names: List[str] = []
+        self._rendered: Dict[frozenset, str] = {}
+        self._lock = asyncio.Lock()
+        self.pruned = 0
+        self.unpruned = 0
+        self.failed = 0
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    async def _ensure_index(self, schema: Dict[str, Any]):
+        if schema is self._schema:
+            return
+        async with self._lock:
+            if schema is not self._schema:
+                await self._build(schema)
+
+    async def _build(self, schema: Dict[str, Any]):
+        texts: List[str] = []
+        owners: List[int] = []
+        for index, table in enumerate(schema["tables"]):
+            texts.append(table_document(table))
+            owners.append(index)
+            for column in table.get("columns", []):
+                texts.append(column_document(table, column))
+                owners.append(index)
+
+        missing = list(dict.fromkeys(text for text in texts if text not in self._doc_vectors))
+        if missing:
+            embeddings = await embedding_client.embed_batch(missing)
+            for text, embedding in zip(missing, embeddings):
+                self._doc_vectors[text] = np.asarray(embedding, dtype=np.float32)
+
+        live = set(texts)
+        self._doc_vectors = {text: vector for text, vector in self._doc_vectors.items() if text in live}
+        self._matrix = self._normalize(np.stack([self._doc_vectors[text] for text in texts]))
+        self._doc_tables = np.asarray(owners)
+        self._table_names = [table["table_name"] for table in schema["tables"]]
+        self._rendered = {}
+        self._schema = schema
+        logger.info(
+            f"Schema链接索引已构建，{len(self._table_names)} 个表，{len(texts)} 条描述，"
+            f"新嵌入 {len(missing)} 条"
+        )
+
+    def _score_tables(self, embedding: List[float]) -> np.ndarray:
+        query = self._normalize(np.asarray(embedding, dtype=np.float32))
+        similarities = self._matrix @ query
+        scores = np.full(len(self._table_names), -1.0, dtype=np.float32)
+        np.maximum.at(scores, self._doc_tables, similarities)
+        return scores
+
+    async def describe(
+        self,
+        user_question: str,
+        user_embedding: Optional[List[float]] = None,
+        entity_tables: Iterable[str] = (),
+    ) -> str:
+        """返回与问题相关的Schema提示词；裁剪失败时退回完整Schema"""
+        schema = await schema_cache.get_schema()
+        if not Config.SCHEMA_PRUNING_ENABLED or len(schema["tables"]) <= self.min_tables:
+            self.unpruned += 1
+            return await schema_cache.get_description()
+
+        try:
+            await self._ensure_index(schema)
+            embedding = user_embedding or await get_text_embedding_async(user_question)
+            scores = self._score_tables(embedding)
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Schema裁剪失败，使用完整Schema: {e}")
+            return await schema_cache.get_description()
+
+        ranked = np.argsort(-scores)[: self.top_k]
+        relevant = {self._table_names[i] for i in ranked}
+        entities = set(entity_tables) & set(self._table_names)
+        selected = foreign_key_closure(relevant | entities, schema.get("relationships", []))
+
+        key = frozenset(selected)
+        description = self._rendered.get(key)
+        if description is None:
+            description = build_schema_description(
+                {
+                    "tables": [t for t in schema["tables"] if t["table_name"] in selected],
+                    "relationships": [
+                        rel
+                        for rel in schema.get("relationships", [])
+                        if rel["table_name"] in selected and rel["referenced_table_name"] in selected
+                    ],
+                }
+            )
+            if len(self._rendered) >= 256:
+                self._rendered.clear()
+            self._rendered[key] = description
+
+        self.pruned += 1
+        full_length = len(await schema_cache.get_description())
+        logger.info(
+            f"Schema裁剪: 保留 {len(selected)}/{len(self._table_names)} 个表，"
+            f"相关表 {[(self._table_names[i], round(float(scores[i]), 3)) for i in ranked]}，"
+            f"实体表 {sorted(entities - relevant)}，外键补充 {sorted(selected - relevant - entities)}，"
+            f"提示词 {len(description)}/{full_length} 字符"
+        )
+        return description
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": Config.SCHEMA_PRUNING_ENABLED,
+            "top_k": self.top_k,
+            "min_tables": self.min_tables,
+            "indexed_tables": len(self._table_names),
+            "indexed_documents": len(self._doc_vectors),
+            "pruned": self.pruned,
+            "unpruned": self.unpruned,
+            "failed": self.failed,
+        }
+
+
+# 单例实例
+schema_linker = SchemaLinker()
@@ -1,16 +1,23 @@
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from app.common.openai_clinet import call_openai_api
-from app.database.repository import BusinessRepository
+from app.common.dimension_index import dimension_index, describe_entities
+from .schema_cache import build_schema_description
+from .schema_linker import schema_linker
 
 logger = logging.getLogger(__name__)
 
 
-async def generate_sql_with_context(user_question: str) -> str:
-    """基于数据库Schema生成SQL查询"""
+async def generate_sql_with_context(
+    user_question: str, user_embedding: Optional[List[float]] = None
+) -> str:
+    """基于数据库Schema生成SQL查询（大Schema只保留与问题相关的表）"""
     try:
-        schema_info = await BusinessRepository.get_database_schema()
-        schema_desc = build_schema_description(schema_info)
+        entities = await tag_question_entities(user_question)
+        schema_desc = await schema_linker.describe(
+            user_question, user_embedding, {entity["table"] for entity in entities}
+        )
+        entity_desc = render_entity_prompt(entities)
 
         prompt = f"""
         你是一个SQL专家。基于以下数据库Schema信息，将用户问题转换为SQL查询。
@@ -18,6 +25,7 @@ async def generate_sql_with_context(user_question: str) -> str:
         数据库Schema:
         {schema_desc}
 
+        {entity_desc}
         用户问题: {user_question}
 
         **严格要求：**
@@ -46,41 +54,25 @@ async def generate_sql_with_context(user_question: str) -> str:
         raise
 
 
-def build_schema_description(schema_info: Dict[str, Any]) -> str:
-    """构建数据库Schema文本描述"""
-    description = "数据库表结构:\n\n"
-
-    for table in schema_info.get("tables", []):
-        table_name = table["table_name"]
-        table_comment = table.get("table_comment", "")
-
-        description += f"表名: {table_name}"
-        if table_comment:
-            description += f" ({table_comment})"
-        description += "\n"
-
-        for column in table.get("columns", []):
-            col_name = column["column_name"]
-            col_type = column["data_type"]
-            col_comment = column.get("column_comment", "")
-            is_key = column.get("column_key", "")
-
-            description += f"  - {col_name} ({col_type})"
-            if is_key == "PRI":
-                description += " [主键]"
-            elif is_key == "MUL":
-                description += " [外键]"
-            if col_comment:
-                description += f" // {col_comment}"
-            description += "\n"
-        description += "\n"
-
-    if schema_info.get("relationships"):
-        description += "表关系:\n"
-        for rel in schema_info["relationships"]:
-            description += f"  {rel['table_name']}.{rel['column_name']} -> {rel['referenced_table_name']}.{rel['referenced_column_name']}\n"
-
-    return description
+async def tag_question_entities(user_question: str) -> List[Dict[str, Any]]:
+    """识别问题中提到的维度取值；识别失败时不影响SQL生成"""
+    try:
+        entities = await dimension_index.tag(user_question)
+    except Exception as e:
+        logger.warning(f"维度取值识别失败: {e}")
+        return []
+    if entities:
+        logger.debug(f"问题中识别到维度取值: {entities}")
+    return entities
+
+
+def render_entity_prompt(entities: List[Dict[str, Any]]) -> str:
+    if not entities:
+        return ""
+    return (
+        "问题中提到的业务取值（WHERE 条件请使用以下数据库原值）:\n"
+        f"{describe_entities(entities)}\n"
+    )
 
 
 def extract_sql_from_response(response: str) -> str:
@@ -0,0 +1,268 @@
+import logging
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import sqlparse
+from sqlparse.tokens import Keyword, Literal, Name, Operator, Punctuation
+from app.config.app_config import Config
+from app.database.repository import SystemRepository
+from app.database.validation import check_sql_query, enforce_row_limit, split_limit
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+# 从左到右匹配完整的字符串字面量，只改写其中含占位符的（如 '{start_date}'、'%{keyword}%'）
+_STRING_LITERAL = re.compile(r"'((?:[^'\\]|\\.|'')*)'|\"((?:[^\"\\]|\\.|\"\")*)\"")
+# LIMIT/OFFSET 只接受整数字面量，其后的占位符在绑定时按整数内联
+_LIMIT_CONTEXT = re.compile(r"\b(?:LIMIT|OFFSET)\s+(?:\d+\s*,\s*)?$", re.IGNORECASE)
+
+INTEGER_TYPES = {"integer", "int", "bigint"}
+NUMBER_TYPES = {"number", "decimal", "float", "double", "numeric"}
+DATE_TYPES = {"date", "datetime", "time"}
+
+
+def coerce_param(value: Any, param_type: str) -> Any:
+    """按模板参数类型转换取值，无法转换时抛出 ValueError"""
+    param_type = (param_type or "string").lower()
+    try:
+        if param_type in INTEGER_TYPES:
+            return int(Decimal(str(value).replace(",", "").strip()))
+        if param_type in NUMBER_TYPES:
+            number = Decimal(str(value).replace(",", "").strip())
+            return int(number) if number == number.to_integral_value() else number
+        if param_type in DATE_TYPES:
+            if isinstance(value, (date, datetime)):
+                return value
+            text = str(value).strip().replace("/", "-")
+            return date.fromisoformat(text) if len(text) <= 10 else datetime.fromisoformat(text)
+    except (InvalidOperation, ValueError, TypeError):
+        raise ValueError(f"参数值 {value!r} 不是有效的 {param_type} 类型")
+    return str(value)
+
+
+_DATE_LITERAL = re.compile(r"^\d{4}-\d{1,2}-\d{1,2}(?:[ T]\d{1,2}:\d{2}(?::\d{2})?)?$")
+# 日期函数包裹的列与整数比较时（如 YEAR(sale_date) = 2024），参数名带上函数后缀
+_DATE_PART_FUNCTIONS = {"YEAR", "MONTH", "QUARTER", "DAY"}
+
+
+def _param_name(column: Optional[str], operator: str, param_type: str, function: Optional[str]) -> str:
+    column = column or "value"
+    if param_type == "integer" and function in _DATE_PART_FUNCTIONS:
+        return f"{column}_{function.lower()}"
+    if param_type == "date":
+        suffix = {">": "_start", ">=": "_start", "BETWEEN": "_start", "<=": "_end", "AND": "_end", "<": "_before"}
+        return column + suffix.get(operator, "")
+    if param_type in ("integer", "decimal"):
+        prefix = {">": "min_", ">=": "min_", "BETWEEN": "min_", "<": "max_", "<=": "max_", "AND": "max_"}
+        return prefix.get(operator, "") + column
+    return column
+
+
+def parameterize_sql(sql_text: str) -> Tuple[str, Dict[str, str]]:
+    """把AI生成SQL中的比较字面量改写为 {param} 占位符，返回 (模板SQL, {参数名: 类型})
+
+    只改写比较运算符、BETWEEN ... AND ... 与 INTERVAL 后的字面量，参数名取自被比较的列
+    （如 sale_date_start、min_total_amount、category_name），以便规则抽取按名称识别语义；
+    校验阶段注入的 LIMIT QUERY_MAX_ROWS 去掉，其余 LIMIT 改写为 {limit}。
+    """
+    body, offset, count = split_limit(sql_text)
+    statement = sqlparse.parse(body)[0]
+    tokens = [token for token in statement.flatten() if not token.is_whitespace]
+    param_types: Dict[str, str] = {}
+
+    column = function = operator = None
+    functions: List[Optional[str]] = []
+    for index, token in enumerate(tokens):
+        following = tokens[index + 1] if index + 1 < len(tokens) else None
+        if following is not None and following.ttype is Punctuation and following.value == "(":
+            continue
+        if token.ttype in Name or token.ttype in Literal.String.Symbol:
+            if token.value.upper() == "INTERVAL":
+                operator = "INTERVAL"
+            else:
+                column, function = token.value.strip("`"), None
+            continue
+        if token.ttype is Punctuation and token.value in ("(", ")"):
+            if token.value == "(":
+                previous = tokens[index - 1] if index else None
+                functions.append(previous.value.upper() if previous is not None and previous.ttype in Name else None)
+                # 函数参数（如 ROUND(x, 2)、DATE_FORMAT(d, '%Y')）中的字面量不参数化
+                operator = None
+            else:
+                function = functions.pop() if functions else None
+            continue
+        if token.ttype in Operator.Comparison:
+            operator = token.value.upper()
+            continue
+        if token.ttype in Keyword:
+            between = token.normalized == "BETWEEN" or (token.normalized == "AND" and operator == "BETWEEN")
+            operator = token.normalized if between else None
+            continue
+        if token.ttype not in Literal or operator is None:
+            continue
+
+        if operator == "INTERVAL":
+            if token.ttype not in Literal.Number.Integer:
+                continue
+            unit = following.normalized.lower() if following is not None else "day"
+            name, param_type = f"interval_{unit}", "integer"
+        elif token.ttype in Literal.Number:
+            # 数值比较一律按 decimal 绑定，避免把价格等小数截断；日期分量按整数
+            date_part = function in _DATE_PART_FUNCTIONS and token.ttype in Literal.Number.Integer
+            param_type = "integer" if date_part else "decimal"
+            name = _param_name(column, operator, param_type, function)
+        elif token.ttype in Literal.String.Single:
+            param_type = "date" if _DATE_LITERAL.match(token.value[1:-1]) else "string"
+            name = _param_name(column, operator, param_type, function)
+        else:
+            continue
+
+        base, index_suffix = name, 2
+        while name in param_types:
+            name, index_suffix = f"{base}_{index_suffix}", index_suffix + 1
+        param_types[name] = param_type
+        if token.ttype in Literal.String.Single:
+            # LIKE '%关键词%' 保留通配符，只替换中间部分
+            inner = token.value[1:-1]
+            head = "%" if inner.startswith("%") else ""
+            tail = "%" if len(inner) > 1 and inner.endswith("%") else ""
+            token.value = f"'{head}{{{name}}}{tail}'"
+        else:
+            token.value = f"{{{name}}}"
+        # BETWEEN 的下界之后还要等待 AND 上界，其余比较只改写一个字面量
+        operator = "BETWEEN" if operator == "BETWEEN" else None
+
+    sql = str(statement).strip()
+    if count is not None and count != Config.QUERY_MAX_ROWS:
+        param_types["limit"] = "integer"
+        sql += f" LIMIT {offset}, {{limit}}" if offset else " LIMIT {limit}"
+    return sql, param_types
+
+
+class CompiledTemplate:
+    """编译后的SQL模板：占位符改写为 :param 绑定参数，SQL文本与取值无关"""
+
+    __slots__ = ("sql", "param_types", "bind_params", "inline_params")
+
+    def __init__(
+        self,
+        sql: str,
+        param_types: Dict[str, str],
+        bind_params: Tuple[str, ...],
+        inline_params: Tuple[str, ...],
+    ):
+        self.sql = sql
+        self.param_types = param_types
+        self.bind_params = bind_params
+        self.inline_params = inline_params
+
+    def bind(self, values: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """返回 (SQL, 绑定参数)；缺少参数或取值类型不符时抛出 ValueError"""
+        missing = [name for name in self.param_types if values.get(name) in (None, "")]
+        if missing:
+            raise ValueError(f"缺少模板参数: {', '.join(missing)}")
+
+        coerced = {
+            name: coerce_param(values[name], param_type)
+            for name, param_type in self.param_types.items()
+        }
+        params = {name: coerced[name] for name in self.bind_params}
+        if not self.inline_params:
+            return self.sql, params
+
+        sql = self.sql
+        for name in self.inline_params:
+            sql = sql.replace(f"{{{name}}}", str(coerce_param(coerced[name], "integer")))
+        return enforce_row_limit(sql, Config.QUERY_MAX_ROWS), params
+
+
+@lru_cache(maxsize=1024)
+def compile_template(
+    sql_text: str, param_types: Tuple[Tuple[str, str], ...] = ()
+) -> CompiledTemplate:
+    """将 {param} 占位符模板编译为绑定参数形式并完成安全校验（结果按模板文本缓存）
+
+    param_types 为 ((参数名, 类型), ...)，未声明类型的占位符按字符串处理。
+    校验不通过时抛出 ValueError。
+    """
+    types = dict(param_types)
+    bind_params: List[str] = []
+    inline_params: List[str] = []
+
+    def bind_literal(match: re.Match) -> str:
+        quote = "'" if match.group(1) is not None else '"'
+        parts = _PLACEHOLDER.split(match.group(1) if quote == "'" else match.group(2))
+        if len(parts) == 1:
+            return match.group(0)
+        bind_params.extend(parts[1::2])
+        if len(parts) == 3 and not parts[0] and not parts[2]:
+            return f":{parts[1]}"
+
+        # 占位符嵌在字面量中（如 LIKE '%{keyword}%'）时拼接为 CONCAT
+        pieces = [
+            f":{part}" if index % 2 else f"{quote}{part}{quote}"
+            for index, part in enumerate(parts)
+            if index % 2 or part
+        ]
+        return f"CONCAT({', '.join(pieces)})"
+
+    def bind_bare(match: re.Match) -> str:
+        name = match.group(1)
+        if _LIMIT_CONTEXT.search(match.string[: match.start()]):
+            inline_params.append(name)
+            return match.group(0)
+        bind_params.append(name)
+        return f":{name}"
+
+    # 先去掉注释，避免绑定改写与 LIMIT 注入落在行注释之后失效
+    sql = sqlparse.format(sql_text, strip_comments=True).strip().rstrip(";").strip()
+    sql = _STRING_LITERAL.sub(bind_literal, sql)
+    sql = _PLACEHOLDER.sub(bind_bare, sql)
+
+    # 内联参数以整数代入后校验，绑定参数在解析时视为占位符
+    probe = sql
+    for name in inline_params:
+        probe = probe.replace(f"{{{name}}}", "1")
+    check_sql_query(probe)
+
+    if not inline_params:
+        sql = enforce_row_limit(sql, Config.QUERY_MAX_ROWS)
+    names = dict.fromkeys(bind_params + inline_params)
+    return CompiledTemplate(
+        sql,
+        {name: types.get(name, "string") for name in names},
+        tuple(dict.fromkeys(bind_params)),
+        tuple(dict.fromkeys(inline_params)),
+    )
+
+
+class TemplateCompiler:
+    """按模板获取编译结果；参数类型取自 sql_template_params，首次使用时读取并按模板ID缓存"""
+
+    def __init__(self):
+        self._param_types: Dict[Any, Dict[str, str]] = {}
+
+    def remember(self, template_id: Any, param_types: Dict[str, str]):
+        """记录入库时已知的参数类型，免去命中时再查询系统库"""
+        self._param_types[template_id] = dict(param_types)
+
+    async def get(self, template: Dict[str, Any]) -> CompiledTemplate:
+        template_id = template.get("template_id")
+        types = self._param_types.get(template_id)
+        if types is None:
+            types = {}
+            if template.get("required_params") and template_id is not None:
+                loaded = await SystemRepository.get_template_param_types([template_id])
+                types = loaded.get(template_id, {})
+                self._param_types[template_id] = types
+        return compile_template(template["sql_text"], tuple(sorted(types.items())))
+
+    def clear(self):
+        self._param_types.clear()
+        compile_template.cache_clear()
+
+
+# 单例实例
+template_compiler = TemplateCompiler()
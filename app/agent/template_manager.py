@@ -1,30 +1,134 @@
-import json
+import asyncio
 import logging
-from typing import List
+import re
+from typing import Any, Dict, List
 from app.common.openai_clinet import call_openai_api
+from app.common.template_index import embed_templates, template_index, template_index_rows
+from app.agent.template_compiler import compile_template, parameterize_sql, template_compiler
+from app.database.repository import SystemRepository
+from app.database.validation import sql_fingerprint
 
 logger = logging.getLogger(__name__)
 
 
-async def store_new_template(
-    user_question: str, sql_query: str, user_embedding: List[float]
-):
-    """将新生成的SQL存储为模板"""
-    try:
-        description = await generate_template_description(user_question, sql_query)
-        required_params = extract_sql_parameters(sql_query)
-
-        template_data = {
-            "description": description,
-            "sql_text": sql_query,
-            "scenario": "auto_generated",
-            "required_params": json.dumps(required_params),
+PARAM_TYPE_PATTERNS = [
+    ("date", re.compile(r"date|time|day|month|year|week|quarter|start|end|period")),
+    ("number", re.compile(r"limit|top|num|count|amount|price|min|max|qty|quantity|days")),
+]
+
+
+def infer_param_type(param_name: str) -> str:
+    """根据参数名推断参数类型"""
+    name = param_name.lower()
+    for param_type, pattern in PARAM_TYPE_PATTERNS:
+        if pattern.search(name):
+            return param_type
+    return "string"
+
+
+class TemplateIngestionPipeline:
+    """SQL模板入库流水线
+
+    按规范化SQL指纹去重：sql_templates.fingerprint 为唯一键，写入使用
+    INSERT ... ON DUPLICATE KEY UPDATE，多个进程并发提交同一模板只会保留一行。
+    已入库的模板不再生成描述，但每次提交都会以 template_id 为主键 upsert 向量，
+    写库成功而写向量失败（包括进程退出）的模板在重新提交时补齐索引，因此整个流程可安全重试。
+    向量由模板描述生成，与重建任务一致。
+    """
+
+    async def ingest(self, items: List[Dict[str, Any]]) -> List[int]:
+        """批量入库模板，items 需包含 question、sql_text，可选 scenario/description/param_types"""
+        if not items:
+            return []
+
+        batch: Dict[str, Dict[str, Any]] = {}
+        for item in items:
+            batch.setdefault(sql_fingerprint(item["sql_text"]), item)
+
+        stored = {
+            template["fingerprint"]: template
+            for template in await SystemRepository.get_templates_by_fingerprints(list(batch))
         }
 
-        logger.info(f"存储新SQL模板: {description}")
+        # 仅为库中没有的模板调用LLM生成描述（并发执行）
+        new_fingerprints = [fp for fp in batch if fp not in stored]
+        descriptions = await asyncio.gather(
+            *(self._describe(batch[fp]) for fp in new_fingerprints)
+        )
 
-    except Exception as e:
-        logger.error(f"存储新模板失败: {e}")
+        pending = []
+        for fingerprint, description in zip(new_fingerprints, descriptions):
+            item = batch[fingerprint]
+            required_params = extract_sql_parameters(item["sql_text"])
+            known_types = item.get("param_types") or {}
+            param_types = {
+                name: known_types.get(name) or infer_param_type(name)
+                for name in required_params
+            }
+            try:
+                # 入库时编译并校验一次，命中时直接绑定参数执行
+                compile_template(item["sql_text"], tuple(sorted(param_types.items())))
+            except ValueError as e:
+                logger.warning(f"模板SQL校验未通过，跳过入库: {e}")
+                continue
+            pending.append(
+                {
+                    "description": description,
+                    "sql_text": item["sql_text"],
+                    "scenario": item.get("scenario", "auto_generated"),
+                    "params": [
+                        {"param_name": name, "param_type": param_type}
+                        for name, param_type in param_types.items()
+                    ],
+                }
+            )
+
+        for template in await SystemRepository.upsert_templates(pending):
+            stored[template["fingerprint"]] = template
+
+        templates = [stored[fp] for fp in batch if fp in stored]
+        for template in templates:
+            template_compiler.remember(
+                template["id"],
+                {param["param_name"]: param["param_type"] for param in template["params"]},
+            )
+        if templates:
+            rows = template_index_rows(templates)
+            await template_index.upsert(rows, await embed_templates(rows))
+
+        logger.info(
+            f"模板入库完成: 新提交 {len(pending)} 个，写入向量 {len(templates)} 个，"
+            f"已存在 {len(batch) - len(new_fingerprints)} 个"
+        )
+        return [template["id"] for template in templates]
+
+    @staticmethod
+    async def _describe(item: Dict[str, Any]) -> str:
+        if item.get("description"):
+            return item["description"]
+        return await generate_template_description(item["question"], item["sql_text"])
+
+
+template_pipeline = TemplateIngestionPipeline()
+
+
+async def store_new_template(user_question: str, sql_query: str):
+    """将新生成的SQL存储为模板（失败时抛出异常，由任务队列重试）
+
+    AI生成的SQL中的比较字面量先改写为占位符、去掉注入的行数上限，
+    相似问题命中时按新问题重新抽取参数，而不是直接复用原字面量。
+    """
+    template_sql, param_types = parameterize_sql(sql_query)
+    await template_pipeline.ingest(
+        [
+            {
+                "question": user_question,
+                "sql_text": template_sql,
+                "param_types": param_types,
+                "scenario": "auto_generated",
+            }
+        ]
+    )
 
 
 async def generate_template_description(user_question: str, sql_query: str) -> str:
@@ -63,8 +167,6 @@ async def generate_template_description(user_question: str, sql_query: str) -> s
 
 def extract_sql_parameters(sql_query: str) -> List[str]:
     """从SQL中提取参数占位符"""
-    import re
-
     pattern = r"\{(\w+)\}"
     matches = re.findall(pattern, sql_query)
 
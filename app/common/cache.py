@@ -0,0 +1,144 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+# 依赖全部表的条目标记，任何表变更都会使其失效
+ALL_TABLES = "*"
+
+
+class TTLCache:
+    """带过期时间的LRU缓存（进程内，非线程安全，供事件循环内使用）
+
+    可选按字节预算淘汰，条目可携带依赖标签（如表名）用于定向失效。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or estimate_size
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at, _, _ = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        tags: Optional[Iterable[str]] = None,
+    ):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        size = self.sizeof(value) if self.max_bytes else 0
+
+        if self.max_bytes and size > self.max_bytes:
+            # 单个条目超出总预算，不缓存
+            self._remove(key)
+            return
+
+        self._remove(key)
+        self._data[key] = (value, expires_at, frozenset(tags or ()), size)
+        self.current_bytes += size
+
+        while len(self._data) > self.max_entries or (
+            self.max_bytes and self.current_bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        self._remove(key)
+        return entry[0]
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """淘汰依赖任一指定标签的条目，返回淘汰数量"""
+        tags = set(tags)
+        stale = [
+            key
+            for key, (_, _, entry_tags, _) in self._data.items()
+            if ALL_TABLES in entry_tags or entry_tags & tags
+        ]
+        for key in stale:
+            self._remove(key)
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def _remove(self, key: Hashable):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[3]
+
+    def clear(self):
+        self._data.clear()
+        self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key: Hashable):
+        return key in self._data
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        stats = {
+            "name": self.name,
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+        if self.max_bytes:
+            stats.update({"bytes": self.current_bytes, "max_bytes": self.max_bytes})
+        return stats
+
+
+def estimate_size(value: Any, sample_size: int = 32) -> int:
+    """估算对象占用字节数，列表按前若干项抽样推算"""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return sys.getsizeof(value)
+        sample = value[:sample_size]
+        per_item = sum(estimate_size(item) for item in sample) / len(sample)
+        return sys.getsizeof(value) + int(per_item * len(value))
+    return sys.getsizeof(value)
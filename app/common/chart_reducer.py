@@ -0,0 +1,260 @@
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+import numpy as np
+import sqlparse
+from sqlparse.sql import Function, Identifier, IdentifierList
+from sqlparse.tokens import DML, Keyword
+from app.config.app_config import Config
+from app.common.column_profiler import split_columns
+from app.database.result_set import Column, ResultSet
+
+logger = logging.getLogger(__name__)
+
+OTHER_LABEL = "其他"
+NULL_LABEL = "(空)"
+
+# 可跨分类相加的聚合函数；COUNT(DISTINCT ...) 不可加
+_ADDITIVE_FUNCTIONS = {"SUM", "COUNT"}
+# 只改变取值形式、不改变可加性的外层函数
+_WRAPPER_FUNCTIONS = {"ROUND", "IFNULL", "COALESCE", "CAST", "ABS"}
+# SQL中无法判断时按列名推断（先排除均值、比率等）
+_NON_ADDITIVE_NAME = re.compile(
+    r"avg|mean|average|median|rate|ratio|pct|percent|price|max|min|均|率|占比|比例|单价|最高|最低"
+)
+_ADDITIVE_NAME = re.compile(
+    r"sum|total|count|cnt|amount|qty|quantity|sales|revenue|金额|总|数量|销量|销售额|次数|笔数|人数|件数|订单数"
+)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets 降采样，返回保留点的行号（x 需有序）"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    bucket_size = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    anchor = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        xs, ys = x[start:end], y[start:end]
+        area = np.abs(
+            (x[anchor] - avg_x) * (ys - y[anchor]) - (x[anchor] - xs) * (avg_y - y[anchor])
+        )
+        anchor = start + int(area.argmax())
+        selected[i + 1] = anchor
+    return selected
+
+
+def _axis_values(column: Column) -> Optional[np.ndarray]:
+    """时间/数值列转为可计算的浮点坐标，无法转换时返回 None"""
+    if column.is_numeric:
+        return column.values.astype(np.float64)
+    try:
+        moments = np.array(column.values, dtype="datetime64[s]")
+    except (TypeError, ValueError):
+        return None
+    axis = moments.astype(np.float64)
+    axis[np.isnat(moments)] = np.nan
+    return axis
+
+
+def _measure_values(column: Column) -> Tuple[np.ndarray, np.ndarray]:
+    """度量列的浮点值与有效掩码"""
+    values = column.values.astype(np.float64)
+    valid = ~column.nulls if column.nulls is not None else np.ones(len(values), dtype=bool)
+    return values, valid
+
+
+def _group_codes(column: Column) -> Tuple[List[Any], np.ndarray]:
+    """维度列编码：返回 (唯一值, 每行所属分组号)"""
+    keys = np.array(
+        [NULL_LABEL if v is None else v for v in column.raw_list()], dtype=object
+    )
+    try:
+        labels, codes = np.unique(keys, return_inverse=True)
+    except TypeError:
+        labels, codes = np.unique(keys.astype(str), return_inverse=True)
+    return labels.tolist(), codes
+
+
+def reduce_line(
+    data: ResultSet, x_field: str, y_field: str, series_field: Optional[str], max_points: int
+) -> ResultSet:
+    """折线图：按 x 排序后对每条序列做 LTTB 降采样"""
+    x = _axis_values(data.column(x_field))
+    y, valid = _measure_values(data.column(y_field))
+    order = np.arange(len(data))
+    if x is None:
+        # 文本型时间（如 "2024-01"）按原有顺序取位置作为坐标
+        x = order.astype(np.float64)
+    else:
+        valid &= ~np.isnan(x)
+        order = np.argsort(x, kind="stable")
+
+    order = order[valid[order]]
+    if series_field is None:
+        groups = [order]
+    else:
+        _, codes = _group_codes(data.column(series_field))
+        groups = [order[codes[order] == code] for code in np.unique(codes[order])]
+
+    budget = max(3, max_points // max(1, len(groups)))
+    kept = [rows[lttb_indices(x[rows], y[rows], budget)] for rows in groups]
+    indices = np.concatenate(kept) if kept else order
+    return data.take(indices)
+
+
+def _is_additive_expression(function: Function) -> bool:
+    name = function.get_name().upper()
+    if name in _WRAPPER_FUNCTIONS:
+        inner = [p for p in function.get_parameters() if isinstance(p, Function)]
+        return len(inner) == 1 and _is_additive_expression(inner[0])
+    if name not in _ADDITIVE_FUNCTIONS:
+        return False
+    return not any(
+        token.ttype is Keyword and token.normalized == "DISTINCT" for token in function.flatten()
+    )
+
+
+@lru_cache(maxsize=512)
+def _select_additivity(sql: str) -> Dict[str, bool]:
+    """最外层 SELECT 中各输出列是否为可加聚合（SUM/COUNT），只收录以函数表达式输出的列"""
+    try:
+        statement = sqlparse.parse(sql)[0]
+    except Exception:
+        return {}
+
+    columns = None
+    seen_select = False
+    for token in statement.tokens:
+        if token.ttype is DML and token.normalized == "SELECT":
+            seen_select = True
+        elif seen_select and isinstance(token, (Identifier, IdentifierList, Function)):
+            columns = token
+            break
+    if columns is None:
+        return {}
+
+    items = columns.get_identifiers() if isinstance(columns, IdentifierList) else [columns]
+    result = {}
+    for item in items:
+        if not isinstance(item, (Identifier, Function)):
+            continue
+        expression = item.tokens[0] if isinstance(item, Identifier) else item
+        # 直接输出的列（含 t.col AS alias）交由列名推断
+        if expression.ttype is not None or isinstance(expression, Identifier):
+            continue
+        name = item.get_name()
+        if name:
+            result[name.lower()] = isinstance(expression, Function) and _is_additive_expression(expression)
+    return result
+
+
+def additive_measures(measures: List[str], sql: Optional[str] = None) -> FrozenSet[str]:
+    """判断哪些度量可跨分类相加：优先看SQL中的聚合函数，其次按列名推断，无法判断时视为不可加"""
+    from_sql = _select_additivity(sql) if sql else {}
+    additive = set()
+    for name in measures:
+        verdict = from_sql.get(name.lower())
+        if verdict is None:
+            lowered = name.lower()
+            verdict = not _NON_ADDITIVE_NAME.search(lowered) and bool(_ADDITIVE_NAME.search(lowered))
+        if verdict:
+            additive.add(name)
+    return frozenset(additive)
+
+
+def reduce_top_n(
+    data: ResultSet,
+    x_field: str,
+    measures: List[str],
+    top_n: int,
+    additive: FrozenSet[str] = frozenset(),
+) -> ResultSet:
+    """柱状图/饼图：保留排名前列的分类
+
+    度量全部可加时按维度汇总，保留前 top_n - 1 个分类，其余合并为「其他」；
+    含均值、比率等不可加度量时不做合并，只保留前 top_n 个分类的原始行。
+    """
+    labels, codes = _group_codes(data.column(x_field))
+    if not all(name in additive for name in measures):
+        values, valid = _measure_values(data.column(measures[0]))
+        scores = np.full(len(labels), -np.inf)
+        np.maximum.at(scores, codes[valid], values[valid])
+        rank = np.full(len(labels), len(labels))
+        rank[np.argsort(-scores, kind="stable")[:top_n]] = np.arange(min(top_n, len(labels)))
+        rows = np.flatnonzero(rank[codes] < len(labels))
+        return data.take(rows[np.argsort(rank[codes[rows]], kind="stable")])
+
+    sums = []
+    for name in measures:
+        values, valid = _measure_values(data.column(name))
+        sums.append(np.bincount(codes, weights=np.where(valid, values, 0.0), minlength=len(labels)))
+
+    order = np.argsort(-sums[0], kind="stable")
+    if len(order) > top_n:
+        head, rest = order[: top_n - 1], order[top_n - 1 :]
+        labels = [labels[i] for i in head] + [OTHER_LABEL]
+        sums = [np.append(total[head], total[rest].sum()) for total in sums]
+    else:
+        labels = [labels[i] for i in order]
+        sums = [total[order] for total in sums]
+
+    return ResultSet([x_field] + measures, [Column(labels)] + [Column(total) for total in sums])
+
+
+def reduce_chart_data(
+    data: ResultSet,
+    viz_type: str,
+    config: Dict[str, Any],
+    profile: List[Dict[str, Any]],
+    max_points: int = Config.CHART_MAX_POINTS,
+    top_n: int = Config.CHART_TOP_N,
+    sql: Optional[str] = None,
+) -> Tuple[ResultSet, Optional[Dict[str, Any]]]:
+    """按图表类型压缩图表数据，返回 (图表数据, 压缩说明)；无需压缩时原样返回
+
+    sql 为产生结果的查询，用于判断度量能否合并为「其他」。
+    """
+    source_rows = len(data)
+    x_field = config.get("xField") or config.get("colorField")
+    y_field = config.get("yField") or config.get("angleField")
+    _, dimensions, measures = split_columns(profile)
+    dimensions = [p["name"] for p in dimensions]
+    measures = [p["name"] for p in measures]
+
+    reduced, method = None, None
+    if viz_type == "line" and source_rows > max_points and y_field in measures:
+        reduced = reduce_line(
+            data, x_field, y_field, config.get("seriesField"), max_points
+        )
+        method = "lttb"
+    elif (
+        viz_type in ("bar", "pie")
+        and x_field in dimensions
+        and measures
+        and source_rows > top_n
+    ):
+        additive = additive_measures(measures, sql)
+        reduced, method = reduce_top_n(data, x_field, measures, top_n, additive), "top_n"
+
+    if reduced is None and source_rows > max_points:
+        # 无法聚合的图表（如表格）仅展示首页，其余行通过分页获取
+        reduced, method = data.head(Config.QUERY_PAGE_SIZE), "page"
+
+    if reduced is None:
+        return data, None
+
+    reduction = {"method": method, "source_rows": source_rows, "points": len(reduced)}
+    logger.info(f"图表数据已压缩: {reduction}")
+    return reduced, reduction
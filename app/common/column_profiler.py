@@ -0,0 +1,134 @@
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional
+import numpy as np
+from app.database.result_set import Column, ResultSet
+
+# 超过该行数时按等间隔抽样统计
+PROFILE_SAMPLE_SIZE = 10000
+
+TIME_NAME_KEYWORDS = (
+    "time", "date", "year", "month", "day", "week", "quarter",
+    "日期", "时间", "年份", "月份", "季度",
+)
+_TIME_TEXT = re.compile(r"^\d{4}([-/.年]\d{1,2}([-/.月]\d{1,2})?)?|^\d{4}-?Q[1-4]$|^\d{4}-W\d{2}$")
+_TEMPORAL_TYPES = {datetime: "datetime", date: "date", time: "time", timedelta: "time"}
+# 主键/外键列名：id、customer_id、customerId、用户编号
+_KEY_NAME = re.compile(r"^(?:id|pk)$|_(?:id|pk)$|[a-z\d]Id$|编号$|ID$")
+
+
+def _sample_index(length: int, sample_size: int) -> Optional[np.ndarray]:
+    if length <= sample_size:
+        return None
+    return np.linspace(0, length - 1, sample_size).astype(np.int64)
+
+
+def _profile_numeric(column: Column, index: Optional[np.ndarray]) -> Dict[str, Any]:
+    values, nulls = column.values, column.nulls
+    if index is not None:
+        values = values[index]
+        nulls = nulls[index] if nulls is not None else None
+    present = values[~nulls] if nulls is not None else values
+
+    profile = {
+        "dtype": "integer" if values.dtype.kind in "iu" else "float",
+        "numeric": True,
+        "null_ratio": float(nulls.mean()) if nulls is not None and len(nulls) else 0.0,
+        "cardinality": int(len(np.unique(present))),
+        "min": None,
+        "max": None,
+    }
+    if len(present):
+        profile["min"] = present.min().item()
+        profile["max"] = present.max().item()
+    return profile
+
+
+def _profile_object(column: Column, index: Optional[np.ndarray]) -> Dict[str, Any]:
+    values = column.values
+    if index is not None:
+        values = [values[i] for i in index]
+    present = [v for v in values if v is not None]
+
+    first = present[0] if present else None
+    dtype = _TEMPORAL_TYPES.get(type(first))
+    if dtype is None:
+        dtype = "empty" if first is None else (
+            "boolean" if isinstance(first, bool) else "text"
+        )
+
+    profile = {
+        "dtype": dtype,
+        "numeric": False,
+        "null_ratio": 1 - len(present) / len(values) if values else 0.0,
+        "cardinality": 0,
+        "min": None,
+        "max": None,
+    }
+    try:
+        distinct = set(present)
+        profile["cardinality"] = len(distinct)
+        if dtype in ("datetime", "date", "time") and distinct:
+            profile["min"], profile["max"] = min(distinct), max(distinct)
+    except TypeError:
+        # 不可哈希或类型混杂的值
+        profile["cardinality"] = len(present)
+    return profile
+
+
+def _looks_like_time(name: str, profile: Dict[str, Any], column: Column) -> bool:
+    if profile["dtype"] in ("datetime", "date", "time"):
+        return True
+    if profile["dtype"] == "float":
+        # 金额等小数度量列不按列名判断
+        return False
+    lowered = name.lower()
+    if any(keyword in lowered for keyword in TIME_NAME_KEYWORDS):
+        return True
+    if profile["dtype"] == "text":
+        # 仅检查前几个非空值（如 DATE_FORMAT 生成的 "2024-01"）
+        head = [v for v in column.values[:20] if v is not None]
+        return bool(head) and all(_TIME_TEXT.match(str(v)) for v in head)
+    return False
+
+
+def _looks_like_key(name: str, profile: Dict[str, Any]) -> bool:
+    if profile["dtype"] == "float":
+        return False
+    return bool(_KEY_NAME.search(name.strip()) or _KEY_NAME.search(name.strip().lower()))
+
+
+def profile_columns(
+    data: ResultSet, sample_size: int = PROFILE_SAMPLE_SIZE
+) -> List[Dict[str, Any]]:
+    """逐列统计类型、基数、空值率、最小/最大值、是否时间列与是否键列
+
+    数值列在 NumPy 中一次性计算，超过 sample_size 行时按等间隔抽样。
+    """
+    index = _sample_index(len(data), sample_size)
+    profiles = []
+    for name, column in zip(data.columns, data.data):
+        if column.is_numeric:
+            profile = _profile_numeric(column, index)
+        else:
+            profile = _profile_object(column, index)
+        profile["is_time"] = _looks_like_time(name, profile, column)
+        profile["is_key"] = not profile["is_time"] and _looks_like_key(name, profile)
+        profile["null_ratio"] = round(profile["null_ratio"], 4)
+        profiles.append({"name": name, **profile})
+    return profiles
+
+
+def split_columns(profile: List[Dict[str, Any]]):
+    """拆分为时间列、维度列与度量列
+
+    主键/外键列（如 customer_id）即使是数值也不作为度量参与排名或求和，
+    而是排在普通维度之后作为候选维度。
+    """
+    time_columns = [p for p in profile if p["is_time"]]
+    keys = [p for p in profile if p.get("is_key") and not p["is_time"]]
+    measures = [p for p in profile if p["numeric"] and not p["is_time"] and p not in keys]
+    dimensions = [
+        p for p in profile if not p["numeric"] and not p["is_time"] and p not in keys
+    ] + keys
+    return time_columns, dimensions, measures
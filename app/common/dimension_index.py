@@ -0,0 +1,382 @@
+import asyncio
+import difflib
+import logging
+import re
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from app.config.app_config import Config
+from app.database.repository import BusinessRepository
+from app.database.table_version import table_version_tracker
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # 未安装 pypinyin 时不建立拼音索引
+    lazy_pinyin = None
+
+logger = logging.getLogger(__name__)
+
+# 维度列 -> (表名, 主键, 增量刷新所用的更新时间列)
+DIMENSION_SOURCES = {
+    "category_name": ("category", "category_id", None),
+    "product_name": ("product", "product_id", "updated_at"),
+    "username": ("customer", "customer_id", None),
+}
+
+_CJK = re.compile(r"[一-鿿]")
+# 模糊匹配时参与相似度计算的候选取值数
+_FUZZY_CANDIDATES = 20
+
+
+class AhoCorasick:
+    """多模式串匹配自动机，一次扫描找出文本中出现的全部关键词"""
+
+    __slots__ = ("_goto", "_fail", "_output")
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[List[str]] = [[]]
+        for keyword in keywords:
+            node = 0
+            for char in keyword:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._output.append([])
+                node = next_node
+            self._output[node].append(keyword)
+
+        # 按层构建失配指针，并把后缀节点的输出并入当前节点
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """返回 (起始位置, 结束位置, 关键词) 列表"""
+        matches = []
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for keyword in self._output[node]:
+                matches.append((index + 1 - len(keyword), index + 1, keyword))
+        return matches
+
+
+def pinyin_keys(value: str) -> List[str]:
+    """中文取值的全拼与首字母键（未安装 pypinyin 时为空）"""
+    if lazy_pinyin is None or not Config.DIMENSION_PINYIN_ENABLED or not _CJK.search(value):
+        return []
+    full = "".join(lazy_pinyin(value)).lower()
+    initials = "".join(lazy_pinyin(value, style=Style.FIRST_LETTER)).lower()
+    keys = [full]
+    if len(initials) >= 3 and initials != full:
+        keys.append(initials)
+    return [key for key in keys if key.isascii()]
+
+
+def _bigrams(text: str) -> Set[str]:
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _bigram_index(values: Iterable[str]) -> Dict[str, List[str]]:
+    index: Dict[str, List[str]] = {}
+    for value in values:
+        for gram in _bigrams(value.lower()):
+            index.setdefault(gram, []).append(value)
+    return index
+
+
+def _at_word_boundary(text: str, start: int, end: int) -> bool:
+    """拉丁字母关键词需独立成词，避免匹配到英文单词内部"""
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    return not (before.isascii() and before.isalnum()) and not (after.isascii() and after.isalnum())
+
+
+class ColumnIndex:
+    """单个维度列的匹配结构：关键词表、Aho-Corasick 自动机与二元组倒排（构建后只读）"""
+
+    __slots__ = ("keywords", "matcher", "bigrams")
+
+    def __init__(self, values: Iterable[str]):
+        keywords: Dict[str, List[Tuple[str, str]]] = {}
+        for value in values:
+            normalized = value.strip().lower()
+            # 单个汉字/字符的取值误匹配过多，不参与原文匹配
+            entries = [(normalized, "exact")] if len(normalized) >= 2 else []
+            entries += [(key, "pinyin") for key in pinyin_keys(value)]
+            for key, via in entries:
+                matches = keywords.setdefault(key, [])
+                if (value, via) not in matches:
+                    matches.append((value, via))
+        self.keywords = keywords
+        self.matcher = AhoCorasick(keywords)
+        self.bigrams = _bigram_index(values)
+
+
+class DimensionIndex:
+    """业务维度取值字典（分类名、商品名、客户用户名）
+
+    在内存中维护取值与各列的 Aho-Corasick 匹配器，用于识别问题中提到的实体；
+    商品按 updated_at 增量刷新，分类与客户在表版本变化时重新加载，
+    并按 DIMENSION_FULL_REFRESH_INTERVAL 周期全量重建以清除已删除的取值。
+    只有取值发生变化的列才重建匹配结构，构建在线程中进行，完成后整体替换引用。
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = Config.DIMENSION_REFRESH_INTERVAL,
+        full_refresh_interval: float = Config.DIMENSION_FULL_REFRESH_INTERVAL,
+    ):
+        self.refresh_interval = refresh_interval
+        self.full_refresh_interval = full_refresh_interval
+        self._values: Dict[str, Dict[Any, str]] = {}
+        self._watermarks: Dict[str, Optional[datetime]] = {}
+        self._indexes: Dict[str, ColumnIndex] = {}
+        self._loaded = False
+        self._dirty: Set[str] = set()
+        self._loaded_at = 0.0
+        self._full_loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresher: Optional[asyncio.Task] = None
+        self.incremental_rows = 0
+        table_version_tracker.add_listener(self._on_tables_changed)
+
+    def _on_tables_changed(self, tables: Set[str]):
+        self._dirty |= {
+            column
+            for column, (table, _, _) in DIMENSION_SOURCES.items()
+            if table in tables
+        }
+
+    def start(self):
+        """启动后台刷新协程（需在事件循环内调用）"""
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._run())
+            logger.info(f"维度字典后台刷新已启动，间隔 {self.refresh_interval:.0f}s")
+            if Config.DIMENSION_PINYIN_ENABLED and lazy_pinyin is None:
+                logger.warning("已开启 DIMENSION_PINYIN_ENABLED 但未安装 pypinyin，拼音匹配不可用")
+
+    async def close(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"维度字典刷新失败: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def _ensure_loaded(self):
+        if self._loaded:
+            return
+        async with self._lock:
+            if not self._loaded:
+                await self._refresh(full=True)
+
+    async def refresh(self, full: bool = False):
+        """刷新取值：到期或首次加载时全量，其余按更新时间增量"""
+        async with self._lock:
+            await self._refresh(full)
+
+    async def _refresh(self, full: bool):
+        full = full or not self._loaded or (
+            time.monotonic() - self._full_loaded_at >= self.full_refresh_interval
+        )
+        start = time.perf_counter()
+        dirty, self._dirty = self._dirty, set()
+        changed = set()
+        for column, (table, key, updated_column) in DIMENSION_SOURCES.items():
+            if full or column not in self._values or (column in dirty and updated_column is None):
+                loaded = await self._load_full(column, table, key, updated_column)
+            elif updated_column is not None:
+                loaded = await self._load_incremental(column, table, key, updated_column)
+            else:
+                continue
+            if loaded or column not in self._indexes:
+                changed.add(column)
+
+        if changed:
+            # 构建在线程中完成，期间请求继续使用旧索引；完成后一次性替换引用
+            built = {}
+            for column in changed:
+                values = set(self._values[column].values())
+                built[column] = await asyncio.to_thread(ColumnIndex, values)
+            self._indexes = {**self._indexes, **built}
+        self._loaded = True
+        self._loaded_at = time.monotonic()
+        if full:
+            self._full_loaded_at = self._loaded_at
+        if changed:
+            logger.info(
+                f"维度字典已{'全量' if full else '增量'}刷新，重建 {sorted(changed)}: "
+                f"{ {c: len(v) for c, v in self._values.items()} }，"
+                f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms"
+            )
+
+    def _select(self, column: str, table: str, key: str, updated_column: Optional[str]) -> str:
+        updated = f", `{updated_column}` AS updated_at" if updated_column else ""
+        return (
+            f"SELECT `{key}` AS id, `{column}` AS value{updated} "
+            f"FROM `{table}` WHERE `{column}` IS NOT NULL"
+        )
+
+    async def _load_full(
+        self, column: str, table: str, key: str, updated_column: Optional[str]
+    ) -> bool:
+        rows = await BusinessRepository.execute_query(self._select(column, table, key, updated_column))
+        values = {row["id"]: str(row["value"]) for row in rows}
+        if updated_column:
+            self._watermarks[column] = max(
+                (row["updated_at"] for row in rows if row["updated_at"] is not None),
+                default=None,
+            )
+        changed = values != self._values.get(column)
+        self._values[column] = values
+        return changed
+
+    async def _load_incremental(self, column: str, table: str, key: str, updated_column: str) -> bool:
+        since = self._watermarks.get(column)
+        sql = self._select(column, table, key, updated_column)
+        params = None
+        if since is not None:
+            # 用 >= 避免漏掉与水位线同一秒内的更新
+            sql += f" AND `{updated_column}` >= :since"
+            params = {"since": since}
+        rows = await BusinessRepository.execute_query(sql, params)
+
+        values = self._values.setdefault(column, {})
+        changed = False
+        for row in rows:
+            value = str(row["value"])
+            if values.get(row["id"]) != value:
+                values[row["id"]] = value
+                changed = True
+            if row["updated_at"] is not None and (since is None or row["updated_at"] > since):
+                since = row["updated_at"]
+        self._watermarks[column] = since
+        self.incremental_rows += len(rows)
+        return changed
+
+    async def tag(self, question: str) -> List[Dict[str, Any]]:
+        """标注问题中出现的维度取值（最左最长、互不重叠）"""
+        await self._ensure_loaded()
+        text = question.lower()
+        candidates = [
+            (start, end, column, index.keywords[keyword])
+            for column, index in self._indexes.items()
+            for start, end, keyword in index.matcher.find_all(text)
+            if not keyword.isascii() or _at_word_boundary(text, start, end)
+        ]
+        candidates.sort(key=lambda item: (item[0], -(item[1] - item[0])))
+
+        entities = []
+        covered = -1
+        span = None
+        for start, end, column, matches in candidates:
+            # 同一片段可同时是多个列的取值（如分类名与商品名相同），都保留
+            if start < covered and (start, end) != span:
+                continue
+            covered, span = end, (start, end)
+            for value, via in matches:
+                entities.append(
+                    {
+                        "table": DIMENSION_SOURCES[column][0],
+                        "column": column,
+                        "value": value,
+                        "text": question[start:end],
+                        "start": start,
+                        "end": end,
+                        "match": via,
+                    }
+                )
+        return entities
+
+    async def match(self, column: str, text: str) -> Optional[str]:
+        """在问题中查找指定列的取值：先取自动机匹配中最长的，再做模糊匹配"""
+        tagged = [entity for entity in await self.tag(text) if entity["column"] == column]
+        if tagged:
+            return max(tagged, key=lambda entity: entity["end"] - entity["start"])["value"]
+
+        return self._fuzzy_match(column, text.lower())
+
+    def _fuzzy_match(self, column: str, text: str) -> Optional[str]:
+        """按字符二元组召回候选取值，再用等长滑动窗口计算相似度（容忍错别字）"""
+        counts: Dict[str, int] = {}
+        index = self._indexes.get(column)
+        if index is None:
+            return None
+        for gram in _bigrams(text):
+            for value in index.bigrams.get(gram, ()):
+                counts[value] = counts.get(value, 0) + 1
+        candidates = sorted(counts, key=counts.get, reverse=True)[:_FUZZY_CANDIDATES]
+
+        best, best_ratio = None, 0.0
+        for value in candidates:
+            target = value.lower()
+            for size in {len(target) - 1, len(target), len(target) + 1}:
+                for start in range(max(len(text) - size + 1, 1)):
+                    ratio = difflib.SequenceMatcher(None, text[start:start + size], target).ratio()
+                    if ratio > best_ratio:
+                        best, best_ratio = value, ratio
+        return best if best_ratio >= Config.PARAM_FUZZY_CUTOFF else None
+
+    def clear(self):
+        """清空取值，下次访问时全量重新加载"""
+        self._values = {}
+        self._watermarks = {}
+        self._indexes = {}
+        self._loaded = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "columns": {column: len(values) for column, values in self._values.items()},
+            "keywords": sum(len(index.keywords) for index in self._indexes.values()),
+            "pinyin": lazy_pinyin is not None and Config.DIMENSION_PINYIN_ENABLED,
+            "incremental_rows": self.incremental_rows,
+            "watermarks": {
+                column: watermark.isoformat() if watermark else None
+                for column, watermark in self._watermarks.items()
+            },
+            "age_seconds": (
+                round(time.monotonic() - self._loaded_at, 1) if self._loaded else None
+            ),
+        }
+
+
+def describe_entities(entities: List[Dict[str, Any]]) -> str:
+    """渲染识别到的维度取值，供SQL生成提示词使用"""
+    lines = []
+    for entity in entities:
+        line = f"  - {entity['table']}.{entity['column']} = '{entity['value']}'"
+        if entity["text"] != entity["value"]:
+            line += f"（问题中写作“{entity['text']}”）"
+        if line not in lines:
+            lines.append(line)
+    return "\n".join(lines)
+
+
+# 单例实例
+dimension_index = DimensionIndex()
@@ -1,9 +1,144 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
 import httpx
 from app.config.app_config import Config
 
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingClient:
+    """异步嵌入向量客户端：共享连接池 + 并发限制 + 微批合并"""
+
+    def __init__(
+        self,
+        batch_url: str = Config.EMBEDDING_BATCH_API_URL,
+        model: str = Config.EMBEDDING_MODEL,
+        max_concurrency: int = Config.EMBEDDING_MAX_CONCURRENCY,
+        max_batch_size: int = Config.EMBEDDING_BATCH_SIZE,
+        batch_window_ms: float = Config.EMBEDDING_BATCH_WINDOW_MS,
+        timeout: float = Config.EMBEDDING_TIMEOUT,
+    ):
+        self.batch_url = batch_url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window_ms / 1000
+        self.timeout = timeout
+
+        # 以下对象需绑定到运行中的事件循环，延迟创建
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._inflight: set = set()
+
+    def _ensure_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                verify=False,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def embed(self, text: str) -> List[float]:
+        """获取单条文本的嵌入向量，并发请求会被合并为一次批量调用"""
+        self._ensure_client()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+
+        return await future
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """批量获取嵌入向量，按最大批大小切分后并发请求"""
+        self._ensure_client()
+        chunks = [
+            texts[i : i + self.max_batch_size]
+            for i in range(0, len(texts), self.max_batch_size)
+        ]
+        results = await asyncio.gather(*(self._request(chunk) for chunk in chunks))
+        return [embedding for chunk in results for embedding in chunk]
+
+    def _flush(self):
+        """取出当前等待队列并发起一次批量请求"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._dispatch(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future]]):
+        # 同一批次内相同文本只请求一次
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            embeddings = await self._request(unique_texts)
+            by_text = dict(zip(unique_texts, embeddings))
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(by_text[text])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _request(self, texts: List[str]) -> List[List[float]]:
+        async with self._semaphore:
+            try:
+                response = await self._client.post(
+                    self.batch_url,
+                    json={"model": self.model, "input": texts},
+                )
+                response.raise_for_status()
+                embeddings = response.json()["embeddings"]
+            except Exception as e:
+                raise Exception(f"获取文本嵌入向量失败: {e}")
+
+        if len(embeddings) != len(texts):
+            raise Exception(
+                f"获取文本嵌入向量失败: 期望 {len(texts)} 条, 实际返回 {len(embeddings)} 条"
+            )
+        logger.debug(f"批量嵌入完成，共 {len(texts)} 条文本")
+        return embeddings
+
+    async def close(self):
+        """关闭连接池"""
+        if self._flush_handle is not None:
+            self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("嵌入服务连接池已关闭")
+
+
+# 单例实例
+embedding_client = EmbeddingClient()
+
+
+async def get_text_embedding_async(text: str) -> List[float]:
+    """异步获取文本嵌入向量"""
+    return await embedding_client.embed(text)
+
 
 def get_text_embedding(text):
-    """使用Ollama模型获取文本嵌入向量"""
+    """使用Ollama模型获取文本嵌入向量（同步版本，仅用于脚本场景）"""
     try:
         with httpx.Client(verify=False) as client:
             response = client.post(
@@ -17,6 +17,12 @@ class MilvusClient:
         return cls._instance
 
     def __init__(self):
+        # 延迟到首次使用时再连接，使用本地向量索引时无需 Milvus
+        if not hasattr(self, "_collections"):
+            self._collections = {}
+
+    def ensure_connected(self):
+        """确保已连接（首次调用时建立连接）"""
         if not self._is_connected:
             self.connect()
 
@@ -37,6 +43,7 @@ class MilvusClient:
         try:
             connections.disconnect(alias="default")
             self._is_connected = False
+            self._collections.clear()
             logger.info("已断开 Milvus 连接")
         except Exception as e:
             logger.error(f"断开 Milvus 连接失败: {e}")
@@ -46,27 +53,39 @@ class MilvusClient:
         return self._is_connected
 
     def get_collection(self, collection_name: str):
-        """获取集合实例"""
-        if not self._is_connected:
-            raise RuntimeError("Milvus 未连接")
+        """获取集合实例（缓存已加载的集合句柄）"""
+        collection = self._collections.get(collection_name)
+        if collection is not None:
+            return collection
+
+        self.ensure_connected()
 
         if not utility.has_collection(collection_name):
             raise ValueError(f"集合 '{collection_name}' 不存在")
 
-        return Collection(collection_name)
+        collection = Collection(collection_name)
+        collection.load()
+        self._collections[collection_name] = collection
+        return collection
+
+    def invalidate_collection(self, collection_name: str = None):
+        """丢弃缓存的集合句柄（集合重建或连接异常后调用）"""
+        if collection_name is None:
+            self._collections.clear()
+        else:
+            self._collections.pop(collection_name, None)
 
     def has_collection(self, collection_name: str):
         """检查集合是否存在"""
-        if not self._is_connected:
-            raise RuntimeError("Milvus 未连接")
+        if collection_name in self._collections:
+            return True
 
+        self.ensure_connected()
         return utility.has_collection(collection_name)
 
     def list_collections(self):
         """列出所有集合"""
-        if not self._is_connected:
-            raise RuntimeError("Milvus 未连接")
-
+        self.ensure_connected()
         return utility.list_collections()
 
 
@@ -1,4 +1,5 @@
 import logging
+from typing import AsyncIterator
 import httpx
 from openai import AsyncOpenAI
 from openai import OpenAIError
@@ -22,3 +23,24 @@ async def call_openai_api(messages: list, **kwargs) -> str:
     except OpenAIError as e:
         logger.error(f"OpenAI API 调用失败: {e}")
         raise
+
+
+async def stream_openai_api(messages: list, **kwargs) -> AsyncIterator[str]:
+    """流式调用，逐段产出回答内容（推理过程不输出）"""
+    try:
+        stream = await client.chat.completions.create(
+            model="deepseek-reasoner",
+            messages=messages,
+            temperature=0,
+            stream=True,
+            **kwargs,
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                yield content
+    except OpenAIError as e:
+        logger.error(f"OpenAI API 流式调用失败: {e}")
+        raise
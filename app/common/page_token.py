@@ -0,0 +1,44 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import zlib
+from typing import Any, Dict, Optional, Tuple
+from app.config.app_config import Config
+from app.common.serializer import dumps
+
+logger = logging.getLogger(__name__)
+
+
+def _sign(payload: bytes) -> str:
+    digest = hmac.new(
+        Config.PAGE_TOKEN_SECRET.encode("utf-8"), payload, hashlib.sha256
+    ).digest()
+    return base64.urlsafe_b64encode(digest[:16]).decode().rstrip("=")
+
+
+def encode_page_token(
+    sql: str, offset: int, params: Optional[Dict[str, Any]] = None
+) -> str:
+    """生成分页令牌（携带SQL、绑定参数与下一页偏移，HMAC签名防篡改）"""
+    body = {"sql": sql, "offset": offset}
+    if params:
+        body["params"] = params
+    payload = base64.urlsafe_b64encode(zlib.compress(dumps(body)))
+    return f"{payload.decode()}.{_sign(payload)}"
+
+
+def decode_page_token(token: str) -> Tuple[str, int, Dict[str, Any]]:
+    """校验并解析分页令牌，返回 (SQL, offset, 绑定参数)"""
+    try:
+        payload, signature = token.rsplit(".", 1)
+    except ValueError:
+        raise ValueError("分页令牌格式错误")
+
+    if not hmac.compare_digest(signature, _sign(payload.encode())):
+        logger.warning("分页令牌签名校验失败")
+        raise ValueError("分页令牌无效")
+
+    data = json.loads(zlib.decompress(base64.urlsafe_b64decode(payload)))
+    return data["sql"], int(data["offset"]), data.get("params") or {}
@@ -0,0 +1,378 @@
+import calendar
+import logging
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from app.common.dimension_index import dimension_index
+
+logger = logging.getLogger(__name__)
+
+DateRange = Tuple[date, date]
+
+_CN_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_CN_UNITS = {"十": 10, "百": 100, "千": 1000}
+_CN_SECTIONS = {"万": 10000, "亿": 100000000}
+_SUFFIX_MULTIPLIERS = {"万": 10000, "w": 10000, "千": 1000, "k": 1000, "百": 100, "亿": 100000000}
+
+_NUM = r"(\d+(?:\.\d+)?|[零〇一二两三四五六七八九十百千万亿]+)"
+_NUMBER = re.compile(_NUM + r"\s*(万|千|百|亿|[kKwW](?![a-zA-Z]))?")
+
+# 中文枚举同义词，键为数据库中的枚举值
+ENUM_SYNONYMS = {
+    "order_status_enum": {
+        "pending": ["待处理", "待付款", "未处理", "待确认"],
+        "processing": ["处理中", "进行中"],
+        "shipped": ["已发货", "发货中", "运输中"],
+        "delivered": ["已送达", "已签收", "已完成", "已收货", "送达"],
+        "cancelled": ["已取消", "取消"],
+    },
+    "account_status_enum": {
+        "active": ["活跃", "正常", "激活"],
+        "inactive": ["不活跃", "非活跃", "未激活", "停用", "冻结"],
+    },
+}
+
+# 参数名 -> 维度字典列
+DIMENSION_PARAMS = {
+    "category": "category_name",
+    "product": "product_name",
+    "customer": "username",
+    "user": "username",
+}
+
+
+def _name_tokens(*words: str) -> re.Pattern:
+    """匹配参数名中完整的下划线分隔词（避免 customer 中的 to、total 中的 to 被误判）"""
+    return re.compile(r"(?:^|_)(?:" + "|".join(words) + r")(?:_|$)")
+
+
+def _normalize_param_name(name: str) -> str:
+    """参数名统一为小写下划线形式（startDate -> start_date）"""
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", name).lower()
+
+
+_END_PARAM = _name_tokens("end", "to", "until", "stop", "finish")
+# 严格小于比较的上界（如 sale_date < '{sale_date_before}'），取区间结束日的次日
+_BEFORE_PARAM = _name_tokens("before")
+# 日期分量（YEAR(sale_date) = {sale_date_year}）与 INTERVAL {interval_day} DAY
+_DATE_PART_PARAM = re.compile(r"(?:^|_)(year|quarter|month|day)$")
+_INTERVAL_PARAM = re.compile(r"^interval_(day|week|month|year)$")
+_TOP_PARAM = _name_tokens("limit", "top", "rank", "n")
+_MIN_PARAM = _name_tokens("min", "minimum", "lower", "low", "from", "start", "least", "floor")
+_MAX_PARAM = _name_tokens("max", "maximum", "upper", "high", "to", "end", "most", "ceil", "ceiling")
+
+
+def parse_chinese_number(text: str) -> Optional[float]:
+    """解析阿拉伯数字或中文数字（如 "十五"、"三百二"、"1.5"），无法解析时返回 None"""
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        pass
+
+    total, section, number = 0, 0, 0
+    for char in text:
+        if char in _CN_DIGITS:
+            number = _CN_DIGITS[char]
+        elif char in _CN_UNITS:
+            section += (number or 1) * _CN_UNITS[char]
+            number = 0
+        elif char in _CN_SECTIONS:
+            total += (section + number) * _CN_SECTIONS[char]
+            section, number = 0, 0
+        else:
+            return None
+    return float(total + section + number)
+
+
+def _to_number(digits: str, suffix: Optional[str]) -> Optional[float]:
+    value = parse_chinese_number(digits)
+    if value is None:
+        return None
+    if suffix:
+        value *= _SUFFIX_MULTIPLIERS[suffix.lower()]
+    return value
+
+
+def _month_range(year: int, month: int) -> DateRange:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _shift_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(index, 12)
+    return date(year, month + 1, min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def _quarter_range(year: int, quarter: int) -> DateRange:
+    start = date(year, quarter * 3 - 2, 1)
+    return start, _month_range(year, quarter * 3)[1]
+
+
+def _relative_dates(today: date) -> List[Tuple[re.Pattern, Any]]:
+    monday = today - timedelta(days=today.weekday())
+    quarter = (today.month - 1) // 3 + 1
+    last_quarter = (today.year, quarter - 1) if quarter > 1 else (today.year - 1, 4)
+    last_month = _shift_months(today.replace(day=1), -1)
+
+    def recent(unit: str):
+        def build(match: re.Match) -> Optional[DateRange]:
+            count = parse_chinese_number(match.group(1))
+            if count is None:
+                return None
+            count = int(count)
+            if unit == "day":
+                return today - timedelta(days=count - 1), today
+            if unit == "week":
+                return today - timedelta(weeks=count), today
+            if unit == "month":
+                return _shift_months(today, -count), today
+            return _shift_months(today, -12 * count), today
+        return build
+
+    def in_year(unit: str):
+        def build(match: re.Match) -> DateRange:
+            year = today.year - {"去年": 1, "前年": 2}.get(match.group(1), 0)
+            if unit == "quarter":
+                return _quarter_range(year, int(parse_chinese_number(match.group(2) or match.group(3))))
+            return _month_range(year, int(parse_chinese_number(match.group(2))))
+        return build
+
+    return [
+        (re.compile(r"(?:最近|近|过去|前)" + _NUM + r"\s*(?:天|日)"), recent("day")),
+        (re.compile(r"(?:最近|近|过去|前)" + _NUM + r"\s*(?:个)?(?:周|星期|礼拜)"), recent("week")),
+        (re.compile(r"(?:最近|近|过去|前)" + _NUM + r"\s*个?月"), recent("month")),
+        (re.compile(r"(?:最近|近|过去|前)" + _NUM + r"\s*年"), recent("year")),
+        (re.compile(r"今天|今日"), lambda m: (today, today)),
+        (re.compile(r"昨天|昨日"), lambda m: (today - timedelta(days=1),) * 2),
+        (re.compile(r"前天"), lambda m: (today - timedelta(days=2),) * 2),
+        (re.compile(r"(?:本|这)(?:个)?(?:周|星期)"), lambda m: (monday, today)),
+        (re.compile(r"上(?:个)?(?:周|星期)"), lambda m: (monday - timedelta(days=7), monday - timedelta(days=1))),
+        (re.compile(r"(?:本|这个|当)月"), lambda m: (today.replace(day=1), today)),
+        (re.compile(r"上(?:个)?月"), lambda m: _month_range(last_month.year, last_month.month)),
+        (re.compile(r"(?:本|这个|当前)季度"), lambda m: (_quarter_range(today.year, quarter)[0], today)),
+        (re.compile(r"上(?:个)?季度"), lambda m: _quarter_range(*last_quarter)),
+        (re.compile(r"(今年|本年|去年|前年)\s*(?:第\s*)?(?:([1-4一二三四])\s*季度|Q([1-4]))", re.IGNORECASE), in_year("quarter")),
+        (re.compile(r"(今年|本年|去年|前年)\s*(\d{1,2}|[一二三四五六七八九十]{1,2})\s*月"), in_year("month")),
+        (re.compile(r"今年|本年|当年"), lambda m: (date(today.year, 1, 1), today)),
+        (re.compile(r"去年"), lambda m: (date(today.year - 1, 1, 1), date(today.year - 1, 12, 31))),
+        (re.compile(r"前年"), lambda m: (date(today.year - 2, 1, 1), date(today.year - 2, 12, 31))),
+    ]
+
+
+def _absolute_dates(today: date) -> List[Tuple[re.Pattern, Any]]:
+    def full_date(match: re.Match) -> DateRange:
+        day = date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        return day, day
+
+    def month_day(match: re.Match) -> DateRange:
+        day = date(today.year, int(match.group(1)), int(match.group(2)))
+        return day, day
+
+    def quarter(match: re.Match) -> DateRange:
+        year = match.group(1) or match.group(3)
+        number = parse_chinese_number(match.group(2) or match.group(4))
+        return _quarter_range(int(year), int(number))
+
+    def this_year_quarter(match: re.Match) -> DateRange:
+        number = parse_chinese_number(match.group(1) or match.group(2))
+        return _quarter_range(today.year, int(number))
+
+    return [
+        (re.compile(r"(\d{4})\s*[年\-/.]\s*(\d{1,2})\s*[月\-/.]\s*(\d{1,2})\s*[日号]?"), full_date),
+        (re.compile(r"(\d{4})\s*年?\s*(?:第\s*)?([1-4一二三四])\s*季度|(\d{4})\s*(?:年|-)?\s*Q([1-4])", re.IGNORECASE), quarter),
+        (re.compile(r"(\d{4})\s*[年\-/.]\s*(\d{1,2})\s*月?(?!\d)"), lambda m: _month_range(int(m.group(1)), int(m.group(2)))),
+        # 未写年份的季度（第3季度、Q3）按今年处理，需在带年份的规则之后
+        (re.compile(r"(?<![\d年])(?:第\s*)?([1-4一二三四])\s*季度|(?<![\w-])Q([1-4])(?!\d)", re.IGNORECASE), this_year_quarter),
+        (re.compile(r"(\d{4})\s*年(?!\s*\d)"), lambda m: (date(int(m.group(1)), 1, 1), date(int(m.group(1)), 12, 31))),
+        (re.compile(r"(\d{1,2})\s*月\s*(\d{1,2})\s*[日号]"), month_day),
+        (re.compile(r"(?<![\d个])(\d{1,2}|[一二三四五六七八九十]{1,2})\s*月(?!份?\s*[以之]?内)"), lambda m: _month_range(today.year, int(parse_chinese_number(m.group(1))))),
+    ]
+
+
+def extract_date_ranges(question: str, today: Optional[date] = None) -> Tuple[List[DateRange], str]:
+    """识别问题中的相对/绝对日期表达，返回 (日期区间列表, 去掉日期表达后的文本)"""
+    today = today or date.today()
+    ranges: List[Tuple[int, DateRange]] = []
+    remaining = question
+
+    for pattern, build in _relative_dates(today) + _absolute_dates(today):
+        def replace(match: re.Match) -> str:
+            try:
+                value = build(match)
+            except (ValueError, TypeError):
+                return match.group(0)
+            if value is None:
+                return match.group(0)
+            ranges.append((match.start(), value))
+            # 用等长占位保留其余表达的位置
+            return "　" * len(match.group(0))
+
+        remaining = pattern.sub(replace, remaining)
+
+    ranges.sort(key=lambda item: item[0])
+    return [value for _, value in ranges], remaining
+
+
+def extract_numbers(text: str) -> List[float]:
+    values = []
+    for match in _NUMBER.finditer(text):
+        value = _to_number(match.group(1), match.group(2))
+        if value is not None:
+            values.append(value)
+    return values
+
+
+_TOP_N = re.compile(r"(?:前|top\s*|排名前|最[高多大低少小]的?)" + _NUM + r"\s*(?:名|个|位|条|款|家|种)?", re.IGNORECASE)
+_LOWER_BOUND = [
+    re.compile(r"(?:大于|超过|高于|多于|不少于|不低于|至少|>=?)\s*" + _NUM + r"\s*(万|千|百|亿|[kKwW](?![a-zA-Z]))?"),
+    re.compile(_NUM + r"\s*(万|千|百|亿|[kKwW](?![a-zA-Z]))?\s*(?:元|件|个|次|单)?\s*(?:以上|及以上|往上)"),
+]
+_UPPER_BOUND = [
+    re.compile(r"(?:小于|少于|低于|不超过|不高于|至多|<=?)\s*" + _NUM + r"\s*(万|千|百|亿|[kKwW](?![a-zA-Z]))?"),
+    re.compile(_NUM + r"\s*(万|千|百|亿|[kKwW](?![a-zA-Z]))?\s*(?:元|件|个|次|单)?\s*(?:以下|及以下|以内)"),
+]
+_RANGE = re.compile(
+    _NUM + r"\s*(万|千|百|亿|[kKwW](?![a-zA-Z]))?\s*(?:元|件|个)?\s*(?:到|至|~|-|—)\s*" + _NUM + r"\s*(万|千|百|亿|[kKwW](?![a-zA-Z]))?"
+)
+
+
+def _first_bound(patterns: List[re.Pattern], text: str) -> Optional[float]:
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            value = _to_number(match.group(1), match.group(2))
+            if value is not None:
+                return value
+    return None
+
+
+def extract_number(text: str, param_name: str) -> Optional[float]:
+    """按参数名语义（前N名 / 下限 / 上限）抽取数值，text 应已去除日期表达"""
+    name = _normalize_param_name(param_name)
+    if _TOP_PARAM.search(name):
+        match = _TOP_N.search(text)
+        return parse_chinese_number(match.group(1)) if match else None
+
+    range_match = _RANGE.search(text)
+    if _MIN_PARAM.search(name):
+        if range_match:
+            return _to_number(range_match.group(1), range_match.group(2))
+        return _first_bound(_LOWER_BOUND, text)
+    if _MAX_PARAM.search(name):
+        if range_match:
+            return _to_number(range_match.group(3), range_match.group(4))
+        return _first_bound(_UPPER_BOUND, text)
+
+    # 其他数值参数：问题中只有一个阿拉伯数字时直接采用
+    numbers = re.findall(r"\d+(?:\.\d+)?", text)
+    if len(numbers) == 1:
+        return extract_numbers(text)[0]
+    return None
+
+
+def date_part(ranges: List[DateRange], param_name: str, today: Optional[date] = None) -> Optional[int]:
+    """从日期区间推导整数参数：INTERVAL 的数量，或年/季度/月/日分量"""
+    if not ranges:
+        return None
+    start = min(r[0] for r in ranges)
+    end = max(r[1] for r in ranges)
+    name = _normalize_param_name(param_name)
+
+    interval = _INTERVAL_PARAM.match(name)
+    if interval:
+        # 只有“最近N天/周/月/年”这类截至今天的区间能还原出数量
+        if end != (today or date.today()):
+            return None
+        unit = interval.group(1)
+        if unit == "day":
+            return (end - start).days + 1
+        if unit == "week":
+            return (end - start).days // 7
+        months = (end.year - start.year) * 12 + end.month - start.month
+        return months if unit == "month" else months // 12
+
+    part = _DATE_PART_PARAM.search(name)
+    if not part:
+        return None
+    day = end if _END_PARAM.search(name) else start
+    unit = part.group(1)
+    if unit == "year":
+        return day.year
+    if unit == "quarter":
+        return (day.month - 1) // 3 + 1
+    return day.month if unit == "month" else day.day
+
+
+def match_enum(text: str, enums: Dict[str, List[str]], param_name: str) -> Optional[str]:
+    """匹配枚举值（原值或中文同义词，最长匹配优先）"""
+    name = param_name.lower()
+    candidates = [
+        enum_name
+        for enum_name in enums
+        if enum_name.split("_status")[0] in name
+    ] or list(enums)
+
+    best = None
+    lowered = text.lower()
+    for enum_name in candidates:
+        synonyms = ENUM_SYNONYMS.get(enum_name, {})
+        for value in enums[enum_name]:
+            for alias in [value] + synonyms.get(value, []):
+                position = lowered.find(alias.lower())
+                if position >= 0 and (best is None or len(alias) > best[0]):
+                    best = (len(alias), value)
+    return best[1] if best else None
+
+
+def _business_enums() -> Dict[str, List[str]]:
+    from sqlalchemy import Enum
+    from app.database.base import get_business_models
+
+    enums = {}
+    for model in get_business_models():
+        for column in model.__table__.columns:
+            if isinstance(column.type, Enum) and column.type.name:
+                enums[column.type.name] = list(column.type.enums)
+    return enums
+
+
+async def extract_parameters(
+    question: str, param_types: Dict[str, str], today: Optional[date] = None
+) -> Dict[str, Any]:
+    """规则抽取模板参数，只返回能确定取值的参数"""
+    ranges, text = extract_date_ranges(question, today)
+    enums = None
+    resolved: Dict[str, Any] = {}
+
+    for name, param_type in param_types.items():
+        lowered = _normalize_param_name(name)
+        param_type = (param_type or "string").lower()
+        value = None
+
+        if param_type in ("date", "datetime"):
+            if ranges:
+                start = min(r[0] for r in ranges)
+                end = max(r[1] for r in ranges)
+                if _BEFORE_PARAM.search(lowered):
+                    value = end + timedelta(days=1)
+                else:
+                    value = end if _END_PARAM.search(lowered) else start
+        elif param_type in ("integer", "int", "bigint", "number", "decimal", "float", "double", "numeric"):
+            value = date_part(ranges, name, today)
+            if value is None:
+                value = extract_number(text, name)
+        elif "status" in lowered:
+            enums = enums if enums is not None else _business_enums()
+            value = match_enum(question, enums, name)
+        else:
+            for keyword, column in DIMENSION_PARAMS.items():
+                if keyword in lowered:
+                    value = await dimension_index.match(column, question)
+                    break
+
+        if value is not None:
+            resolved[name] = value
+    return resolved
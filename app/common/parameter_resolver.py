@@ -1,9 +1,37 @@
 import json
+import logging
 from typing import Dict, Any, List, Tuple
 from app.common.openai_clinet import call_openai_api
+from app.common.param_extractor import extract_parameters
+from app.config.app_config import Config
+
+logger = logging.getLogger(__name__)
 
 
 class ParameterResolver:
+    @staticmethod
+    async def resolve(
+        user_input: str, param_types: Dict[str, str]
+    ) -> Tuple[Dict[str, Any], List[Dict]]:
+        """先按规则抽取参数，仅对规则未能确定的参数调用大模型"""
+        params: Dict[str, Any] = {}
+        if Config.PARAM_RULES_ENABLED:
+            try:
+                params = await extract_parameters(user_input, param_types)
+            except Exception as e:
+                logger.warning(f"规则参数抽取失败，改用大模型解析: {e}")
+
+        unresolved = [name for name in param_types if name not in params]
+        if not unresolved:
+            logger.debug(f"参数全部由规则抽取: {params}")
+            return params, []
+
+        llm_params, ambiguities = await ParameterResolver.resolve_parameters(
+            user_input, unresolved
+        )
+        params.update({name: llm_params.get(name) for name in unresolved if name in llm_params})
+        return params, ambiguities
+
     @staticmethod
     async def resolve_parameters(
         user_input: str, required_params: List[str]
@@ -0,0 +1,97 @@
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, Optional, Set
+from app.config.app_config import Config
+from app.common.cache import TTLCache, ALL_TABLES
+from app.database.table_version import table_version_tracker
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"(?<!\d)\s+|\s+(?!\d)")
+# 数字之间的空白折叠为一个空格保留（"1 5" 与 "15" 不同）
+_DIGIT_SPACE = re.compile(r"(?<=\d)\s+(?=\d)")
+
+
+def normalize_question(question: str) -> str:
+    """问题归一化：全角转半角、统一大小写、去除空白与句读标点
+
+    紧挨在数字前的标点（负号、小数点、日期分隔符）保留，
+    避免 "1.5" 与 "15"、"-5" 与 "5"、"2024-03-01" 与 "20240301" 归一化为同一个键。
+    """
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = _WHITESPACE.sub("", _DIGIT_SPACE.sub(" ", text))
+    return "".join(
+        ch
+        for index, ch in enumerate(text)
+        if not unicodedata.category(ch).startswith("P")
+        or text[index + 1 : index + 2].isdigit()
+    )
+
+
+class QuestionCache:
+    """问题级结果缓存
+
+    两级查找：先按原始问题文本精确匹配，再按归一化文本匹配。
+    缓存完整响应（SQL、数据、图表类型、答案），命中时跳过向量检索与两次LLM调用。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = Config.QUESTION_CACHE_MAX_ENTRIES,
+        ttl: float = Config.QUESTION_CACHE_TTL,
+    ):
+        self.exact = TTLCache("question_exact", max_entries=max_entries, ttl=ttl)
+        self.normalized = TTLCache(
+            "question_normalized", max_entries=max_entries, ttl=ttl
+        )
+        table_version_tracker.add_listener(self._on_tables_changed)
+
+    def _on_tables_changed(self, tables: Set[str]):
+        tables = {t.lower() for t in tables}
+        evicted = self.exact.invalidate_tags(tables)
+        evicted += self.normalized.invalidate_tags(tables)
+        if evicted:
+            logger.info(f"业务表 {sorted(tables)} 已变更，淘汰 {evicted} 条问题结果缓存")
+
+    async def get(self, question: str) -> Optional[Dict[str, Any]]:
+        if not Config.QUESTION_CACHE_ENABLED:
+            return None
+
+        await table_version_tracker.check()
+
+        key = question.strip()
+        response = self.exact.get(key)
+        if response is None:
+            response = self.normalized.get(normalize_question(question))
+            if response is not None:
+                self.exact.set(key, response)
+
+        # 返回浅拷贝，调用方可替换 query_id 等顶层字段
+        return dict(response) if response is not None else None
+
+    def set(
+        self,
+        question: str,
+        response: Dict[str, Any],
+        tables: Optional[Iterable[str]] = None,
+    ):
+        """写入缓存，tables 为结果依赖的业务表（未知时视为依赖全部表）"""
+        if not Config.QUESTION_CACHE_ENABLED:
+            return
+
+        response = dict(response)
+        tags = set(tables or ()) or {ALL_TABLES}
+        self.exact.set(question.strip(), response, tags=tags)
+        self.normalized.set(normalize_question(question), response, tags=tags)
+
+    def clear(self):
+        self.exact.clear()
+        self.normalized.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"exact": self.exact.stats(), "normalized": self.normalized.stats()}
+
+
+# 单例实例
+question_cache = QuestionCache()
@@ -0,0 +1,128 @@
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+import numpy as np
+from app.config.app_config import Config
+from app.common.cache import ALL_TABLES
+from app.database.table_version import table_version_tracker
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """语义答案缓存
+
+    基于进程内向量索引（预分配的归一化向量矩阵，环形覆盖最旧条目）
+    查找近似相同的已答问题，相似度达到阈值且数据未过期时直接返回上一次的完整响应。
+    """
+
+    def __init__(
+        self,
+        threshold: float = Config.SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = Config.SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl: float = Config.SEMANTIC_CACHE_TTL,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+        table_version_tracker.add_listener(self._on_tables_changed)
+
+    def _on_tables_changed(self, tables: Set[str]):
+        tables = {t.lower() for t in tables}
+        evicted = 0
+        for slot, entry in enumerate(self._entries):
+            if entry and (ALL_TABLES in entry["tables"] or entry["tables"] & tables):
+                self._evict(slot)
+                evicted += 1
+        if evicted:
+            logger.info(f"业务表 {sorted(tables)} 已变更，淘汰 {evicted} 条语义缓存")
+
+    def _evict(self, slot: int):
+        self._entries[slot] = None
+        self._expires_at[slot] = -np.inf
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def get(self, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """查找相似度不低于阈值的已答问题，返回响应浅拷贝"""
+        if not Config.SEMANTIC_CACHE_ENABLED:
+            return None
+
+        await table_version_tracker.check()
+
+        query = self._normalize(embedding)
+        if self._vectors is None or query.shape[0] != self._vectors.shape[1]:
+            self.misses += 1
+            return None
+
+        scores = self._vectors @ query
+        scores[self._expires_at <= time.monotonic()] = -np.inf
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        if score < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        entry = self._entries[best]
+        logger.info(f"语义缓存命中: {entry['question']} (相似度 {score:.4f})")
+        response = dict(entry["response"])
+        response["similarity"] = round(score, 4)
+        return response
+
+    def add(
+        self,
+        question: str,
+        embedding: List[float],
+        response: Dict[str, Any],
+        tables: Optional[Iterable[str]] = None,
+    ):
+        if not Config.SEMANTIC_CACHE_ENABLED:
+            return
+
+        vector = self._normalize(embedding)
+        if self._vectors is not None and vector.shape[0] != self._vectors.shape[1]:
+            # 向量维度变化（更换嵌入模型），旧索引作废
+            self.clear()
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.max_entries
+        self._vectors[slot] = vector
+        self._expires_at[slot] = time.monotonic() + self.ttl
+        self._entries[slot] = {
+            "question": question,
+            "response": dict(response),
+            "tables": {t.lower() for t in (tables or ())} or {ALL_TABLES},
+        }
+
+    def clear(self):
+        self._vectors: Optional[np.ndarray] = None
+        self._expires_at = np.full(self.max_entries, -np.inf)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * self.max_entries
+        self._next_slot = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "name": "semantic",
+            "entries": int(np.count_nonzero(self._expires_at > time.monotonic())),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# 单例实例
+semantic_cache = SemanticCache()
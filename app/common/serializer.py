@@ -0,0 +1,35 @@
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any
+import numpy as np
+import orjson
+from app.database.result_set import ResultSet
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """orjson 不支持的类型在此转换（日期时间、NumPy 数组等由 orjson 原生处理）"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, ResultSet):
+        return obj.to_records()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, timedelta):
+        return str(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", errors="replace")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"无法序列化类型: {type(obj).__name__}")
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """序列化为 UTF-8 JSON 字节"""
+    option = (_OPTIONS | orjson.OPT_INDENT_2) if indent else _OPTIONS
+    return orjson.dumps(obj, default=_default, option=option)
+
+
+def dumps_str(obj: Any, indent: bool = False) -> str:
+    return dumps(obj, indent).decode("utf-8")
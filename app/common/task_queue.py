@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.config.app_config import Config
+
+logger = logging.getLogger(__name__)
+
+TaskFactory = Callable[[], Awaitable[Any]]
+
+
+class BackgroundTaskQueue:
+    """受监管的后台任务队列
+
+    有界队列 + 固定数量的工作协程，失败任务按指数退避重试，
+    关闭时等待队列排空（超时后放弃剩余任务）。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int = Config.TASK_QUEUE_MAX_SIZE,
+        workers: int = Config.TASK_QUEUE_WORKERS,
+        max_retries: int = Config.TASK_QUEUE_MAX_RETRIES,
+        retry_delay: float = Config.TASK_QUEUE_RETRY_DELAY,
+    ):
+        self.name = name
+        self.max_size = max_size
+        self.worker_count = workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._closing = False
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retried = 0
+
+    def start(self):
+        """启动工作协程（需在事件循环内调用）"""
+        if self._workers:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._closing = False
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.worker_count)
+        ]
+        logger.info(f"后台任务队列 {self.name} 已启动，工作协程 {self.worker_count} 个")
+
+    def submit(self, task_name: str, factory: TaskFactory) -> bool:
+        """提交任务，factory 每次调用返回一个新的协程（用于重试）；队列满时丢弃"""
+        if self._closing:
+            logger.warning(f"任务队列 {self.name} 正在关闭，丢弃任务 {task_name}")
+            self.dropped += 1
+            return False
+
+        self.start()
+        try:
+            self._queue.put_nowait((task_name, factory))
+        except asyncio.QueueFull:
+            logger.warning(f"任务队列 {self.name} 已满，丢弃任务 {task_name}")
+            self.dropped += 1
+            return False
+
+        self.submitted += 1
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            task_name, factory = await self._queue.get()
+            try:
+                await self._run_with_retry(task_name, factory)
+            finally:
+                self._queue.task_done()
+
+    async def _run_with_retry(self, task_name: str, factory: TaskFactory):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await factory()
+                self.completed += 1
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    self.failed += 1
+                    logger.error(
+                        f"后台任务 {task_name} 在 {attempt + 1} 次尝试后失败: {e}"
+                    )
+                    return
+                self.retried += 1
+                delay = self.retry_delay * (2**attempt)
+                logger.warning(f"后台任务 {task_name} 失败，{delay:.1f}s 后重试: {e}")
+                await asyncio.sleep(delay)
+
+    async def shutdown(self, timeout: float = Config.TASK_QUEUE_DRAIN_TIMEOUT):
+        """停止接收新任务，等待已有任务完成后关闭工作协程"""
+        self._closing = True
+        if not self._workers:
+            return
+
+        pending = self._queue.qsize()
+        logger.info(f"任务队列 {self.name} 关闭中，待处理任务 {pending} 个")
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"任务队列 {self.name} 排空超时，放弃 {self._queue.qsize()} 个任务"
+            )
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info(f"任务队列 {self.name} 已关闭")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "max_size": self.max_size,
+            "workers": len(self._workers),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+        }
+
+
+# 单例实例
+background_tasks = BackgroundTaskQueue("background")
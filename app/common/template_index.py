@@ -0,0 +1,263 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional
+import numpy as np
+from app.config.app_config import Config
+from app.common.milvus_client import milvus_client
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_OUTPUT_FIELDS = [
+    "template_id",
+    "description",
+    "sql_text",
+    "scenario",
+    "required_params",
+]
+
+
+def create_template_collection(name: str, dim: int):
+    """按模板字段创建 Milvus 集合并建立向量索引"""
+    from pymilvus import Collection, CollectionSchema, DataType, FieldSchema
+
+    schema = CollectionSchema(
+        fields=[
+            FieldSchema("template_id", DataType.INT64, is_primary=True),
+            FieldSchema("embedding", DataType.FLOAT_VECTOR, dim=dim),
+            FieldSchema("description", DataType.VARCHAR, max_length=2048),
+            FieldSchema("sql_text", DataType.VARCHAR, max_length=16384),
+            FieldSchema("scenario", DataType.VARCHAR, max_length=255),
+            FieldSchema("required_params", DataType.VARCHAR, max_length=2048),
+        ],
+        description="SQL模板向量",
+    )
+    collection = Collection(name, schema)
+    collection.create_index(
+        "embedding",
+        {"index_type": "IVF_FLAT", "metric_type": "COSINE", "params": {"nlist": 128}},
+    )
+    logger.info(f"已创建 Milvus 集合 {name}，向量维度 {dim}")
+    return collection
+
+
+def template_index_rows(templates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """将系统库中的模板（含 params 列表）转换为索引行"""
+    return [
+        {
+            "template_id": template["id"],
+            "description": template["description"],
+            "sql_text": template["sql_text"],
+            "scenario": template["scenario"],
+            "required_params": [param["param_name"] for param in template["params"]],
+        }
+        for template in templates
+    ]
+
+
+async def embed_templates(rows: List[Dict[str, Any]]) -> List[List[float]]:
+    """向量化模板描述
+
+    入库、重建与本地加载都通过这里生成向量，保证同一模板在各路径下的向量一致。
+    """
+    from app.common.embedding_client import embedding_client
+
+    return await embedding_client.embed_batch([row["description"] or "" for row in rows])
+
+
+def template_entities(
+    templates: List[Dict[str, Any]], embeddings: List[List[float]]
+) -> List[Dict[str, Any]]:
+    """组装写入 Milvus 的行数据"""
+    return [
+        {
+            "template_id": int(template["template_id"]),
+            "embedding": embedding,
+            "description": template["description"] or "",
+            "sql_text": template["sql_text"],
+            "scenario": template["scenario"] or "",
+            "required_params": json.dumps(
+                template.get("required_params") or [], ensure_ascii=False
+            ),
+        }
+        for template, embedding in zip(templates, embeddings)
+    ]
+
+
+def _to_template(fields: Dict[str, Any], score: float) -> Dict[str, Any]:
+    required_params = fields.get("required_params") or "[]"
+    if isinstance(required_params, str):
+        required_params = json.loads(required_params)
+    return {
+        "template_id": fields.get("template_id"),
+        "description": fields.get("description"),
+        "sql_text": fields.get("sql_text"),
+        "scenario": fields.get("scenario"),
+        "required_params": required_params,
+        "similarity": float(score),
+    }
+
+
+class MilvusTemplateIndex:
+    """基于 Milvus 的模板检索，集合句柄缓存复用，检索在线程池中执行不阻塞事件循环"""
+
+    def __init__(self, collection_name: str = Config.TEMPLATE_COLLECTION):
+        self.collection_name = collection_name
+
+    async def search_batch(
+        self, embeddings: List[List[float]], limit: int = 1
+    ) -> List[List[Dict[str, Any]]]:
+        if not embeddings:
+            return []
+        try:
+            return await asyncio.to_thread(self._search_sync, embeddings, limit)
+        except Exception:
+            # 集合可能已被重建，丢弃句柄以便下次重新获取
+            milvus_client.invalidate_collection(self.collection_name)
+            raise
+
+    def _search_sync(
+        self, embeddings: List[List[float]], limit: int
+    ) -> List[List[Dict[str, Any]]]:
+        if not milvus_client.has_collection(self.collection_name):
+            logger.warning(f"Milvus中不存在{self.collection_name}集合")
+            return [[] for _ in embeddings]
+
+        collection = milvus_client.get_collection(self.collection_name)
+        search_results = collection.search(
+            data=embeddings,
+            anns_field="embedding",
+            param={"metric_type": "COSINE", "params": {"nprobe": Config.MILVUS_NPROBE}},
+            limit=limit,
+            output_fields=TEMPLATE_OUTPUT_FIELDS,
+        )
+
+        return [
+            [
+                _to_template(
+                    {field: hit.entity.get(field) for field in TEMPLATE_OUTPUT_FIELDS},
+                    hit.score,
+                )
+                for hit in hits
+            ]
+            for hits in search_results
+        ]
+
+    async def search(
+        self, embedding: List[float], limit: int = 1
+    ) -> List[Dict[str, Any]]:
+        return (await self.search_batch([embedding], limit))[0]
+
+    async def upsert(self, templates: List[Dict[str, Any]], embeddings: List[List[float]]):
+        """按 template_id 写入或覆盖模板向量（重复执行结果一致）"""
+        if templates:
+            await asyncio.to_thread(self._upsert_sync, templates, embeddings)
+
+    def _upsert_sync(self, templates: List[Dict[str, Any]], embeddings: List[List[float]]):
+        if not milvus_client.has_collection(self.collection_name):
+            create_template_collection(self.collection_name, len(embeddings[0]))
+
+        collection = milvus_client.get_collection(self.collection_name)
+        collection.upsert(template_entities(templates, embeddings))
+        logger.info(f"Milvus 模板向量写入 {len(templates)} 条")
+
+
+class LocalTemplateIndex:
+    """进程内模板向量索引（NumPy 暴力余弦检索），适合小规模模板集与无 Milvus 环境"""
+
+    def __init__(self):
+        self._vectors: Optional[np.ndarray] = None
+        self._templates: List[Dict[str, Any]] = []
+        self._positions: Dict[Any, int] = {}
+
+    def __len__(self):
+        return len(self._templates)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+    async def upsert(self, templates: List[Dict[str, Any]], embeddings: List[List[float]]):
+        """按 template_id 写入或覆盖模板向量"""
+        if not templates:
+            return
+
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        if self._vectors is not None and vectors.shape[1] != self._vectors.shape[1]:
+            logger.warning("模板向量维度发生变化，重建本地索引")
+            self.clear()
+
+        new_rows = []
+        for template, vector in zip(templates, vectors):
+            fields = {field: template.get(field) for field in TEMPLATE_OUTPUT_FIELDS}
+            position = self._positions.get(fields["template_id"])
+            if position is None:
+                self._positions[fields["template_id"]] = len(self._templates) + len(new_rows)
+                new_rows.append((fields, vector))
+            else:
+                self._templates[position] = fields
+                self._vectors[position] = vector
+
+        if new_rows:
+            self._templates.extend(fields for fields, _ in new_rows)
+            stacked = np.stack([vector for _, vector in new_rows])
+            self._vectors = (
+                stacked if self._vectors is None else np.vstack([self._vectors, stacked])
+            )
+
+    def clear(self):
+        self._vectors = None
+        self._templates = []
+        self._positions = {}
+
+    async def search_batch(
+        self, embeddings: List[List[float]], limit: int = 1
+    ) -> List[List[Dict[str, Any]]]:
+        if self._vectors is None or not embeddings:
+            return [[] for _ in embeddings]
+
+        queries = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        scores = queries @ self._vectors.T
+        limit = min(limit, len(self._templates))
+        top = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates])]
+            results.append(
+                [_to_template(self._templates[i], scores[row, i]) for i in ordered]
+            )
+        return results
+
+    async def search(
+        self, embedding: List[float], limit: int = 1
+    ) -> List[Dict[str, Any]]:
+        return (await self.search_batch([embedding], limit))[0]
+
+    async def load_from_repository(self):
+        """从系统库读取全部模板并批量向量化描述，构建本地索引"""
+        from app.database.repository import SystemRepository
+
+        templates = await SystemRepository.get_sql_templates()
+        if not templates:
+            logger.info("系统库中没有SQL模板，本地模板索引为空")
+            return
+
+        rows = template_index_rows(templates)
+        embeddings = await embed_templates(rows)
+        self.clear()
+        await self.upsert(rows, embeddings)
+        logger.info(f"本地模板索引加载完成，共 {len(rows)} 个模板")
+
+
+def create_template_index():
+    """按配置创建模板检索后端"""
+    if Config.TEMPLATE_INDEX_BACKEND == "local":
+        return LocalTemplateIndex()
+    return MilvusTemplateIndex()
+
+
+# 单例实例
+template_index = create_template_index()
@@ -0,0 +1,108 @@
+import logging
+import re
+from typing import Any, Dict, List, Optional
+from app.config.app_config import Config
+from app.common.question_cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+# 综合得分权重：向量相似度 / 字面重合度 / 参数可满足度
+VECTOR_WEIGHT = 0.7
+LEXICAL_WEIGHT = 0.2
+PARAM_WEIGHT = 0.1
+
+_DATE_PARAM = re.compile(r"date|time|day|month|year|week|quarter|start|end|period")
+_NUMBER_PARAM = re.compile(r"limit|top|num|count|amount|price|min|max|qty|quantity|days")
+_DATE_EXPR = re.compile(
+    r"\d{4}\s*[年\-/.]|\d{1,2}\s*[月日号]|[今昨前明]天|[本上下这][个]?[月周季]|[今去前明]年|最近|近\s*\d+|季度"
+)
+_NUMBER_EXPR = re.compile(r"\d+|[一二两三四五六七八九十百千万]+")
+
+
+def scenario_threshold(scenario: Optional[str]) -> float:
+    """获取场景对应的相似度阈值"""
+    return Config.TEMPLATE_SCENARIO_THRESHOLDS.get(
+        scenario or "", Config.TEMPLATE_SIMILARITY_THRESHOLD
+    )
+
+
+def template_threshold(candidate: Dict[str, Any]) -> float:
+    """候选模板的相似度阈值
+
+    没有参数的自动生成模板会原样执行入库时的SQL，
+    只有问题几乎相同时才复用（与语义答案缓存同一标准）。
+    """
+    threshold = scenario_threshold(candidate.get("scenario"))
+    if candidate.get("scenario") == "auto_generated" and not candidate.get("required_params"):
+        threshold = max(threshold, Config.TEMPLATE_LITERAL_REUSE_THRESHOLD)
+    return threshold
+
+
+def _bigrams(text: str) -> set:
+    return {text[i : i + 2] for i in range(len(text) - 1)} or {text}
+
+
+def lexical_score(question: str, description: str) -> float:
+    """问题与模板描述的字符二元组 Jaccard 相似度"""
+    if not question or not description:
+        return 0.0
+    a = _bigrams(normalize_question(question))
+    b = _bigrams(normalize_question(description))
+    return len(a & b) / len(a | b)
+
+
+def param_compatibility(question: str, required_params: List[str]) -> float:
+    """问题中能找到的必需参数比例（无法判断的参数按 0.5 计）"""
+    if not required_params:
+        return 1.0
+
+    score = 0.0
+    for param in required_params:
+        name = param.lower()
+        if _DATE_PARAM.search(name):
+            score += 1.0 if _DATE_EXPR.search(question) else 0.0
+        elif _NUMBER_PARAM.search(name):
+            score += 1.0 if _NUMBER_EXPR.search(question) else 0.0
+        else:
+            score += 0.5
+    return score / len(required_params)
+
+
+def rerank_templates(
+    question: str, candidates: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """按场景阈值过滤候选模板，并按综合得分重排"""
+    ranked = []
+    for candidate in candidates:
+        if candidate["similarity"] < template_threshold(candidate):
+            continue
+        lexical = lexical_score(question, candidate.get("description") or "")
+        params = param_compatibility(question, candidate.get("required_params") or [])
+        ranked.append(
+            {
+                **candidate,
+                "lexical_score": round(lexical, 4),
+                "param_score": round(params, 4),
+                "rank_score": VECTOR_WEIGHT * candidate["similarity"]
+                + LEXICAL_WEIGHT * lexical
+                + PARAM_WEIGHT * params,
+            }
+        )
+
+    ranked.sort(key=lambda c: c["rank_score"], reverse=True)
+    return ranked
+
+
+def select_template(
+    question: str, candidates: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """从检索候选中选出最佳模板，无合格候选时返回 None"""
+    ranked = rerank_templates(question, candidates)
+    if not ranked:
+        return None
+
+    if len(ranked) > 1:
+        logger.debug(
+            f"模板重排: {[(c['template_id'], round(c['rank_score'], 4)) for c in ranked]}"
+        )
+    return ranked[0]
@@ -0,0 +1,178 @@
+"""
+SQL模板向量重建任务
+
+从系统库分页读取模板，批量向量化后写入新的 Milvus 集合，
+完成后切换别名实现零停机重建。用法:
+    python -m app.common.template_reindex [--page-size 500]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from app.config.app_config import Config
+from app.common.embedding_client import embedding_client
+from app.common.milvus_client import milvus_client
+from app.common.template_index import (
+    LocalTemplateIndex,
+    create_template_collection,
+    embed_templates,
+    template_entities,
+    template_index,
+    template_index_rows,
+)
+from app.database.repository import SystemRepository
+
+logger = logging.getLogger(__name__)
+
+# 最近一次重建结果，供管理接口查询
+last_reindex: Dict[str, Any] = {}
+# 防止并发重建
+reindex_lock = asyncio.Lock()
+
+
+def _swap_alias(
+    alias: str, collection_name: str, keep_old: bool, drop_existing: bool = False
+) -> List[str]:
+    """将别名指向新集合，返回被替换下来的旧集合
+
+    首次迁移时别名与现有实体集合同名：keep_old 时先将其改名保留，
+    否则只有显式传入 drop_existing 才会删除，两者都未指定时拒绝切换。
+    """
+    from pymilvus import utility
+
+    old_collections = [
+        name
+        for name in utility.list_collections()
+        if name != collection_name and alias in utility.list_aliases(name)
+    ]
+
+    if old_collections:
+        utility.alter_alias(collection_name, alias)
+    else:
+        if alias in utility.list_collections():
+            if keep_old:
+                legacy = f"{alias}_legacy_{int(time.time())}"
+                utility.rename_collection(alias, legacy)
+                logger.warning(f"同名集合 {alias} 已改名为 {legacy} 以创建别名")
+                old_collections = [legacy]
+            elif drop_existing:
+                logger.warning(f"删除同名集合 {alias} 以创建别名")
+                utility.drop_collection(alias)
+            else:
+                raise RuntimeError(
+                    f"已存在与别名同名的集合 {alias}，请指定 keep_old 保留或 drop_existing 删除；"
+                    f"新集合 {collection_name} 已保留，未切换别名"
+                )
+        utility.create_alias(collection_name, alias)
+
+    milvus_client.invalidate_collection(alias)
+
+    if not keep_old:
+        for name in old_collections:
+            utility.drop_collection(name)
+            logger.info(f"已删除旧集合 {name}")
+    return old_collections
+
+
+async def reindex_templates(
+    page_size: int = 500, keep_old: bool = False, drop_existing: bool = False
+) -> Dict[str, Any]:
+    """重建模板向量索引，返回吞吐统计"""
+    async with reindex_lock:
+        try:
+            return await _reindex(page_size, keep_old, drop_existing)
+        except Exception as e:
+            last_reindex.clear()
+            last_reindex.update(
+                {"error": str(e), "finished_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+            )
+            logger.error(f"模板向量索引重建失败: {e}")
+            raise
+
+
+async def _reindex(page_size: int, keep_old: bool, drop_existing: bool) -> Dict[str, Any]:
+    started = time.perf_counter()
+    alias = Config.TEMPLATE_COLLECTION
+    collection_name = f"{alias}_{int(time.time())}"
+    collection = None
+    total = 0
+    embed_seconds = 0.0
+
+    logger.info(f"开始重建模板向量索引，嵌入模型: {Config.EMBEDDING_MODEL}")
+
+    local_rows: List[Dict[str, Any]] = []
+    local_embeddings: List[List[float]] = []
+
+    async for page in SystemRepository.iter_sql_templates(page_size):
+        rows = template_index_rows(page)
+
+        embed_start = time.perf_counter()
+        embeddings = await embed_templates(rows)
+        embed_seconds += time.perf_counter() - embed_start
+
+        if isinstance(template_index, LocalTemplateIndex):
+            local_rows.extend(rows)
+            local_embeddings.extend(embeddings)
+        else:
+            if collection is None:
+                milvus_client.ensure_connected()
+                collection = await asyncio.to_thread(
+                    create_template_collection, collection_name, len(embeddings[0])
+                )
+            await asyncio.to_thread(
+                collection.insert, template_entities(rows, embeddings)
+            )
+
+        total += len(rows)
+        elapsed = time.perf_counter() - started
+        logger.info(f"已处理 {total} 个模板，{total / elapsed:.1f} 个/秒")
+
+    replaced: Optional[List[str]] = None
+    if isinstance(template_index, LocalTemplateIndex):
+        template_index.clear()
+        await template_index.upsert(local_rows, local_embeddings)
+    elif collection is not None:
+        await asyncio.to_thread(collection.flush)
+        await asyncio.to_thread(collection.load)
+        replaced = await asyncio.to_thread(
+            _swap_alias, alias, collection_name, keep_old, drop_existing
+        )
+
+    elapsed = time.perf_counter() - started
+    result = {
+        "templates": total,
+        "collection": collection_name if collection is not None else None,
+        "replaced": replaced,
+        "elapsed_seconds": round(elapsed, 2),
+        "embed_seconds": round(embed_seconds, 2),
+        "templates_per_second": round(total / elapsed, 1) if elapsed else 0.0,
+        "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    last_reindex.clear()
+    last_reindex.update(result)
+    logger.info(f"模板向量索引重建完成: {result}")
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="重建SQL模板向量索引")
+    parser.add_argument("--page-size", type=int, default=500, help="每页读取的模板数")
+    parser.add_argument("--keep-old", action="store_true", help="保留被替换的旧集合")
+    parser.add_argument(
+        "--drop-existing", action="store_true", help="首次迁移时删除与别名同名的旧集合"
+    )
+    args = parser.parse_args()
+
+    from app.database.base import close_connections
+
+    try:
+        await reindex_templates(args.page_size, args.keep_old, args.drop_existing)
+    finally:
+        await embedding_client.close()
+        await close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
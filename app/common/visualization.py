@@ -1,42 +1,75 @@
-from typing import List, Dict, Any
+from typing import Any, Dict, List, Optional
+from app.database.result_set import ResultSet
+from app.common.column_profiler import profile_columns, split_columns
 
+# 饼图最多展示的分类数
+PIE_MAX_SLICES = 10
 
-def suggest_visualization_type(data: List[Dict[str, Any]]) -> str:
+
+def suggest_visualization_type(
+    data: ResultSet, profile: Optional[List[Dict[str, Any]]] = None
+) -> str:
     """
-    基于查询结果推荐合适的可视化类型
+    基于查询结果的列画像推荐合适的可视化类型
     """
     if not data:
         return "table"
 
-    # 获取数据的列
-    columns = list(data[0].keys())
-
-    # 如果只有两列数据，且其中一列是数值类型
-    if len(columns) == 2:
-        numeric_values = [isinstance(data[0][col], (int, float)) for col in columns]
-        if sum(numeric_values) == 1:
-            return "pie"  # 饼图适合显示占比
-
-    # 如果有时间相关的列，可能适合折线图
-    time_related_columns = [
-        col
-        for col in columns
-        if any(
-            keyword in col.lower()
-            for keyword in ["time", "date", "year", "month", "day"]
-        )
-    ]
-    if time_related_columns and len(columns) > 1:
+    profile = profile or profile_columns(data)
+    time_columns, dimensions, measures = split_columns(profile)
+
+    # 有时间列和度量列，适合折线图
+    if time_columns and measures:
         return "line"
 
-    # 如果有多个数值列，使用柱状图
-    numeric_columns = [
-        col
-        for col in columns
-        if all(isinstance(row[col], (int, float)) for row in data)
-    ]
-    if len(numeric_columns) > 0:
+    # 一个分类维度 + 一个非负度量，且分类不多时，饼图适合显示占比
+    if (
+        len(profile) == 2
+        and len(dimensions) == 1
+        and len(measures) == 1
+        and not dimensions[0].get("is_key")
+        and dimensions[0]["cardinality"] <= PIE_MAX_SLICES
+        and (measures[0]["min"] is None or measures[0]["min"] >= 0)
+    ):
+        return "pie"
+
+    # 有数值列，使用柱状图
+    if measures:
         return "bar"
 
     # 默认使用表格
     return "table"
+
+
+def generate_chart_config(
+    viz_type: str, data: ResultSet, profile: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """根据列画像生成图表配置"""
+    if not data:
+        return {}
+
+    profile = profile or profile_columns(data)
+    columns = data.columns
+    time_columns, dimensions, measures = split_columns(profile)
+
+    config = {"title": "数据可视化", "columns": columns}
+
+    if viz_type == "line":
+        x_field = time_columns[0]["name"]
+    elif dimensions:
+        x_field = dimensions[0]["name"]
+    else:
+        x_field = columns[0]
+    y_fields = [p["name"] for p in measures if p["name"] != x_field]
+    y_field = y_fields[0] if y_fields else (columns[1] if len(columns) > 1 else "")
+
+    if viz_type in ("bar", "line"):
+        config.update({"xField": x_field, "yField": y_field})
+        if len(y_fields) > 1:
+            config["yFields"] = y_fields
+        if viz_type == "line" and dimensions:
+            config["seriesField"] = dimensions[0]["name"]
+    elif viz_type == "pie":
+        config.update({"angleField": y_field, "colorField": x_field})
+
+    return config
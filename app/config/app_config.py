@@ -1,3 +1,4 @@
+import json
 import os
 
 
@@ -10,9 +11,35 @@ class Config:
     DB_PASSWORD = os.getenv("DB_PASSWORD", "")
     DB_NAME = os.getenv("DB_NAME", "bi_query_data")
     DB_SYS_NAME = os.getenv("DB_SYS_NAME", "bi_system")
+    # 连接池：业务库（分析查询）与系统库（模板、历史写入）分别配置
+    BUSINESS_DB_POOL_SIZE = int(os.getenv("BUSINESS_DB_POOL_SIZE", 10))
+    BUSINESS_DB_MAX_OVERFLOW = int(os.getenv("BUSINESS_DB_MAX_OVERFLOW", 10))
+    SYSTEM_DB_POOL_SIZE = int(os.getenv("SYSTEM_DB_POOL_SIZE", 5))
+    SYSTEM_DB_MAX_OVERFLOW = int(os.getenv("SYSTEM_DB_MAX_OVERFLOW", 5))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 3600))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() in ("true", "1", "yes")
+    # 业务库只读副本，逗号分隔的 host[:port]，为空时读查询走主库
+    DB_REPLICA_HOSTS = os.getenv("DB_REPLICA_HOSTS", "")
+    DB_REPLICA_POOL_SIZE = int(os.getenv("DB_REPLICA_POOL_SIZE", 10))
+    DB_REPLICA_MAX_OVERFLOW = int(os.getenv("DB_REPLICA_MAX_OVERFLOW", 10))
+    # 副本连接失败后暂停路由的秒数
+    DB_REPLICA_RETRY_INTERVAL = float(os.getenv("DB_REPLICA_RETRY_INTERVAL", 30))
+    # 副本复制延迟上限（秒）：表变更后该时间内读到的结果不写入SQL结果缓存
+    DB_REPLICA_LAG_WINDOW = float(os.getenv("DB_REPLICA_LAG_WINDOW", 5))
 
     MILVUS_HOST = os.getenv("MILVUS_HOST", "localhost")
     MILVUS_PORT = os.getenv("MILVUS_PORT", "19530")
+    MILVUS_NPROBE = int(os.getenv("MILVUS_NPROBE", 10))
+    TEMPLATE_COLLECTION = os.getenv("TEMPLATE_COLLECTION", "sql_templates")
+    # milvus / local（进程内 NumPy 索引）
+    TEMPLATE_INDEX_BACKEND = os.getenv("TEMPLATE_INDEX_BACKEND", "milvus").lower()
+    TEMPLATE_SEARCH_TOP_K = int(os.getenv("TEMPLATE_SEARCH_TOP_K", 5))
+    TEMPLATE_SIMILARITY_THRESHOLD = float(os.getenv("TEMPLATE_SIMILARITY_THRESHOLD", 0.7))
+    # 按场景覆盖阈值，如 {"auto_generated": 0.85}
+    TEMPLATE_SCENARIO_THRESHOLDS = json.loads(os.getenv("TEMPLATE_SCENARIO_THRESHOLDS", "{}"))
+    # 无参数的自动生成模板（SQL含原问题的字面量）只在问题几乎相同时复用
+    TEMPLATE_LITERAL_REUSE_THRESHOLD = float(os.getenv("TEMPLATE_LITERAL_REUSE_THRESHOLD", 0.97))
 
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
@@ -20,6 +47,76 @@ class Config:
         "EMBEDDING_API_URL", "http://172.22.220.64:11434/api/embeddings"
     )
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "bge-m3")
+    EMBEDDING_BATCH_API_URL = os.getenv(
+        "EMBEDDING_BATCH_API_URL", EMBEDDING_API_URL.rsplit("/", 1)[0] + "/embed"
+    )
+    EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", 8))
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+    EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", 5))
+    EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", 30))
+
+    SCHEMA_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL", 600))
+    # Schema裁剪：表数超过 SCHEMA_PRUNE_MIN_TABLES 时只向SQL生成提示词提供最相关的 top-k 张表（含外键闭包）
+    SCHEMA_PRUNING_ENABLED = os.getenv("SCHEMA_PRUNING_ENABLED", "True").lower() in ("true", "1", "yes")
+    SCHEMA_PRUNE_TOP_K = int(os.getenv("SCHEMA_PRUNE_TOP_K", 5))
+    SCHEMA_PRUNE_MIN_TABLES = int(os.getenv("SCHEMA_PRUNE_MIN_TABLES", 8))
+    TABLE_VERSION_CHECK_INTERVAL = float(os.getenv("TABLE_VERSION_CHECK_INTERVAL", 30))
+
+    QUESTION_CACHE_ENABLED = os.getenv("QUESTION_CACHE_ENABLED", "True").lower() in ("true", "1", "yes")
+    QUESTION_CACHE_TTL = float(os.getenv("QUESTION_CACHE_TTL", 300))
+    QUESTION_CACHE_MAX_ENTRIES = int(os.getenv("QUESTION_CACHE_MAX_ENTRIES", 1000))
+
+    SQL_RESULT_CACHE_ENABLED = os.getenv("SQL_RESULT_CACHE_ENABLED", "True").lower() in ("true", "1", "yes")
+    SQL_RESULT_CACHE_TTL = float(os.getenv("SQL_RESULT_CACHE_TTL", 600))
+    SQL_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("SQL_RESULT_CACHE_MAX_ENTRIES", 2000))
+    SQL_RESULT_CACHE_MAX_BYTES = int(os.getenv("SQL_RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+    SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "True").lower() in ("true", "1", "yes")
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.97))
+    SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", 300))
+    SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 2000))
+
+    TASK_QUEUE_MAX_SIZE = int(os.getenv("TASK_QUEUE_MAX_SIZE", 1000))
+    TASK_QUEUE_WORKERS = int(os.getenv("TASK_QUEUE_WORKERS", 4))
+    TASK_QUEUE_MAX_RETRIES = int(os.getenv("TASK_QUEUE_MAX_RETRIES", 3))
+    TASK_QUEUE_RETRY_DELAY = float(os.getenv("TASK_QUEUE_RETRY_DELAY", 0.5))
+    TASK_QUEUE_DRAIN_TIMEOUT = float(os.getenv("TASK_QUEUE_DRAIN_TIMEOUT", 30))
+
+    HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", 50))
+    HISTORY_FLUSH_INTERVAL_MS = float(os.getenv("HISTORY_FLUSH_INTERVAL_MS", 500))
+    HISTORY_MAX_PENDING = int(os.getenv("HISTORY_MAX_PENDING", 5000))
+    # full / truncate / compress / none
+    HISTORY_RESULT_MODE = os.getenv("HISTORY_RESULT_MODE", "truncate")
+    HISTORY_RESULT_MAX_ROWS = int(os.getenv("HISTORY_RESULT_MAX_ROWS", 100))
+
+    # 单条查询最多返回的行数（校验阶段注入 LIMIT）
+    QUERY_MAX_ROWS = int(os.getenv("QUERY_MAX_ROWS", 10000))
+    QUERY_PAGE_SIZE = int(os.getenv("QUERY_PAGE_SIZE", 500))
+    QUERY_STREAM_CHUNK_SIZE = int(os.getenv("QUERY_STREAM_CHUNK_SIZE", 500))
+    # 结果传输格式: records（行对象列表）/ rows（列名+二维数组）/ columnar（列优先）
+    RESULT_WIRE_FORMAT = os.getenv("RESULT_WIRE_FORMAT", "records")
+    # 查询准入：EXPLAIN 预估行数上限、判定为大表全表扫描的行数阈值
+    QUERY_COST_GUARD_ENABLED = os.getenv("QUERY_COST_GUARD_ENABLED", "True").lower() in ("true", "1", "yes")
+    QUERY_MAX_ESTIMATED_ROWS = int(os.getenv("QUERY_MAX_ESTIMATED_ROWS", 5000000))
+    QUERY_FULL_SCAN_ROWS = int(os.getenv("QUERY_FULL_SCAN_ROWS", 100000))
+    # 服务端 MAX_EXECUTION_TIME 提示（毫秒）与客户端语句超时（秒）
+    QUERY_MAX_EXECUTION_MS = int(os.getenv("QUERY_MAX_EXECUTION_MS", 30000))
+    QUERY_STATEMENT_TIMEOUT = float(os.getenv("QUERY_STATEMENT_TIMEOUT", 35))
+    # SQL安全校验结论缓存条数（按SQL哈希）
+    SQL_VALIDATION_CACHE_SIZE = int(os.getenv("SQL_VALIDATION_CACHE_SIZE", 4096))
+    # 图表数据点上限（折线图 LTTB 降采样）与柱状图/饼图保留的分类数
+    CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", 1000))
+    CHART_TOP_N = int(os.getenv("CHART_TOP_N", 20))
+    # 模板参数规则抽取（日期、数值、枚举、维度取值），未识别的参数再交给大模型
+    PARAM_RULES_ENABLED = os.getenv("PARAM_RULES_ENABLED", "True").lower() in ("true", "1", "yes")
+    # 维度取值模糊匹配的相似度下限
+    PARAM_FUZZY_CUTOFF = float(os.getenv("PARAM_FUZZY_CUTOFF", 0.75))
+    # 维度取值字典：增量刷新间隔、全量重建间隔（秒）、拼音索引（需安装 pypinyin）
+    DIMENSION_REFRESH_INTERVAL = float(os.getenv("DIMENSION_REFRESH_INTERVAL", 60))
+    DIMENSION_FULL_REFRESH_INTERVAL = float(os.getenv("DIMENSION_FULL_REFRESH_INTERVAL", 3600))
+    DIMENSION_PINYIN_ENABLED = os.getenv("DIMENSION_PINYIN_ENABLED", "True").lower() in ("true", "1", "yes")
+    # 分页令牌签名密钥，多实例部署时需配置为相同值
+    PAGE_TOKEN_SECRET = os.getenv("PAGE_TOKEN_SECRET") or os.urandom(32).hex()
 
     required_vars = ["DB_USER", "DB_PASSWORD", "DB_NAME", "OPENAI_API_KEY"]
     for var in required_vars:
@@ -28,7 +125,7 @@ class Config:
 
     @classmethod
     def as_dict(cls):
-        sensitive_keys = {"DB_PASSWORD", "OPENAI_API_KEY"}
+        sensitive_keys = {"DB_PASSWORD", "OPENAI_API_KEY", "PAGE_TOKEN_SECRET"}
         return {
             k: v
             for k, v in cls.__dict__.items()
@@ -1,4 +1,9 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncConnection, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config.app_config import Config
 # 使用自定义日志配置
@@ -8,45 +13,235 @@ from app.config.app_log import logger
 Base = declarative_base()
 
 # 数据库引擎配置函数
-def create_database_engine(database_name: str):
+def create_database_engine(
+    database_name: str,
+    pool_size: int,
+    max_overflow: int,
+    host: str = Config.DB_HOST,
+    port: int = Config.DB_PORT,
+):
     """创建数据库引擎的统一配置"""
     return create_async_engine(
-        f"mysql+aiomysql://{Config.DB_USER}:{Config.DB_PASSWORD}@{Config.DB_HOST}:{Config.DB_PORT}/{database_name}",
+        f"mysql+aiomysql://{Config.DB_USER}:{Config.DB_PASSWORD}@{host}:{port}/{database_name}",
         echo=Config.DEBUG,
-        pool_size=5,
-        max_overflow=10,
-        pool_recycle=3600,  # 1小时回收连接
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=Config.DB_POOL_TIMEOUT,
+        pool_recycle=Config.DB_POOL_RECYCLE,
+        pool_pre_ping=Config.DB_POOL_PRE_PING,
     )
 
-# 业务数据库引擎
-business_engine = create_database_engine(Config.DB_NAME)
 
-# 系统数据库引擎
-system_engine = create_database_engine(Config.DB_SYS_NAME)
+class EnginePool:
+    """数据库引擎及其连接池统计（占用、溢出、获取连接的等待时间）"""
 
-# 创建会话工厂
-BusinessSessionLocal = sessionmaker(
-    business_engine, class_=AsyncSession, expire_on_commit=False
+    def __init__(self, name: str, engine, pool_size: int, max_overflow: int):
+        self.name = name
+        self.engine = engine
+        self.capacity = pool_size + max_overflow
+        self.session_factory = sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        self.acquired = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        # 连接失败后暂停路由到该引擎的截止时间（仅用于只读副本）
+        self.unavailable_until = 0.0
+
+    @property
+    def load(self) -> float:
+        """已借出连接数占连接池容量的比例"""
+        return self.engine.pool.checkedout() / max(1, self.capacity)
+
+    async def _checkout(self, opener):
+        """从连接池取出连接，记录等待时间与失败次数"""
+        start = time.perf_counter()
+        try:
+            handle = await opener()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+
+        wait = time.perf_counter() - start
+        self.acquired += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        return handle
+
+    async def acquire(self) -> AsyncSession:
+        """创建ORM会话并立即获取连接"""
+        session = self.session_factory()
+        try:
+            await self._checkout(session.connection)
+        except Exception:
+            await session.close()
+            raise
+        return session
+
+    async def connect(self) -> AsyncConnection:
+        """获取原生连接（无ORM会话开销），用于只读文本SQL"""
+        return await self._checkout(self.engine.connect)
+
+    async def session(self):
+        session = await self.acquire()
+        try:
+            yield session
+        finally:
+            await session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        return {
+            "name": self.name,
+            "capacity": self.capacity,
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "wait_avg_ms": round(self.wait_total / self.acquired * 1000, 3)
+            if self.acquired
+            else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+            "available": self.unavailable_until <= time.monotonic(),
+        }
+
+
+def _parse_hosts(hosts: str) -> List[Tuple[str, int]]:
+    """解析 "host[:port],host[:port]" 形式的副本地址"""
+    parsed = []
+    for item in filter(None, (h.strip() for h in hosts.split(","))):
+        host, _, port = item.partition(":")
+        parsed.append((host, int(port) if port else Config.DB_PORT))
+    return parsed
+
+
+# 业务数据库（主库）
+business_pool = EnginePool(
+    "business",
+    create_database_engine(
+        Config.DB_NAME, Config.BUSINESS_DB_POOL_SIZE, Config.BUSINESS_DB_MAX_OVERFLOW
+    ),
+    Config.BUSINESS_DB_POOL_SIZE,
+    Config.BUSINESS_DB_MAX_OVERFLOW,
 )
 
-SystemSessionLocal = sessionmaker(
-    system_engine, class_=AsyncSession, expire_on_commit=False
+# 系统数据库（模板、查询历史）
+system_pool = EnginePool(
+    "system",
+    create_database_engine(
+        Config.DB_SYS_NAME, Config.SYSTEM_DB_POOL_SIZE, Config.SYSTEM_DB_MAX_OVERFLOW
+    ),
+    Config.SYSTEM_DB_POOL_SIZE,
+    Config.SYSTEM_DB_MAX_OVERFLOW,
 )
 
+# 业务数据库只读副本
+replica_pools = [
+    EnginePool(
+        f"replica:{host}:{port}",
+        create_database_engine(
+            Config.DB_NAME,
+            Config.DB_REPLICA_POOL_SIZE,
+            Config.DB_REPLICA_MAX_OVERFLOW,
+            host,
+            port,
+        ),
+        Config.DB_REPLICA_POOL_SIZE,
+        Config.DB_REPLICA_MAX_OVERFLOW,
+    )
+    for host, port in _parse_hosts(Config.DB_REPLICA_HOSTS)
+]
+
+business_engine = business_pool.engine
+system_engine = system_pool.engine
+
+# 创建会话工厂
+BusinessSessionLocal = business_pool.session_factory
+SystemSessionLocal = system_pool.session_factory
+
+_replica_cursor = 0
+
+
+def least_loaded_replica() -> Optional[EnginePool]:
+    """选择连接池占用比例最低的可用副本，负载相同时轮询"""
+    global _replica_cursor
+    if not replica_pools:
+        return None
+    _replica_cursor = (_replica_cursor + 1) % len(replica_pools)
+    rotated = replica_pools[_replica_cursor:] + replica_pools[:_replica_cursor]
+    now = time.monotonic()
+    available = [pool for pool in rotated if pool.unavailable_until <= now]
+    return min(available, key=lambda pool: pool.load) if available else None
+
 
 # 依赖注入函数
 async def get_business_session():
     """获取业务数据库会话"""
-    async with BusinessSessionLocal() as session:
+    async for session in business_pool.session():
         yield session
 
 
+async def _checkout_read(checkout):
+    """优先从负载最低的副本取连接，副本不可用时回退主库"""
+    replica = least_loaded_replica()
+    if replica is not None:
+        try:
+            return await checkout(replica)
+        except (DBAPIError, PoolTimeoutError, OSError) as e:
+            replica.unavailable_until = time.monotonic() + Config.DB_REPLICA_RETRY_INTERVAL
+            logger.warning(f"只读副本 {replica.name} 不可用，回退主库: {e}")
+    return await checkout(business_pool)
+
+
+@asynccontextmanager
+async def business_connection():
+    """业务主库原生连接"""
+    conn = await business_pool.connect()
+    try:
+        yield conn
+    finally:
+        await conn.close()
+
+
+@asynccontextmanager
+async def business_read_connection():
+    """业务库只读原生连接：优先路由到负载最低的副本，副本不可用时回退主库"""
+    conn = await _checkout_read(EnginePool.connect)
+    try:
+        yield conn
+    finally:
+        await conn.close()
+
+
+@asynccontextmanager
+async def system_connection():
+    """系统库原生连接"""
+    conn = await system_pool.connect()
+    try:
+        yield conn
+    finally:
+        await conn.close()
+
+
 async def get_system_session():
     """获取系统数据库会话"""
-    async with SystemSessionLocal() as session:
+    async for session in system_pool.session():
         yield session
 
 
+def pool_stats() -> List[Dict[str, Any]]:
+    """各数据库连接池状态"""
+    return [pool.stats() for pool in (business_pool, system_pool, *replica_pools)]
+
+
 # 获取模型列表（延迟导入避免循环依赖）
 def get_business_models():
     """获取业务模型列表"""
@@ -60,14 +255,57 @@ def get_system_models():
     return [SQLTemplate, SQLTemplateParam, QueryHistory]
 
 
+async def _migrate_template_fingerprints(conn: AsyncConnection):
+    """为旧版 sql_templates 补充指纹列与唯一键，并回填已有模板的指纹
+
+    规范化后重复的旧模板只有最早的一个获得指纹，其余保持为空（唯一键允许多个 NULL）。
+    """
+    from .validation import sql_fingerprint
+
+    columns = await conn.run_sync(
+        lambda sync_conn: {column["name"] for column in inspect(sync_conn).get_columns("sql_templates")}
+    )
+    if "fingerprint" not in columns:
+        await conn.execute(
+            text(
+                "ALTER TABLE sql_templates ADD COLUMN fingerprint VARCHAR(64) NULL AFTER sql_text, "
+                "ADD UNIQUE KEY uq_sql_templates_fingerprint (fingerprint)"
+            )
+        )
+        logger.info("sql_templates 已添加指纹列与唯一键")
+
+    missing = (
+        await conn.execute(text("SELECT id, sql_text FROM sql_templates WHERE fingerprint IS NULL ORDER BY id"))
+    ).fetchall()
+    if not missing:
+        return
+    taken = {
+        row[0]
+        for row in await conn.execute(text("SELECT fingerprint FROM sql_templates WHERE fingerprint IS NOT NULL"))
+    }
+    updates = []
+    for template_id, sql_text in missing:
+        fingerprint = sql_fingerprint(sql_text)
+        if fingerprint not in taken:
+            taken.add(fingerprint)
+            updates.append({"id": template_id, "fingerprint": fingerprint})
+    if updates:
+        await conn.execute(
+            text("UPDATE sql_templates SET fingerprint = :fingerprint WHERE id = :id"), updates
+        )
+    logger.info(f"已回填 {len(updates)} 个模板指纹，{len(missing) - len(updates)} 个重复模板未回填")
+
+
 # 统一的数据库初始化函数
-async def _init_database(engine, models, db_type: str):
+async def _init_database(engine, models, db_type: str, migrate=None):
     """统一的数据库初始化逻辑"""
     try:
         table_names = [model.__tablename__ for model in models]
         logger.info(f"开始初始化{db_type}数据库表: {table_names}")
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            if migrate is not None:
+                await migrate(conn)
         logger.info(f"{db_type}数据库表初始化完成")
     except Exception as e:
         logger.error(f"{db_type}数据库表初始化失败: {e}")
@@ -82,15 +320,15 @@ async def init_business_db():
 
 async def init_system_db():
     """初始化系统数据库表"""
-    await _init_database(system_engine, get_system_models(), "系统")
+    await _init_database(system_engine, get_system_models(), "系统", _migrate_template_fingerprints)
 
 
 async def close_connections():
     """关闭数据库连接"""
     try:
         logger.info("正在关闭数据库连接...")
-        await business_engine.dispose()
-        await system_engine.dispose()
+        for pool in (business_pool, system_pool, *replica_pools):
+            await pool.engine.dispose()
         logger.info("数据库连接已关闭")
     except Exception as e:
         logger.error(f"关闭数据库连接时出错: {e}")
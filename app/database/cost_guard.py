@@ -0,0 +1,156 @@
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+from app.config.app_config import Config
+from app.common.cache import TTLCache
+from .repository import BusinessRepository
+from .validation import canonicalize_sql
+
+logger = logging.getLogger(__name__)
+
+# 需要读完全部输入行才能产出结果的操作：聚合、分组、去重、排序（LIMIT 无法限制扫描量）
+_UNBOUNDED_SQL = re.compile(
+    r"\b(?:SUM|COUNT|AVG|MIN|MAX|GROUP_CONCAT|STD|STDDEV|VARIANCE)\s*\(|\bGROUP\s+BY\b|\bORDER\s+BY\b|\bDISTINCT\b",
+    re.IGNORECASE,
+)
+_UNBOUNDED_PLAN_KEYS = ("grouping_operation", "ordering_operation", "duplicates_removal", "windowing")
+
+
+def _to_number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _collect_plan_tables(node: Any, tables: List[Dict[str, Any]]):
+    """递归收集执行计划中的表访问节点（含嵌套循环、子查询、派生表、UNION）"""
+    if isinstance(node, list):
+        for item in node:
+            _collect_plan_tables(item, tables)
+        return
+    if not isinstance(node, dict):
+        return
+
+    table = node.get("table")
+    if isinstance(table, dict) and "table_name" in table:
+        tables.append(
+            {
+                "table_name": table["table_name"],
+                "access_type": table.get("access_type"),
+                "rows": _to_number(table.get("rows_examined_per_scan")),
+                "rows_produced": _to_number(table.get("rows_produced_per_join")),
+            }
+        )
+    for value in node.values():
+        if isinstance(value, (dict, list)):
+            _collect_plan_tables(value, tables)
+
+
+def summarize_plan(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """从 EXPLAIN FORMAT=JSON 结果中提取表访问方式与预估行数
+
+    嵌套循环中最后一张表的 rows_produced_per_join 已累积前序表的扇出，
+    因此取各表扫描/产出行数的最大值作为整条查询的预估行数。
+    """
+    tables: List[Dict[str, Any]] = []
+    _collect_plan_tables(plan, tables)
+    query_block = plan.get("query_block", {})
+    estimated_rows = max(
+        [max(t["rows"], t["rows_produced"]) for t in tables] or [0.0]
+    )
+    return {
+        "tables": tables,
+        "estimated_rows": int(estimated_rows),
+        "query_cost": _to_number(query_block.get("cost_info", {}).get("query_cost")),
+        "aggregates": any(key in query_block for key in _UNBOUNDED_PLAN_KEYS),
+    }
+
+
+def is_unbounded_scan(sql: str, summary: Dict[str, Any]) -> bool:
+    """LIMIT 无法限制扫描量的查询：聚合/分组/排序/去重（由执行计划或SQL判断）或多表连接"""
+    if summary.get("aggregates") or len(summary["tables"]) > 1:
+        return True
+    return bool(_UNBOUNDED_SQL.search(sql))
+
+
+class QueryCostGuard:
+    """查询准入：执行前通过 EXPLAIN 预估代价
+
+    预估行数超过 QUERY_MAX_ESTIMATED_ROWS 的查询直接拒绝；
+    对超过 QUERY_FULL_SCAN_ROWS 的大表全表扫描，若查询需要读完全部行
+    （聚合、分组、排序、去重或多表连接），注入 LIMIT 也无法限制代价，同样拒绝。
+    普通明细查询的全表扫描由执行前注入的 LIMIT 提前终止，予以放行。
+    相同SQL的执行计划摘要在缓存有效期内复用。
+    """
+
+    def __init__(self, ttl: float = Config.SCHEMA_CACHE_TTL):
+        self.plans = TTLCache("query_plan", max_entries=1000, ttl=ttl)
+        self.admitted = 0
+        self.rejected = 0
+
+    async def explain(
+        self, sql: str, params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        # 绑定参数的模板按SQL文本复用执行计划摘要，不区分参数取值
+        key = canonicalize_sql(sql)
+        summary = self.plans.get(key)
+        if summary is None:
+            rows = await BusinessRepository.execute_query(
+                f"EXPLAIN FORMAT=JSON {sql}", params
+            )
+            plan = json.loads(next(iter(rows[0].values())))
+            summary = summarize_plan(plan)
+            self.plans.set(key, summary)
+        return summary
+
+    async def admit(self, sql: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """校验查询代价，返回允许执行的SQL；超出预算时抛出 ValueError"""
+        if not Config.QUERY_COST_GUARD_ENABLED:
+            return sql
+
+        summary = await self.explain(sql, params)
+        estimated_rows = summary["estimated_rows"]
+        logger.debug(
+            f"查询预估行数 {estimated_rows}，代价 {summary['query_cost']}，"
+            f"访问方式 {[(t['table_name'], t['access_type']) for t in summary['tables']]}"
+        )
+
+        if estimated_rows > Config.QUERY_MAX_ESTIMATED_ROWS:
+            self.rejected += 1
+            logger.warning(f"查询预估扫描 {estimated_rows} 行，超过上限，拒绝执行: {sql}")
+            raise ValueError(
+                f"查询预估扫描约 {estimated_rows} 行，超过上限 "
+                f"{Config.QUERY_MAX_ESTIMATED_ROWS} 行，请增加筛选条件或缩小范围"
+            )
+
+        full_scans = [
+            t["table_name"]
+            for t in summary["tables"]
+            if t["access_type"] == "ALL" and t["rows"] >= Config.QUERY_FULL_SCAN_ROWS
+        ]
+        if full_scans and is_unbounded_scan(sql, summary):
+            self.rejected += 1
+            logger.warning(f"大表 {full_scans} 全表扫描且需读取全部行，拒绝执行: {sql}")
+            raise ValueError(
+                f"查询需要对大表 {', '.join(full_scans)} 做全表扫描并汇总，"
+                f"请增加时间范围等筛选条件"
+            )
+
+        self.admitted += 1
+        return sql
+
+    def clear(self):
+        self.plans.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.plans.stats(),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+# 单例实例
+query_cost_guard = QueryCostGuard()
@@ -0,0 +1,171 @@
+import asyncio
+import base64
+import json
+import logging
+import zlib
+from typing import Any, Dict, List, Optional
+from app.config.app_config import Config
+from app.common.serializer import dumps
+from .repository import SystemRepository
+from .result_set import ResultSet
+
+logger = logging.getLogger(__name__)
+
+
+def encode_history_result(
+    result: Any,
+    mode: str = Config.HISTORY_RESULT_MODE,
+    max_rows: int = Config.HISTORY_RESULT_MAX_ROWS,
+) -> Optional[str]:
+    """按配置编码查询结果：full 全量、truncate 截断行数、compress 压缩、none 不保存"""
+    if result is None or mode == "none":
+        return None
+    if isinstance(result, str):
+        return result
+
+    if (
+        mode == "truncate"
+        and isinstance(result, (list, ResultSet))
+        and len(result) > max_rows
+    ):
+        rows = result.head(max_rows) if isinstance(result, ResultSet) else result[:max_rows]
+        result = {"truncated": True, "total": len(result), "rows": rows}
+
+    payload = dumps(result)
+    if mode == "compress":
+        return "zlib:" + base64.b64encode(zlib.compress(payload)).decode()
+    return payload.decode("utf-8")
+
+
+def decode_history_result(text: Optional[str]) -> Any:
+    """还原 encode_history_result 编码的结果"""
+    if not text:
+        return None
+    if text.startswith("zlib:"):
+        text = zlib.decompress(base64.b64decode(text[5:])).decode("utf-8")
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+class QueryHistoryWriter:
+    """查询历史缓冲写入器
+
+    在内存中累积历史记录，满 N 条或距首条超过 M 毫秒时以一条多行 INSERT 落库；
+    缓冲区满时 write 会等待（背压），关闭时写完剩余记录。
+    """
+
+    def __init__(
+        self,
+        batch_size: int = Config.HISTORY_BATCH_SIZE,
+        flush_interval_ms: float = Config.HISTORY_FLUSH_INTERVAL_MS,
+        max_pending: int = Config.HISTORY_MAX_PENDING,
+        max_retries: int = Config.TASK_QUEUE_MAX_RETRIES,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def start(self):
+        """启动后台刷写协程（需在事件循环内调用）"""
+        if self._flusher is not None:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._flusher = asyncio.create_task(self._run())
+        logger.info(
+            f"查询历史写入器已启动，批大小 {self.batch_size}，"
+            f"刷写间隔 {self.flush_interval * 1000:.0f}ms"
+        )
+
+    async def write(
+        self,
+        query_id: str,
+        user_input: str,
+        sql_query: str = None,
+        result: Any = None,
+        satisfaction_level: str = None,
+        visualization_type: str = "table",
+    ):
+        """写入一条查询历史（缓冲区满时等待）"""
+        self.start()
+        await self._queue.put(
+            {
+                "query_id": query_id,
+                "user_input": user_input,
+                "sql_query": sql_query,
+                "result": encode_history_result(result),
+                "satisfaction_level": satisfaction_level,
+                "visualization_type": visualization_type,
+            }
+        )
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await SystemRepository.save_query_histories(batch)
+                self.written += len(batch)
+                self.flushes += 1
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    self.failed += len(batch)
+                    logger.error(f"查询历史批量写入失败，丢弃 {len(batch)} 条: {e}")
+                    return
+                await asyncio.sleep(0.5 * (2**attempt))
+
+    async def close(self, timeout: float = Config.TASK_QUEUE_DRAIN_TIMEOUT):
+        """写完缓冲区剩余记录后停止"""
+        if self._flusher is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"查询历史刷写超时，放弃 {self._queue.qsize()} 条记录")
+        self._flusher.cancel()
+        await asyncio.gather(self._flusher, return_exceptions=True)
+        self._flusher = None
+        logger.info("查询历史写入器已关闭")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize() if self._queue else 0,
+            "max_pending": self.max_pending,
+            "batch_size": self.batch_size,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+        }
+
+
+# 单例实例
+history_writer = QueryHistoryWriter()
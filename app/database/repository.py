@@ -1,15 +1,123 @@
-import json
+import asyncio
 import logging
-from typing import List, Dict, Any
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
-from .base import get_business_session, get_system_session, get_business_models
+from functools import lru_cache
+from typing import List, Dict, Any, AsyncIterator, Optional, Sequence, Tuple, Union
+from sqlalchemy import text, bindparam, func, insert
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.sql.elements import TextClause
+from app.config.app_config import Config
+from .base import (
+    business_connection,
+    business_read_connection,
+    system_connection,
+    get_system_session,
+    get_business_models,
+)
+from .result_set import ResultSet
+from .validation import add_execution_time_hint, sql_fingerprint
 
 logger = logging.getLogger(__name__)
 
+Statement = Union[str, TextClause]
+
+
+@lru_cache(maxsize=512)
+def cached_text(sql: str) -> TextClause:
+    """复用相同SQL的 text() 构造，省去重复解析绑定参数，编译结果由 SQLAlchemy 缓存"""
+    return text(sql)
+
+
+def _as_statement(statement: Statement) -> TextClause:
+    return statement if isinstance(statement, TextClause) else cached_text(statement)
+
+
+async def fetch_records(
+    conn: AsyncConnection, statement: Statement, params: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """在已取出的连接上执行语句，按行元组直接组装字典"""
+    result = await conn.execute(_as_statement(statement), params or {})
+    columns = list(result.keys())
+    return [dict(zip(columns, row)) for row in result.fetchall()]
+
+
+async def run_statements(
+    conn: AsyncConnection,
+    statements: Sequence[Tuple[Statement, Optional[Dict[str, Any]]]],
+) -> List[List[Dict[str, Any]]]:
+    """在同一连接上依次执行多条互不依赖的语句，按顺序返回各自结果"""
+    return [await fetch_records(conn, statement, params) for statement, params in statements]
+
+SCHEMA_COLUMNS_SQL = text(
+    """
+    SELECT
+        c.TABLE_NAME as table_name,
+        t.TABLE_COMMENT as table_comment,
+        c.COLUMN_NAME as column_name,
+        c.DATA_TYPE as data_type,
+        c.IS_NULLABLE as is_nullable,
+        c.COLUMN_DEFAULT as column_default,
+        c.COLUMN_KEY as column_key,
+        c.EXTRA as extra,
+        c.COLUMN_COMMENT as column_comment
+    FROM information_schema.COLUMNS c
+    JOIN information_schema.TABLES t
+        ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+    WHERE c.TABLE_SCHEMA = DATABASE() AND c.TABLE_NAME IN :table_names
+    ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION
+    """
+).bindparams(bindparam("table_names", expanding=True))
+
+FOREIGN_KEYS_SQL = """
+SELECT 
+    TABLE_NAME as table_name,
+    COLUMN_NAME as column_name,
+    REFERENCED_TABLE_NAME as referenced_table_name,
+    REFERENCED_COLUMN_NAME as referenced_column_name,
+    CONSTRAINT_NAME as constraint_name
+FROM information_schema.KEY_COLUMN_USAGE 
+WHERE TABLE_SCHEMA = DATABASE() 
+AND REFERENCED_TABLE_NAME IS NOT NULL
+ORDER BY TABLE_NAME, COLUMN_NAME
+"""
+
+TEMPLATE_PARAMS_SQL = text(
+    """
+    SELECT template_id, param_name, param_type, param_description
+    FROM sql_template_params
+    WHERE template_id IN :template_ids
+    ORDER BY template_id, id
+    """
+).bindparams(bindparam("template_ids", expanding=True))
+
+TEMPLATES_BY_FINGERPRINT_SQL = text(
+    "SELECT t.* FROM sql_templates t WHERE t.fingerprint IN :fingerprints"
+).bindparams(bindparam("fingerprints", expanding=True))
+
+# 在模板行锁内检查参数是否已写入（锁定读，不受事务快照影响）
+TEMPLATE_HAS_PARAMS_SQL = text(
+    "SELECT 1 FROM sql_template_params WHERE template_id = :template_id LIMIT 1 FOR UPDATE"
+)
+
+TABLE_VERSIONS_SQL = text(
+    """
+    SELECT
+        TABLE_NAME as table_name,
+        CREATE_TIME as create_time,
+        UPDATE_TIME as update_time
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN :table_names
+    """
+).bindparams(bindparam("table_names", expanding=True))
+
 
 class BusinessRepository:
-    """业务数据库访问层"""
+    """业务数据库访问层
+
+    只读文本SQL直接在原生连接上执行（不创建ORM会话），
+    经 business_read_connection 路由到只读副本（未配置时为主库）；
+    表版本检测固定读主库，保证缓存失效不受复制延迟影响。
+    """
 
     @staticmethod
     async def execute_query(
@@ -21,14 +129,11 @@ class BusinessRepository:
             if params:
                 logger.debug(f"查询参数: {params}")
 
-            async for session in get_business_session():
-                result = await session.execute(text(sql), params or {})
-                columns = result.keys()
-                rows = result.fetchall()
-                data = [dict(zip(columns, row)) for row in rows]
+            async with business_read_connection() as conn:
+                data = await fetch_records(conn, sql, params)
 
-                logger.info(f"业务数据库查询完成，返回 {len(data)} 条记录")
-                return data
+            logger.info(f"业务数据库查询完成，返回 {len(data)} 条记录")
+            return data
 
         except Exception as e:
             logger.error(f"业务数据库查询失败: {e}")
@@ -38,86 +143,145 @@ class BusinessRepository:
             raise
 
     @staticmethod
-    async def get_database_schema() -> Dict[str, Any]:
-        """获取业务数据库Schema"""
+    async def execute_result_set(
+        sql: str, params: Dict[str, Any] = None
+    ) -> ResultSet:
+        """执行业务数据库查询，返回列式结果
+
+        查询附带 MAX_EXECUTION_TIME 提示，并在客户端按 QUERY_STATEMENT_TIMEOUT 超时中止。
+        """
         try:
-            logger.info("开始获取数据库Schema信息")
+            logger.debug(f"执行业务数据库查询: {sql}")
+            if params:
+                logger.debug(f"查询参数: {params}")
+
+            statement = cached_text(
+                add_execution_time_hint(sql, Config.QUERY_MAX_EXECUTION_MS)
+            )
+            async with business_read_connection() as conn:
+                result = await BusinessRepository._execute_with_timeout(
+                    conn, conn.execute(statement, params or {})
+                )
+                data = ResultSet.from_rows(result.keys(), result.fetchall())
+
+            logger.info(f"业务数据库查询完成，返回 {len(data)} 条记录")
+            return data
 
-            schema_info = {"tables": [], "relationships": []}
+        except Exception as e:
+            logger.error(f"业务数据库查询失败: {e}")
+            logger.error(f"执行的SQL: {sql}")
+            if params:
+                logger.error(f"查询参数: {params}")
+            raise
 
-            for model in get_business_models():
-                table_info = await BusinessRepository._get_table_info(
-                    model.__tablename__
+    @staticmethod
+    async def stream_query(
+        sql: str, params: Dict[str, Any] = None, chunk_size: int = 500
+    ) -> AsyncIterator[ResultSet]:
+        """使用服务端游标流式执行查询，按块产出结果行"""
+        try:
+            logger.debug(f"流式执行业务数据库查询: {sql}")
+
+            statement = cached_text(
+                add_execution_time_hint(sql, Config.QUERY_MAX_EXECUTION_MS)
+            )
+            async with business_read_connection() as conn:
+                result = await BusinessRepository._execute_with_timeout(
+                    conn, conn.stream(statement, params or {})
                 )
-                schema_info["tables"].append(table_info)
+                columns = list(result.keys())
+                total = 0
+                async for rows in result.partitions(chunk_size):
+                    total += len(rows)
+                    yield ResultSet.from_rows(columns, rows)
 
-            relationships = await BusinessRepository._get_foreign_keys()
-            schema_info["relationships"] = relationships
+                logger.info(f"业务数据库流式查询完成，返回 {total} 条记录")
 
-            logger.info(f"Schema信息获取完成，包含 {len(schema_info['tables'])} 个表")
-            return schema_info
+        except Exception as e:
+            logger.error(f"业务数据库流式查询失败: {e}")
+            logger.error(f"执行的SQL: {sql}")
+            raise
 
+    @staticmethod
+    async def execute_many(
+        statements: Sequence[Tuple[Statement, Optional[Dict[str, Any]]]],
+    ) -> List[List[Dict[str, Any]]]:
+        """在同一只读连接上依次执行多条互不依赖的查询，返回各自结果"""
+        try:
+            async with business_read_connection() as conn:
+                return await run_statements(conn, statements)
         except Exception as e:
-            logger.error(f"获取数据库Schema失败: {e}")
+            logger.error(f"业务数据库批量查询失败: {e}")
             raise
 
     @staticmethod
-    async def _get_table_info(table_name: str) -> Dict[str, Any]:
-        """获取表详细信息"""
-        column_sql = """
-        SELECT 
-            COLUMN_NAME as column_name,
-            DATA_TYPE as data_type,
-            IS_NULLABLE as is_nullable,
-            COLUMN_DEFAULT as column_default,
-            COLUMN_KEY as column_key,
-            EXTRA as extra,
-            COLUMN_COMMENT as column_comment
-        FROM information_schema.COLUMNS 
-        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name
-        ORDER BY ORDINAL_POSITION
-        """
+    async def _execute_with_timeout(conn: AsyncConnection, execution):
+        """等待语句执行（至首批结果返回），超时后作废该连接，避免占用连接池"""
+        try:
+            return await asyncio.wait_for(execution, Config.QUERY_STATEMENT_TIMEOUT)
+        except asyncio.TimeoutError:
+            # 被取消的连接上可能仍有未读完的结果，不能归还连接池
+            await conn.invalidate()
+            raise TimeoutError(
+                f"查询执行超过 {Config.QUERY_STATEMENT_TIMEOUT:g} 秒，已中止"
+            )
 
-        columns = await BusinessRepository.execute_query(
-            column_sql, {"table_name": table_name}
-        )
+    @staticmethod
+    async def get_database_schema() -> Dict[str, Any]:
+        """获取业务数据库Schema（单次批量查询所有表的列、注释及外键）"""
+        try:
+            logger.info("开始获取数据库Schema信息")
 
-        table_comment_sql = """
-        SELECT TABLE_COMMENT as table_comment
-        FROM information_schema.TABLES 
-        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name
-        """
+            table_names = [model.__tablename__ for model in get_business_models()]
+            tables = {
+                name: {"table_name": name, "table_comment": "", "columns": []}
+                for name in table_names
+            }
+
+            column_rows, relationships = await BusinessRepository.execute_many(
+                [
+                    (SCHEMA_COLUMNS_SQL, {"table_names": table_names}),
+                    (FOREIGN_KEYS_SQL, None),
+                ]
+            )
+            for row in column_rows:
+                table = tables[row.pop("table_name")]
+                table["table_comment"] = row.pop("table_comment") or ""
+                table["columns"].append(row)
+
+            schema_info = {
+                "tables": [tables[name] for name in table_names],
+                "relationships": relationships,
+            }
 
-        table_comment_result = await BusinessRepository.execute_query(
-            table_comment_sql, {"table_name": table_name}
-        )
-        table_comment = (
-            table_comment_result[0]["table_comment"] if table_comment_result else ""
-        )
+            logger.info(f"Schema信息获取完成，包含 {len(schema_info['tables'])} 个表")
+            return schema_info
 
-        return {
-            "table_name": table_name,
-            "table_comment": table_comment,
-            "columns": columns,
-        }
+        except Exception as e:
+            logger.error(f"获取数据库Schema失败: {e}")
+            raise
 
     @staticmethod
-    async def _get_foreign_keys() -> List[Dict[str, Any]]:
-        """获取外键关系"""
-        fk_sql = """
-        SELECT 
-            TABLE_NAME as table_name,
-            COLUMN_NAME as column_name,
-            REFERENCED_TABLE_NAME as referenced_table_name,
-            REFERENCED_COLUMN_NAME as referenced_column_name,
-            CONSTRAINT_NAME as constraint_name
-        FROM information_schema.KEY_COLUMN_USAGE 
-        WHERE TABLE_SCHEMA = DATABASE() 
-        AND REFERENCED_TABLE_NAME IS NOT NULL
-        ORDER BY TABLE_NAME, COLUMN_NAME
-        """
+    async def get_table_versions() -> Dict[str, str]:
+        """获取业务表版本标识（CREATE_TIME/UPDATE_TIME）"""
+        table_names = [model.__tablename__ for model in get_business_models()]
+
+        async with business_connection() as conn:
+            try:
+                # MySQL 8 默认缓存 information_schema 统计信息 24 小时
+                await conn.execute(
+                    cached_text("SET SESSION information_schema_stats_expiry = 0")
+                )
+            except Exception as e:
+                logger.debug(f"设置 information_schema_stats_expiry 失败: {e}")
 
-        return await BusinessRepository.execute_query(fk_sql)
+            rows = await fetch_records(
+                conn, TABLE_VERSIONS_SQL, {"table_names": table_names}
+            )
+        return {
+            row["table_name"]: f"{row['create_time']}|{row['update_time']}"
+            for row in rows
+        }
 
     @staticmethod
     async def get_table_ddl(table_name: str) -> str:
@@ -145,11 +309,16 @@ class BusinessRepository:
         try:
             logger.info("开始获取所有表的DDL")
 
+            table_names = [model.__tablename__ for model in get_business_models()]
+            results = await BusinessRepository.execute_many(
+                [(f"SHOW CREATE TABLE `{name}`", None) for name in table_names]
+            )
+
             ddl_dict = {}
-            for model in get_business_models():
-                table_name = model.__tablename__
-                ddl = await BusinessRepository.get_table_ddl(table_name)
-                ddl_dict[table_name] = ddl
+            for table_name, result in zip(table_names, results):
+                if not result:
+                    raise ValueError(f"无法获取表 {table_name} 的DDL")
+                ddl_dict[table_name] = result[0].get("Create Table", "")
 
             logger.info(f"成功获取 {len(ddl_dict)} 个表的DDL")
             return ddl_dict
@@ -172,14 +341,11 @@ class SystemRepository:
             if params:
                 logger.debug(f"查询参数: {params}")
 
-            async for session in get_system_session():
-                result = await session.execute(text(sql), params or {})
-                columns = result.keys()
-                rows = result.fetchall()
-                data = [dict(zip(columns, row)) for row in rows]
+            async with system_connection() as conn:
+                data = await fetch_records(conn, sql, params)
 
-                logger.info(f"系统数据库查询完成，返回 {len(data)} 条记录")
-                return data
+            logger.info(f"系统数据库查询完成，返回 {len(data)} 条记录")
+            return data
 
         except Exception as e:
             logger.error(f"系统数据库查询失败: {e}")
@@ -189,52 +355,89 @@ class SystemRepository:
             raise
 
     @staticmethod
-    async def save_query_history(
-        query_id: str,
-        user_input: str,
-        sql_query: str = None,
-        result: Any = None,
-        satisfaction_level: str = None,
-        visualization_type: str = "table",
-    ):
-        """保存查询历史"""
-        try:
-            logger.debug(f"保存查询历史，查询ID: {query_id}")
-            from .system_models import QueryHistory
-
-            async for session in get_system_session():
-                history = QueryHistory(
-                    query_id=query_id,
-                    user_input=user_input,
-                    sql_query=sql_query,
-                    result=json.dumps(result, ensure_ascii=False) if result else None,
-                    satisfaction_level=satisfaction_level,
-                    visualization_type=visualization_type,
-                )
-                session.add(history)
-                await session.commit()
-                logger.info(f"查询历史保存成功，查询ID: {query_id}")
-                return history
+    async def save_query_histories(rows: List[Dict[str, Any]]):
+        """批量保存查询历史（单条多行 INSERT）"""
+        if not rows:
+            return
 
-        except Exception as e:
-            logger.error(f"保存查询历史失败: {e}")
-            logger.error(f"查询ID: {query_id}")
-            raise
+        from .system_models import QueryHistory
+
+        async for session in get_system_session():
+            await session.execute(insert(QueryHistory), rows)
+            await session.commit()
+            logger.info(f"批量保存查询历史 {len(rows)} 条")
+
+    @staticmethod
+    async def get_templates_by_fingerprints(
+        fingerprints: List[str],
+    ) -> List[Dict[str, Any]]:
+        """按SQL指纹读取已入库的模板（参数附在 params 字段）"""
+        if not fingerprints:
+            return []
+        async with system_connection() as conn:
+            templates = await fetch_records(
+                conn, TEMPLATES_BY_FINGERPRINT_SQL, {"fingerprints": list(fingerprints)}
+            )
+        await SystemRepository._attach_template_params(templates)
+        return templates
+
+    @staticmethod
+    async def upsert_templates(templates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按SQL指纹幂等写入模板及其参数，返回库中对应的模板（含其他进程已写入的）
+
+        INSERT ... ON DUPLICATE KEY UPDATE 依赖 fingerprint 唯一键：并发写入同一模板的事务
+        在该行上串行，已存在的模板保留原描述与参数，只在没有参数时补写。
+        """
+        if not templates:
+            return []
+
+        from .system_models import SQLTemplate, SQLTemplateParam
+
+        fingerprints = []
+        async for session in get_system_session():
+            for template in templates:
+                fingerprint = sql_fingerprint(template["sql_text"])
+                fingerprints.append(fingerprint)
+                statement = mysql_insert(SQLTemplate).values(
+                    description=template["description"],
+                    sql_text=template["sql_text"],
+                    fingerprint=fingerprint,
+                    scenario=template["scenario"],
+                )
+                # LAST_INSERT_ID(id) 使已存在的行也返回其主键
+                statement = statement.on_duplicate_key_update(
+                    id=func.last_insert_id(SQLTemplate.id)
+                )
+                template_id = (await session.execute(statement)).lastrowid
+
+                has_params = (
+                    await session.execute(TEMPLATE_HAS_PARAMS_SQL, {"template_id": template_id})
+                ).first()
+                if template.get("params") and not has_params:
+                    await session.execute(
+                        insert(SQLTemplateParam),
+                        [
+                            {
+                                "template_id": template_id,
+                                "param_name": param["param_name"],
+                                "param_type": param["param_type"],
+                                "param_description": param.get("param_description"),
+                            }
+                            for param in template["params"]
+                        ],
+                    )
+            await session.commit()
+            logger.info(f"按指纹写入SQL模板 {len(templates)} 个")
+
+        return await SystemRepository.get_templates_by_fingerprints(fingerprints)
 
     @staticmethod
     async def get_sql_templates(scenario: str = None) -> List[Dict[str, Any]]:
-        """获取SQL模板"""
+        """获取SQL模板（参数以列表形式附在 params 字段）"""
         try:
             logger.debug(f"获取SQL模板，场景: {scenario or '全部'}")
 
-            sql = """
-            SELECT t.*, GROUP_CONCAT(
-                CONCAT(p.param_name, ':', p.param_type, ':', IFNULL(p.param_description, ''))
-                SEPARATOR '|'
-            ) as params
-            FROM sql_templates t
-            LEFT JOIN sql_template_params p ON t.id = p.template_id
-            """
+            sql = "SELECT t.* FROM sql_templates t"
 
             if scenario:
                 sql += " WHERE t.scenario = :scenario"
@@ -242,12 +445,68 @@ class SystemRepository:
             else:
                 params = {}
 
-            sql += " GROUP BY t.id ORDER BY t.created_at DESC"
+            sql += " ORDER BY t.created_at DESC"
 
             result = await SystemRepository.execute_query(sql, params)
+            await SystemRepository._attach_template_params(result)
             logger.info(f"获取到 {len(result)} 个SQL模板")
             return result
 
         except Exception as e:
             logger.error(f"获取SQL模板失败: {e}")
             raise
+
+    @staticmethod
+    async def iter_sql_templates(
+        page_size: int = 500,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """按主键分页流式读取全部SQL模板"""
+        last_id = 0
+        while True:
+            page = await SystemRepository.execute_query(
+                "SELECT t.* FROM sql_templates t WHERE t.id > :last_id "
+                "ORDER BY t.id LIMIT :page_size",
+                {"last_id": last_id, "page_size": page_size},
+            )
+            if not page:
+                return
+
+            await SystemRepository._attach_template_params(page)
+            yield page
+
+            if len(page) < page_size:
+                return
+            last_id = page[-1]["id"]
+
+    @staticmethod
+    async def get_template_param_types(
+        template_ids: List[int],
+    ) -> Dict[int, Dict[str, str]]:
+        """批量读取模板参数类型，返回 {template_id: {param_name: param_type}}"""
+        types: Dict[int, Dict[str, str]] = {}
+        if not template_ids:
+            return types
+
+        async with system_connection() as conn:
+            rows = await fetch_records(
+                conn, TEMPLATE_PARAMS_SQL, {"template_ids": list(template_ids)}
+            )
+        for row in rows:
+            types.setdefault(row["template_id"], {})[row["param_name"]] = row["param_type"]
+        return types
+
+    @staticmethod
+    async def _attach_template_params(templates: List[Dict[str, Any]]):
+        """批量查询模板参数并挂到各模板的 params 字段"""
+        for template in templates:
+            template["params"] = []
+        if not templates:
+            return
+
+        by_id = {template["id"]: template for template in templates}
+        async with system_connection() as conn:
+            rows = await fetch_records(
+                conn, TEMPLATE_PARAMS_SQL, {"template_ids": list(by_id)}
+            )
+        for row in rows:
+            by_id[row.pop("template_id")]["params"].append(row)
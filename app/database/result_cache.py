@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, Optional, Set
+from app.config.app_config import Config
+from app.common.cache import TTLCache, ALL_TABLES
+from .base import replica_pools
+from .repository import BusinessRepository
+from .result_set import ResultSet
+from .table_version import table_version_tracker
+from .validation import extract_tables, canonicalize_sql
+
+logger = logging.getLogger(__name__)
+
+
+class SQLResultCache:
+    """SQL结果缓存
+
+    以规范化SQL+绑定参数为键，按字节预算做LRU淘汰；
+    记录每条结果依赖的表，表变更时仅淘汰相关条目。
+    相同SQL的并发请求只会执行一次。
+    读查询可能路由到只读副本，而表变更在主库上检测：依赖表在查询开始后、
+    或开始前 DB_REPLICA_LAG_WINDOW 秒内发生变更时，结果可能是旧数据，不写入缓存。
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = Config.SQL_RESULT_CACHE_MAX_BYTES,
+        max_entries: int = Config.SQL_RESULT_CACHE_MAX_ENTRIES,
+        ttl: float = Config.SQL_RESULT_CACHE_TTL,
+    ):
+        self.cache = TTLCache(
+            "sql_result", max_entries=max_entries, ttl=ttl, max_bytes=max_bytes
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 表名 -> 最近一次检测到变更的时间（monotonic）
+        self._changed_at: Dict[str, float] = {}
+        table_version_tracker.add_listener(self._on_tables_changed)
+
+    def _on_tables_changed(self, tables: Set[str]):
+        evicted = self.invalidate_tables(tables)
+        if evicted:
+            logger.info(f"业务表 {sorted(tables)} 已变更，淘汰 {evicted} 条SQL结果缓存")
+
+    @staticmethod
+    def _tables(sql: str) -> Set[str]:
+        try:
+            return extract_tables(sql) or {ALL_TABLES}
+        except Exception as e:
+            logger.debug(f"提取SQL依赖表失败: {e}")
+            return {ALL_TABLES}
+
+    def is_cacheable(self, sql: str, started: float) -> bool:
+        """started（time.monotonic()）时开始的查询，其结果能否写入缓存
+
+        问题缓存、语义缓存写入由同一次查询产生的结果前也需检查，避免旧数据从上层缓存回流。
+        """
+        return not self._changed_since(self._tables(sql), started)
+
+    def _changed_since(self, tables: Set[str], started: float) -> bool:
+        """依赖表是否在查询开始后（有副本时再向前放宽复制延迟窗口）发生过变更"""
+        since = started - (Config.DB_REPLICA_LAG_WINDOW if replica_pools else 0.0)
+        if ALL_TABLES in tables:
+            return any(changed > since for changed in self._changed_at.values())
+        return any(self._changed_at.get(table, float("-inf")) > since for table in tables)
+
+    @staticmethod
+    def make_key(sql: str, params: Optional[Dict[str, Any]] = None) -> str:
+        payload = canonicalize_sql(sql)
+        if params:
+            payload += "\n" + json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def execute(
+        self, sql: str, params: Optional[Dict[str, Any]] = None
+    ) -> ResultSet:
+        """优先从缓存返回结果，未命中时执行查询并写入缓存"""
+        if not Config.SQL_RESULT_CACHE_ENABLED:
+            return await BusinessRepository.execute_result_set(sql, params)
+
+        await table_version_tracker.check()
+
+        key = self.make_key(sql, params)
+        result = self.cache.get(key)
+        if result is not None:
+            logger.info("命中SQL结果缓存")
+            return result
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # 发起查询的请求被取消（客户端断开、超时），由当前请求重新执行
+                logger.debug("并发查询的发起方已取消，重新执行")
+                return await self.execute(sql, params)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            started = time.monotonic()
+            result = await BusinessRepository.execute_result_set(sql, params)
+            tables = self._tables(sql)
+            if self._changed_since(tables, started):
+                logger.info(f"依赖表 {sorted(tables)} 刚发生变更，结果可能来自延迟的副本，不写入缓存")
+            else:
+                self.cache.set(key, result, tags=tables)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # 避免无人等待时出现 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            # 发起方被取消（CancelledError 不属于 Exception）时也要结束 future，否则等待方永远挂起
+            if not future.done():
+                future.cancel()
+            self._inflight.pop(key, None)
+
+    def invalidate_tables(self, tables: Set[str]) -> int:
+        tables = {t.lower() for t in tables}
+        now = time.monotonic()
+        for table in tables:
+            self._changed_at[table] = now
+        return self.cache.invalidate_tags(tables)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+# 单例实例
+sql_result_cache = SQLResultCache()
@@ -0,0 +1,202 @@
+import sys
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import numpy as np
+
+
+# orjson 原生支持的类型无需转换
+_CONVERTERS = {
+    Decimal: float,
+    timedelta: str,
+    bytes: lambda value: value.decode("utf-8", errors="replace"),
+}
+
+
+class Column:
+    """单列数据：数值列以 NumPy 数组存储（空值由掩码标记），其余列保留 Python 列表"""
+
+    __slots__ = ("values", "nulls")
+
+    def __init__(self, values, nulls: Optional[np.ndarray] = None):
+        self.values = values
+        self.nulls = nulls
+
+    @property
+    def is_numeric(self) -> bool:
+        return isinstance(self.values, np.ndarray)
+
+    @classmethod
+    def from_values(cls, values: Sequence[Any]) -> "Column":
+        present = [v for v in values if v is not None]
+        if not present or any(
+            isinstance(v, bool) or not isinstance(v, (int, float, Decimal))
+            for v in present
+        ):
+            return cls(list(values))
+
+        dtype = (
+            np.int64 if all(isinstance(v, int) for v in present) else np.float64
+        )
+        try:
+            if len(present) == len(values):
+                return cls(np.array(values, dtype=dtype))
+
+            nulls = np.fromiter(
+                (v is None for v in values), dtype=bool, count=len(values)
+            )
+            filled = np.array([0 if v is None else v for v in values], dtype=dtype)
+            return cls(filled, nulls)
+        except OverflowError:
+            # 超出 int64 范围（如 BIGINT UNSIGNED）时保留原值
+            return cls(list(values))
+
+    def __len__(self):
+        return len(self.values)
+
+    def take(self, index) -> "Column":
+        """按切片或行号数组取子集"""
+        nulls = self.nulls[index] if self.nulls is not None else None
+        if self.is_numeric or isinstance(index, slice):
+            return Column(self.values[index], nulls)
+        return Column([self.values[i] for i in index], nulls)
+
+    @classmethod
+    def concat(cls, columns: List["Column"]) -> "Column":
+        if all(column.is_numeric for column in columns):
+            nulls = None
+            if any(column.nulls is not None for column in columns):
+                nulls = np.concatenate(
+                    [
+                        column.nulls
+                        if column.nulls is not None
+                        else np.zeros(len(column), dtype=bool)
+                        for column in columns
+                    ]
+                )
+            return cls(np.concatenate([column.values for column in columns]), nulls)
+
+        # 各块类型不一致（如某块全为空值）时按原始值重新推断
+        return cls.from_values([v for column in columns for v in column.raw_list()])
+
+    def raw_list(self) -> List[Any]:
+        """原始 Python 值列表（空值为 None）"""
+        if not self.is_numeric:
+            return list(self.values)
+
+        values = self.values.tolist()
+        if self.nulls is not None:
+            for i in np.flatnonzero(self.nulls):
+                values[i] = None
+        return values
+
+    def json_values(self, as_list: bool = False):
+        """供序列化的列数据：无空值的数值列直接返回 NumPy 数组（as_list 时转为列表），
+        其余列按首个非空值类型选定转换函数，整列只转换一次"""
+        if self.is_numeric:
+            if self.nulls is None and not as_list:
+                return self.values
+            return self.raw_list()
+
+        first = next((v for v in self.values if v is not None), None)
+        value_type = type(first)
+        convert = _CONVERTERS.get(value_type)
+        if convert is None:
+            return self.values
+        return [convert(v) if type(v) is value_type else v for v in self.values]
+
+    def nbytes(self) -> int:
+        if self.is_numeric:
+            return self.values.nbytes + (
+                self.nulls.nbytes if self.nulls is not None else 0
+            )
+        sample = self.values[:32]
+        per_item = sum(sys.getsizeof(v) for v in sample) / len(sample) if sample else 0
+        return sys.getsizeof(self.values) + int(per_item * len(self.values))
+
+
+class ResultSet:
+    """列式查询结果：列名 + 按列存储的数据
+
+    相比逐行字典不重复保存列名，数值列可直接向量化计算。
+    """
+
+    def __init__(self, columns: List[str], data: List[Column]):
+        self.columns = list(columns)
+        self.data = data
+
+    @classmethod
+    def from_rows(cls, columns: Iterable[str], rows: Sequence[Sequence[Any]]) -> "ResultSet":
+        columns = list(columns)
+        if not rows:
+            return cls(columns, [Column([]) for _ in columns])
+        return cls(columns, [Column.from_values(values) for values in zip(*rows)])
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "ResultSet":
+        if not records:
+            return cls([], [])
+        columns = list(records[0].keys())
+        return cls.from_rows(columns, [tuple(r.get(c) for c in columns) for r in records])
+
+    @classmethod
+    def concat(cls, parts: List["ResultSet"]) -> "ResultSet":
+        non_empty = [part for part in parts if len(part)]
+        if len(non_empty) <= 1:
+            return non_empty[0] if non_empty else (parts[0] if parts else cls([], []))
+        parts = non_empty
+
+        return cls(
+            parts[0].columns,
+            [
+                Column.concat([part.data[i] for part in parts])
+                for i in range(len(parts[0].columns))
+            ],
+        )
+
+    def __len__(self):
+        return len(self.data[0]) if self.data else 0
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __sizeof__(self):
+        return sum(column.nbytes() for column in self.data)
+
+    def column(self, name: str) -> Column:
+        return self.data[self.columns.index(name)]
+
+    def numeric_columns(self) -> List[str]:
+        return [name for name, col in zip(self.columns, self.data) if col.is_numeric]
+
+    def slice(self, start: int = 0, stop: Optional[int] = None) -> "ResultSet":
+        index = slice(start, stop)
+        return ResultSet(self.columns, [column.take(index) for column in self.data])
+
+    def head(self, n: int) -> "ResultSet":
+        return self.slice(0, n)
+
+    def take(self, indices: np.ndarray) -> "ResultSet":
+        return ResultSet(self.columns, [column.take(indices) for column in self.data])
+
+    def to_columns(self, as_list: bool = False) -> List[Any]:
+        return [column.json_values(as_list) for column in self.data]
+
+    def to_rows(self) -> List[List[Any]]:
+        return [list(row) for row in zip(*self.to_columns(as_list=True))]
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return [
+            dict(zip(self.columns, row)) for row in zip(*self.to_columns(as_list=True))
+        ]
+
+    def to_wire(self, wire_format: str = "records") -> Any:
+        """按传输格式输出可由 app.common.serializer 序列化的结构
+
+        records: 行对象列表；rows: {"columns", "rows"} 二维数组；columnar: {"columns", "values"} 列优先
+        """
+        if wire_format == "rows":
+            return {"columns": self.columns, "rows": self.to_rows()}
+        if wire_format == "columnar":
+            return {"columns": self.columns, "values": self.to_columns()}
+        return self.to_records()
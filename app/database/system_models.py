@@ -1,15 +1,23 @@
 from .base import Base
-from sqlalchemy import Column, Integer, String, Text, Enum, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Enum, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
 
+def _template_fingerprint(context):
+    from .validation import sql_fingerprint
+    return sql_fingerprint(context.get_current_parameters()["sql_text"])
+
+
 class SQLTemplate(Base):
     __tablename__ = 'sql_templates'
+    __table_args__ = (UniqueConstraint('fingerprint', name='uq_sql_templates_fingerprint'),)
     
     id = Column(Integer, primary_key=True)
     description = Column(Text, nullable=False)
     sql_text = Column(Text, nullable=False)
+    # 规范化SQL指纹（唯一），多进程并发入库时去重
+    fingerprint = Column(String(64), default=_template_fingerprint)
     scenario = Column(String(255), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
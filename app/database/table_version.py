@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Set
+from app.config.app_config import Config
+from .repository import BusinessRepository
+
+logger = logging.getLogger(__name__)
+
+
+class TableVersionTracker:
+    """业务表变更探测器
+
+    周期性比对 information_schema.TABLES 的 CREATE_TIME/UPDATE_TIME，
+    发现变化时通知已注册的监听器（各级缓存据此失效）。
+    """
+
+    def __init__(self, check_interval: float = Config.TABLE_VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._versions: Dict[str, str] = {}
+        self._checked_at = 0.0
+        self._listeners: List[Callable[[Set[str]], None]] = []
+        self._lock = asyncio.Lock()
+
+    def add_listener(self, callback: Callable[[Set[str]], None]):
+        """注册表变更回调，参数为发生变化的表名集合"""
+        self._listeners.append(callback)
+
+    @property
+    def versions(self) -> Dict[str, str]:
+        return dict(self._versions)
+
+    async def check(self, force: bool = False) -> Set[str]:
+        """到达检查间隔时探测表版本，返回发生变化的表"""
+        if not force and time.monotonic() - self._checked_at < self.check_interval:
+            return set()
+
+        async with self._lock:
+            if not force and time.monotonic() - self._checked_at < self.check_interval:
+                return set()
+
+            try:
+                versions = await BusinessRepository.get_table_versions()
+            except Exception as e:
+                logger.warning(f"探测业务表版本失败: {e}")
+                self._checked_at = time.monotonic()
+                return set()
+
+            changed = set()
+            if self._versions:
+                changed = {
+                    table
+                    for table in set(versions) | set(self._versions)
+                    if versions.get(table) != self._versions.get(table)
+                }
+            self._versions = versions
+            self._checked_at = time.monotonic()
+
+        if changed:
+            logger.info(f"检测到业务表变更: {sorted(changed)}")
+            self.notify(changed)
+        return changed
+
+    def notify(self, tables: Set[str]):
+        """通知监听器指定表已变更（也可用于写入后的主动失效）"""
+        for callback in self._listeners:
+            try:
+                callback(set(tables))
+            except Exception as e:
+                logger.error(f"表变更回调执行失败: {e}")
+
+
+# 单例实例
+table_version_tracker = TableVersionTracker()
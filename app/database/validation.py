@@ -1,6 +1,14 @@
+import hashlib
 import logging
+import re
+from functools import lru_cache
+from typing import FrozenSet, Optional, Set, Tuple
 import sqlparse
-from sqlparse.tokens import Keyword, DML
+from sqlparse.filters import StripCommentsFilter, StripWhitespaceFilter
+from sqlparse.sql import Identifier, IdentifierList, Parenthesis
+from sqlparse.tokens import Keyword, DML, Name
+from app.config.app_config import Config
+from app.common.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -22,18 +30,58 @@ DANGEROUS_KEYWORDS = {
     "INTO DUMPFILE",
 }
 
+_LIMIT_CLAUSE = re.compile(
+    r"^(\d+)\s*(?:,\s*(\d+)|OFFSET\s+(\d+))?$", re.IGNORECASE
+)
 
-def validate_sql_query(sql_query: str) -> bool:
-    """验证SQL查询安全性"""
-    logger.debug(f"开始验证SQL查询安全性: {sql_query[:100]}...")
+# 危险关键字的预编译匹配器：在以空格连接的关键字/裸标识符序列上单次扫描，
+# 只匹配完整词元（多词关键字如 INTO OUTFILE 需相邻），updated_at 之类的列名不会误判
+_DANGEROUS_PATTERN = re.compile(
+    r"(?<![\w$])(?:"
+    + "|".join(
+        re.escape(keyword).replace(r"\ ", " ")
+        for keyword in sorted(DANGEROUS_KEYWORDS, key=len, reverse=True)
+    )
+    + r")(?![\w$])"
+)
+
+# 校验结论按SQL哈希缓存：(是否通过, 清理后的SQL或拒绝原因)
+_verdicts = TTLCache("sql_validation", max_entries=Config.SQL_VALIDATION_CACHE_SIZE)
 
+
+def check_sql_query(sql_query: str) -> str:
+    """校验SQL安全性并返回清理后的SQL
+
+    只解析一次，校验与清理共用语法树；相同SQL（如模板填充结果）直接复用缓存的结论。
+    """
     if not sql_query or not sql_query.strip():
         logger.warning("SQL查询为空")
         raise ValueError("SQL查询不能为空")
 
+    key = hashlib.sha256(sql_query.encode("utf-8")).hexdigest()
+    verdict = _verdicts.get(key)
+    if verdict is None:
+        try:
+            verdict = (True, _check_and_sanitize(sql_query))
+        except ValueError as e:
+            verdict = (False, str(e))
+        _verdicts.set(key, verdict)
+
+    passed, value = verdict
+    if not passed:
+        raise ValueError(value)
+    return value
+
+
+def _check_and_sanitize(sql_query: str) -> str:
+    logger.debug(f"开始验证SQL查询安全性: {sql_query[:100]}...")
+
     try:
-        parsed = sqlparse.parse(sql_query)
-        logger.debug("SQL语法解析成功")
+        parsed = [
+            statement
+            for statement in sqlparse.parse(sql_query)
+            if str(statement).strip()
+        ]
     except Exception as e:
         logger.error(f"SQL语法解析失败: {e}")
         raise ValueError(f"SQL语法错误: {e}")
@@ -52,6 +100,12 @@ def validate_sql_query(sql_query: str) -> bool:
             raise ValueError("SQL包含危险操作关键字")
 
     logger.info("SQL查询安全验证通过")
+    return _sanitize_statement(parsed[0])
+
+
+def validate_sql_query(sql_query: str) -> bool:
+    """验证SQL查询安全性"""
+    check_sql_query(sql_query)
     return True
 
 
@@ -61,23 +115,31 @@ def is_select_statement(statement) -> bool:
 
 
 def contains_dangerous_keywords(statement) -> bool:
-    """检查危险关键字"""
-    tokens = list(statement.flatten())
-
-    for token in tokens:
-        if token.ttype is Keyword and token.value.upper() in DANGEROUS_KEYWORDS:
-            logger.warning(f"发现危险关键字: {token.value}")
-            return True
-        if hasattr(token, "value") and isinstance(token.value, str):
-            token_upper = token.value.upper()
-            for keyword in DANGEROUS_KEYWORDS:
-                if keyword in token_upper:
-                    logger.warning(f"在字符串中发现危险关键字: {keyword}")
-                    return True
+    """检查危险关键字
 
+    仅扫描关键字与未加引号的标识符（LOAD_FILE、OUTFILE 被解析为标识符），
+    字符串字面量、注释和反引号标识符不参与匹配。
+    """
+    words = " ".join(
+        token.value.upper()
+        for token in statement.flatten()
+        if token.ttype in Keyword
+        or (token.ttype in Name and token.value[:1] not in "`\"")
+    )
+    match = _DANGEROUS_PATTERN.search(words)
+    if match:
+        logger.warning(f"发现危险关键字: {match.group()}")
+        return True
     return False
 
 
+def _sanitize_statement(statement) -> str:
+    """去除注释与多余空白（直接在已解析的语法树上处理，不再重新解析）"""
+    StripCommentsFilter().process(statement)
+    StripWhitespaceFilter().process(statement)
+    return str(statement).strip()
+
+
 def sanitize_sql_query(sql_query: str) -> str:
     """清理SQL查询"""
     logger.debug("开始清理SQL查询")
@@ -87,14 +149,154 @@ def sanitize_sql_query(sql_query: str) -> str:
         return ""
 
     try:
-        parsed = sqlparse.parse(sql_query)[0]
-        formatted = sqlparse.format(
-            str(parsed), strip_comments=True, strip_whitespace=True
-        )
+        formatted = _sanitize_statement(sqlparse.parse(sql_query)[0])
         logger.debug("SQL查询清理完成")
-        return formatted.strip()
+        return formatted
     except Exception as e:
         logger.warning(f"SQL解析失败，使用基础清理: {e}")
         cleaned = " ".join(sql_query.split())
         logger.debug("基础清理完成")
         return cleaned
+
+
+@lru_cache(maxsize=2048)
+def canonicalize_sql(sql: str) -> str:
+    """SQL规范化：去注释、统一关键字大小写与空白、去掉结尾分号"""
+    formatted = sqlparse.format(
+        sql, keyword_case="upper", strip_comments=True, strip_whitespace=True
+    )
+    return " ".join(formatted.split()).rstrip(";").strip()
+
+
+def sql_fingerprint(sql: str) -> str:
+    """规范化SQL的哈希指纹"""
+    return hashlib.sha256(canonicalize_sql(sql).encode("utf-8")).hexdigest()
+
+
+def extract_tables(sql_query: str) -> Set[str]:
+    """提取SQL语句引用的表名（含子查询），用于缓存依赖追踪"""
+    return set(_extract_tables(sql_query))
+
+
+@lru_cache(maxsize=2048)
+def _extract_tables(sql_query: str) -> FrozenSet[str]:
+    # 模板绑定参数后SQL文本稳定，相同SQL只解析一次
+    tables = set()
+    for statement in sqlparse.parse(sql_query):
+        _collect_tables(statement.tokens, tables)
+    return frozenset(tables)
+
+
+def _collect_tables(tokens, tables: Set[str]):
+    expect_table = False
+    for token in tokens:
+        if token.is_whitespace or token.ttype in sqlparse.tokens.Comment:
+            continue
+
+        if token.ttype is Keyword:
+            keyword = token.normalized
+            expect_table = keyword == "FROM" or keyword.endswith("JOIN")
+            continue
+
+        if expect_table:
+            if isinstance(token, IdentifierList):
+                for identifier in token.get_identifiers():
+                    _collect_identifier(identifier, tables)
+            elif isinstance(token, Identifier):
+                _collect_identifier(token, tables)
+            elif token.is_group:
+                _collect_tables(token.tokens, tables)
+            expect_table = False
+            continue
+
+        if token.is_group:
+            _collect_tables(token.tokens, tables)
+
+
+def _collect_identifier(identifier, tables: Set[str]):
+    subqueries = [t for t in identifier.tokens if isinstance(t, Parenthesis)]
+    if subqueries:
+        for subquery in subqueries:
+            _collect_tables(subquery.tokens, tables)
+    elif isinstance(identifier, Identifier):
+        tables.add(identifier.get_real_name().lower())
+
+
+@lru_cache(maxsize=2048)
+def split_limit(sql_query: str) -> Tuple[str, int, Optional[int]]:
+    """拆分最外层 LIMIT 子句，返回 (SQL主体, offset, 行数)，无 LIMIT 时行数为 None"""
+    sql_query = sql_query.strip().rstrip(";").strip()
+    statement = sqlparse.parse(sql_query)[0]
+    tokens = statement.tokens
+
+    limit_index = None
+    for index, token in enumerate(tokens):
+        if token.ttype is Keyword and token.normalized == "LIMIT":
+            limit_index = index
+
+    if limit_index is None:
+        return sql_query, 0, None
+
+    body = "".join(str(token) for token in tokens[:limit_index]).rstrip()
+    clause = "".join(str(token) for token in tokens[limit_index + 1 :]).strip()
+    match = _LIMIT_CLAUSE.match(clause)
+    if not match:
+        raise ValueError(f"无法解析LIMIT子句: {clause}")
+
+    first, count, offset = match.groups()
+    if count is not None:
+        # MySQL: LIMIT offset, count
+        return body, int(first), int(count)
+    return body, int(offset or 0), int(first)
+
+
+def _join_limit(body: str, offset: int, count: int) -> str:
+    if offset:
+        return f"{body} LIMIT {offset}, {count}"
+    return f"{body} LIMIT {count}"
+
+
+def enforce_row_limit(sql_query: str, max_rows: int) -> str:
+    """注入或收紧最外层 LIMIT，保证单条查询返回行数不超过 max_rows"""
+    body, offset, count = split_limit(sql_query)
+    if count is None or count > max_rows:
+        logger.info(f"SQL行数限制为 {max_rows}")
+        count = max_rows
+    return _join_limit(body, offset, count)
+
+
+@lru_cache(maxsize=2048)
+def has_order_by(sql_query: str) -> bool:
+    """最外层是否有 ORDER BY（子查询中的排序不保证外层结果顺序）"""
+    statement = sqlparse.parse(sql_query.strip().rstrip(";"))[0]
+    return any(
+        token.ttype is Keyword and token.normalized.split() == ["ORDER", "BY"]
+        for token in statement.tokens
+    )
+
+
+def paginate_sql(sql_query: str, offset: int, limit: int) -> str:
+    """在原 LIMIT 窗口内截取 [offset, offset + limit) 的一页
+
+    没有最外层 ORDER BY 时 MySQL 不保证每次执行的行序一致，各页可能重复或遗漏行，拒绝分页。
+    """
+    if not has_order_by(sql_query):
+        raise ValueError("SQL没有最外层ORDER BY，无法稳定分页")
+    body, base_offset, count = split_limit(sql_query)
+    if count is not None:
+        limit = max(0, min(limit, count - offset))
+    return _join_limit(body, base_offset + offset, limit)
+
+
+@lru_cache(maxsize=2048)
+def add_execution_time_hint(sql_query: str, timeout_ms: int) -> str:
+    """在最外层 SELECT 后注入 MAX_EXECUTION_TIME 优化器提示（MySQL 超时后中止查询）"""
+    if timeout_ms <= 0 or "MAX_EXECUTION_TIME" in sql_query.upper():
+        return sql_query
+
+    statement = sqlparse.parse(sql_query)[0]
+    for token in statement.tokens:
+        if token.ttype is DML and token.normalized == "SELECT":
+            token.value = f"{token.value} /*+ MAX_EXECUTION_TIME({int(timeout_ms)}) */"
+            return str(statement)
+    return sql_query
@@ -0,0 +1,109 @@
+import asyncio
+from fastapi import APIRouter
+from app.agent.schema_cache import schema_cache
+from app.agent.schema_linker import schema_linker
+from app.common.dimension_index import dimension_index
+from app.common.question_cache import question_cache
+from app.common.semantic_cache import semantic_cache
+from app.common.task_queue import background_tasks
+from app.common import template_reindex
+from app.database.base import pool_stats
+from app.database.result_cache import sql_result_cache
+from app.database.cost_guard import query_cost_guard
+from app.database.history_writer import history_writer
+from app.server.models.response import success_response, error_response
+
+admin = APIRouter(prefix="/admin")
+
+# 持有后台任务引用，避免被垃圾回收
+_running_jobs = set()
+
+
+@admin.post("/schema/refresh")
+async def refresh_schema():
+    """手动刷新Schema快照缓存"""
+    try:
+        await schema_cache.refresh()
+        return success_response(schema_cache.stats())
+    except Exception as e:
+        return error_response(code=500, message=f"刷新Schema失败: {str(e)}")
+
+
+@admin.get("/schema/stats")
+async def schema_stats():
+    """查看Schema快照缓存与Schema裁剪状态"""
+    return success_response({**schema_cache.stats(), "linking": schema_linker.stats()})
+
+
+@admin.get("/cache/stats")
+async def cache_stats():
+    """查看查询缓存命中统计"""
+    return success_response(
+        {
+            "question": question_cache.stats(),
+            "semantic": semantic_cache.stats(),
+            "sql_result": sql_result_cache.stats(),
+            "query_plan": query_cost_guard.stats(),
+            "dimension_values": dimension_index.stats(),
+        }
+    )
+
+
+@admin.post("/cache/clear")
+async def clear_cache():
+    """清空查询缓存"""
+    question_cache.clear()
+    semantic_cache.clear()
+    sql_result_cache.clear()
+    query_cost_guard.clear()
+    dimension_index.clear()
+    return success_response({"cleared": True})
+
+
+@admin.post("/dimensions/refresh")
+async def refresh_dimensions(full: bool = True):
+    """刷新维度取值字典（默认全量）"""
+    try:
+        await dimension_index.refresh(full=full)
+        return success_response(dimension_index.stats())
+    except Exception as e:
+        return error_response(code=500, message=f"刷新维度字典失败: {str(e)}")
+
+
+@admin.get("/db/pools")
+async def db_pool_stats():
+    """查看数据库连接池状态（含只读副本）"""
+    return success_response(pool_stats())
+
+
+@admin.get("/tasks/stats")
+async def task_stats():
+    """查看后台任务队列与历史写入器状态"""
+    return success_response(
+        {"background": background_tasks.stats(), "history": history_writer.stats()}
+    )
+
+
+@admin.post("/templates/reindex")
+async def reindex_templates(
+    page_size: int = 500, keep_old: bool = False, drop_existing: bool = False
+):
+    """后台重建模板向量索引（新集合构建完成后切换别名）"""
+    if template_reindex.reindex_lock.locked():
+        return error_response(code=409, message="模板索引重建正在进行中")
+
+    task = asyncio.create_task(template_reindex.reindex_templates(page_size, keep_old, drop_existing))
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+    return success_response({"started": True})
+
+
+@admin.get("/templates/reindex")
+async def reindex_status():
+    """查看模板向量索引重建状态"""
+    return success_response(
+        {
+            "running": template_reindex.reindex_lock.locked(),
+            "last": template_reindex.last_reindex,
+        }
+    )
@@ -1,22 +1,42 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional
-from app.server.service.query import query_db_sql
+from typing import Literal, Optional
+from app.config.app_config import Config
+from app.server.service.query import query_db_sql, stream_query_db_sql, query_next_page
 from app.server.models.response import success_response, error_response
+from app.common.serializer import dumps
 
 query = APIRouter()
 
 
+ResultFormat = Literal["records", "rows", "columnar"]
+
+
 class ChatRequest(BaseModel):
     question: str = Field(..., description="用户的自然语言问题")
     session_id: Optional[str] = Field(None, description="可选的会话ID")
+    result_format: Optional[ResultFormat] = Field(
+        None, description="结果数据格式：records / rows / columnar"
+    )
+
+
+class PageRequest(BaseModel):
+    page_token: str = Field(..., description="上一页返回的 next_page_token")
+    result_format: Optional[ResultFormat] = Field(
+        None, description="结果数据格式：records / rows / columnar"
+    )
 
 
 @query.post("/chat")
 async def chat_query(request: ChatRequest):
     """Chat-BI智能对话查询接口"""
     try:
-        result = await query_db_sql(request.question, request.session_id)
+        result = await query_db_sql(
+            request.question,
+            request.session_id,
+            request.result_format or Config.RESULT_WIRE_FORMAT,
+        )
 
         if result.get("success", False):
             return success_response(result["data"])
@@ -28,4 +48,39 @@ async def chat_query(request: ChatRequest):
             )
 
     except Exception as e:
-        return error_response(code=500, message=f"系统异常: {str(e)}")
\ No newline at end of file
+        return error_response(code=500, message=f"系统异常: {str(e)}")
+
+
+@query.post("/chat/page")
+async def chat_query_page(request: PageRequest):
+    """按分页令牌获取查询结果的下一页"""
+    result = await query_next_page(
+        request.page_token, request.result_format or Config.RESULT_WIRE_FORMAT
+    )
+
+    if result.get("success", False):
+        return success_response(result["data"])
+    error_info = result.get("error", {})
+    return error_response(
+        code=error_info.get("code", 500),
+        message=error_info.get("message", "分页查询失败"),
+    )
+
+
+@query.post("/chat/stream")
+async def chat_query_stream(request: ChatRequest):
+    """Chat-BI流式对话查询接口（Server-Sent Events）"""
+
+    async def event_stream():
+        async for event, data in stream_query_db_sql(
+            request.question,
+            request.session_id,
+            request.result_format or Config.RESULT_WIRE_FORMAT,
+        ):
+            yield b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
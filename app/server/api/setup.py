@@ -1,7 +1,13 @@
 from fastapi import FastAPI, APIRouter
 from app.server.middleware.cors import mw_cors
 from app.server.api.query import query
-from app.database.base import init_business_db, init_system_db, business_engine, system_engine, get_business_models, get_system_models
+from app.server.api.admin import admin
+from app.database.base import init_business_db, init_system_db, business_engine, system_engine, get_business_models, get_system_models, close_connections
+from app.common.embedding_client import embedding_client
+from app.common.task_queue import background_tasks
+from app.common.dimension_index import dimension_index
+from app.database.history_writer import history_writer
+from app.common.template_index import template_index, LocalTemplateIndex
 # 导入日志配置，确保使用自定义配置
 from app.config.app_log import logger
 from sqlalchemy import text
@@ -21,6 +27,7 @@ api_router = APIRouter(prefix="/api")
 
 # 将子路由器挂载到主API路由器
 api_router.include_router(query, tags=["查询"])
+api_router.include_router(admin, tags=["管理"])
 
 # 将主API路由器注册到应用
 app.include_router(api_router)
@@ -67,6 +74,17 @@ async def startup_event():
         
         # 初始化系统数据库表  
         await init_system_db()
+
+        # 启动后台任务队列
+        background_tasks.start()
+        history_writer.start()
+        dimension_index.start()
+
+        # 本地模板索引需在启动时从系统库加载
+        if isinstance(template_index, LocalTemplateIndex):
+            background_tasks.submit(
+                "load_template_index", template_index.load_from_repository
+            )
         
         logger.info("✅ 数据库表初始化完成")
         logger.info("🎉 Chat-BI API 启动成功！")
@@ -77,4 +95,15 @@ async def startup_event():
         # 不要让应用崩溃，只记录错误
         pass
 
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时释放连接资源"""
+    logger.info("🛑 应用关闭中...")
+    await background_tasks.shutdown()
+    await history_writer.close()
+    await dimension_index.close()
+    await embedding_client.close()
+    await close_connections()
+
 __all__ = ["app"]
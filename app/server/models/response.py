@@ -1,5 +1,7 @@
+from fastapi.responses import Response
 from pydantic import BaseModel, Field
 from typing import Generic, TypeVar, Dict, Any
+from app.common.serializer import dumps
 
 T = TypeVar("T")
 
@@ -17,13 +19,22 @@ class ResponseModel(BaseModel, Generic[T]):
     error: Dict[str, Any] = Field(default_factory=dict)
 
 
-def success_response(data: Any) -> ResponseModel:
-    """创建成功响应"""
-    return ResponseModel(data=data, success=True)
+class JSONBytesResponse(Response):
+    """使用 orjson 直接输出字节的 JSON 响应（支持列式结果、Decimal、NumPy 类型）"""
 
+    media_type = "application/json"
 
-def error_response(code: int, message: str) -> ResponseModel:
-    """创建错误响应"""
-    return ResponseModel(
-        data={}, success=False, error={"code": code, "message": message}
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def success_response(data: Any) -> JSONBytesResponse:
+    """创建成功响应（结构同 ResponseModel）"""
+    return JSONBytesResponse({"data": data, "success": True, "error": {}})
+
+
+def error_response(code: int, message: str) -> JSONBytesResponse:
+    """创建错误响应（结构同 ResponseModel）"""
+    return JSONBytesResponse(
+        {"data": {}, "success": False, "error": {"code": code, "message": message}}
     )
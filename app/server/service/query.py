@@ -1,40 +1,44 @@
-import json
+import asyncio
 import logging
+import time
 import uuid
-from decimal import Decimal
-from datetime import date, datetime, time
-from typing import Dict, Any, List, Optional
-from app.common.milvus_client import milvus_client
-from app.common.embedding_client import get_text_embedding
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+from app.config.app_config import Config
+from app.common.template_index import template_index
+from app.common.template_ranker import select_template
+from app.common.embedding_client import get_text_embedding_async
 from app.common.parameter_resolver import ParameterResolver
-from app.common.visualization import suggest_visualization_type
-from app.database.validation import validate_sql_query, sanitize_sql_query
-from app.database.repository import BusinessRepository, SystemRepository
+from app.common.serializer import dumps_str
+from app.common.visualization import suggest_visualization_type, generate_chart_config
+from app.common.column_profiler import profile_columns
+from app.common.chart_reducer import reduce_chart_data
+from app.common.question_cache import question_cache
+from app.common.semantic_cache import semantic_cache
+from app.common.task_queue import background_tasks
+from app.common.page_token import encode_page_token, decode_page_token
+from app.database.validation import (
+    check_sql_query,
+    validate_sql_query,
+    extract_tables,
+    enforce_row_limit,
+    has_order_by,
+    paginate_sql,
+)
+from app.database.result_cache import sql_result_cache
+from app.database.cost_guard import query_cost_guard
+from app.database.repository import BusinessRepository
+from app.database.result_set import ResultSet
+from app.database.history_writer import history_writer
 from app.agent.chat_bi_agent import ChatBIAgent
+from app.agent.template_compiler import template_compiler
 
 logger = logging.getLogger(__name__)
 
 
-def convert_decimals_to_float(obj: Any) -> Any:
-    """递归转换不可JSON序列化的类型"""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    elif isinstance(obj, (date, datetime)):
-        return obj.isoformat()
-    elif isinstance(obj, time):
-        return obj.strftime('%H:%M:%S')
-    elif isinstance(obj, dict):
-        return {key: convert_decimals_to_float(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_decimals_to_float(item) for item in obj]
-    elif isinstance(obj, tuple):
-        return tuple(convert_decimals_to_float(item) for item in obj)
-    else:
-        return obj
-
-
 async def query_db_sql(
-    user_question: str, session_id: Optional[str] = None
+    user_question: str,
+    session_id: Optional[str] = None,
+    result_format: str = Config.RESULT_WIRE_FORMAT,
 ) -> Dict[str, Any]:
     """Chat-BI核心查询接口"""
     query_id = str(uuid.uuid4())[:12]
@@ -42,67 +46,59 @@ async def query_db_sql(
     try:
         logger.info(f"开始处理查询 {query_id}: {user_question}")
 
-        user_embedding = get_text_embedding(user_question)
-        logger.debug("用户问题向量化完成")
-
-        matched_template = await search_similar_template(user_embedding, user_question)
-
-        if matched_template:
-            logger.info(f"匹配到SQL模板: {matched_template['description']}")
-
-            final_sql = await fill_template_with_parameters(
-                user_question,
-                matched_template["sql_text"],
-                matched_template.get("required_params", []),
+        cached = await question_cache.get(user_question)
+        if cached is not None:
+            logger.info(f"查询 {query_id} 命中问题结果缓存")
+            return await respond_from_cache(
+                query_id, user_question, cached, "question", result_format
             )
-        else:
-            logger.info("未匹配到合适模板，使用AI生成SQL")
-
-            final_sql = await ChatBIAgent.generate_sql(user_question)
-
-        validate_sql_query(final_sql)
-        final_sql = sanitize_sql_query(final_sql)
 
-        query_result = await BusinessRepository.execute_query(final_sql)
+        user_embedding = await get_text_embedding_async(user_question)
+        logger.debug("用户问题向量化完成")
 
-        viz_type = suggest_visualization_type(query_result)
+        cached = await semantic_cache.get(user_embedding)
+        if cached is not None:
+            logger.info(f"查询 {query_id} 命中语义答案缓存")
+            return await respond_from_cache(
+                query_id, user_question, cached, "semantic", result_format
+            )
 
-        answer = await ChatBIAgent.generate_answer(user_question, query_result)
+        final_sql, sql_params, matched_template = await resolve_sql(
+            user_question, user_embedding
+        )
 
-        if not matched_template and query_result:
-            await ChatBIAgent.save_template(user_question, final_sql, user_embedding)
+        query_started = time.monotonic()
+        query_result = await sql_result_cache.execute(final_sql, sql_params)
 
-        serializable_result = convert_decimals_to_float(query_result)
-        await SystemRepository.save_query_history(
-            query_id=query_id,
-            user_input=user_question,
-            sql_query=final_sql,
-            result=json.dumps(serializable_result, ensure_ascii=False),
-            visualization_type=viz_type,
+        # 图表推断与答案生成并行执行
+        answer, chart = await asyncio.gather(
+            ChatBIAgent.generate_answer(user_question, query_result),
+            asyncio.to_thread(build_visualization, query_result, final_sql),
         )
 
-        logger.info(f"查询 {query_id} 处理完成，返回 {len(query_result)} 条记录")
+        data = await finalize_query(
+            query_id,
+            user_question,
+            user_embedding,
+            final_sql,
+            sql_params,
+            matched_template,
+            query_result,
+            chart,
+            answer,
+            query_started,
+        )
 
         return {
             "success": True,
-            "data": {
-                "query_id": query_id,
-                "answer": answer,
-                "chart_data": {
-                    "type": viz_type,
-                    "data": convert_decimals_to_float(query_result),
-                    "config": generate_chart_config(viz_type, query_result),
-                },
-                "sql": final_sql,
-                "record_count": len(query_result),
-            },
+            "data": render_response(data, result_format),
             "message": "查询成功",
         }
 
     except Exception as e:
         logger.error(f"查询 {query_id} 处理失败: {e}")
 
-        await SystemRepository.save_query_history(
+        await submit_query_history(
             query_id=query_id, user_input=user_question, result=f"查询失败: {str(e)}"
         )
 
@@ -113,107 +109,335 @@ async def query_db_sql(
         }
 
 
-async def search_similar_template(
-    user_embedding: List[float], user_question: str
-) -> Optional[Dict[str, Any]]:
-    """在Milvus中搜索相似SQL模板"""
+async def stream_query_db_sql(
+    user_question: str,
+    session_id: Optional[str] = None,
+    result_format: str = Config.RESULT_WIRE_FORMAT,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """流式查询接口，按流水线阶段依次产出 (事件名, 数据)"""
+    query_id = str(uuid.uuid4())[:12]
+
     try:
-        if not milvus_client.has_collection("sql_templates"):
-            logger.warning("Milvus中不存在sql_templates集合")
-            return None
-
-        collection = milvus_client.get_collection("sql_templates")
-
-        search_results = collection.search(
-            data=[user_embedding],
-            anns_field="embedding",
-            param={"metric_type": "COSINE", "params": {"nprobe": 10}},
-            limit=1,
-            output_fields=[
-                "template_id",
-                "description",
-                "sql_text",
-                "scenario",
-                "required_params",
-            ],
+        logger.info(f"开始处理流式查询 {query_id}: {user_question}")
+        yield "start", {"query_id": query_id}
+
+        cache_type = "question"
+        cached = await question_cache.get(user_question)
+        user_embedding = None
+        if cached is None:
+            cache_type = "semantic"
+            user_embedding = await get_text_embedding_async(user_question)
+            cached = await semantic_cache.get(user_embedding)
+
+        if cached is not None:
+            logger.info(f"流式查询 {query_id} 命中{cache_type}缓存")
+            result = await respond_from_cache(
+                query_id, user_question, cached, cache_type, result_format
+            )
+            data = result["data"]
+            yield "sql", {"sql": data["sql"], "sql_params": data.get("sql_params") or {}}
+            if not data["chart_data"].get("reduction"):
+                yield "rows", {"offset": 0, "data": data["chart_data"]["data"]}
+            yield "chart", data["chart_data"]
+            yield "answer", {"delta": data["answer"]}
+            yield "done", data
+            return
+
+        final_sql, sql_params, matched_template = await resolve_sql(
+            user_question, user_embedding
+        )
+        yield "sql", {"sql": final_sql, "sql_params": sql_params}
+
+        # 服务端游标分块推送结果；总行数受注入的 LIMIT 约束，列式保留用于图表压缩
+        chunks = []
+        streamed = 0
+        query_started = time.monotonic()
+        async for chunk in BusinessRepository.stream_query(
+            final_sql, sql_params, chunk_size=Config.QUERY_STREAM_CHUNK_SIZE
+        ):
+            yield "rows", {"offset": streamed, "data": chunk.to_wire(result_format)}
+            streamed += len(chunk)
+            chunks.append(chunk)
+        query_result = ResultSet.concat(chunks)
+
+        # 列画像与图表压缩是CPU密集计算，放到线程中避免阻塞其他请求
+        chart = await asyncio.to_thread(build_visualization, query_result, final_sql)
+        yield "chart", {**chart, "data": chart["data"].to_wire(result_format)}
+
+        answer_parts = []
+        async for delta in ChatBIAgent.stream_answer(user_question, query_result):
+            answer_parts.append(delta)
+            yield "answer", {"delta": delta}
+        answer = "".join(answer_parts).strip()
+
+        data = await finalize_query(
+            query_id,
+            user_question,
+            user_embedding,
+            final_sql,
+            sql_params,
+            matched_template,
+            query_result,
+            chart,
+            answer,
+            query_started,
         )
+        yield "done", render_response(data, result_format)
 
-        if search_results[0] and len(search_results[0]) > 0:
-            best_match = search_results[0][0]
-            similarity_score = best_match.score
-
-            if similarity_score > 0.7:
-                return {
-                    "template_id": best_match.entity.get("template_id"),
-                    "description": best_match.entity.get("description"),
-                    "sql_text": best_match.entity.get("sql_text"),
-                    "scenario": best_match.entity.get("scenario"),
-                    "required_params": json.loads(
-                        best_match.entity.get("required_params", "[]")
-                    ),
-                    "similarity": similarity_score,
-                }
+    except Exception as e:
+        logger.error(f"流式查询 {query_id} 处理失败: {e}")
 
-        return None
+        await submit_query_history(
+            query_id=query_id, user_input=user_question, result=f"查询失败: {str(e)}"
+        )
 
-    except Exception as e:
-        logger.error(f"Milvus搜索失败: {e}")
-        return None
+        yield "error", {"code": 500, "message": f"查询处理失败: {str(e)}"}
 
 
-async def fill_template_with_parameters(
-    user_question: str, sql_template: str, required_params: List[str]
-) -> str:
-    """提取参数并填充SQL模板"""
+async def resolve_sql(
+    user_question: str, user_embedding: List[float]
+) -> Tuple[str, Dict[str, Any], Optional[Dict[str, Any]]]:
+    """匹配模板或由AI生成SQL，返回 (SQL, 绑定参数, 命中的模板)
+
+    模板在编译时已完成校验与行数限制，命中后只绑定参数；AI生成的SQL需完整校验、清理。
+    两者都经过代价准入。
+    """
+    matched_template = await search_similar_template(user_embedding, user_question)
+
+    if matched_template:
+        logger.info(f"匹配到SQL模板: {matched_template['description']}")
+        try:
+            final_sql, sql_params = await fill_template_with_parameters(
+                user_question, matched_template
+            )
+        except ValueError as e:
+            logger.warning(f"模板参数绑定失败，改用AI生成SQL: {e}")
+            matched_template = None
+        else:
+            final_sql = await query_cost_guard.admit(final_sql, sql_params)
+            return final_sql, sql_params, matched_template
+
+    logger.info("未使用模板，由AI生成SQL")
+    final_sql = await ChatBIAgent.generate_sql(
+        user_question, user_embedding=user_embedding
+    )
+
+    final_sql = check_sql_query(final_sql)
+    final_sql = await query_cost_guard.admit(final_sql)
+    final_sql = enforce_row_limit(final_sql, Config.QUERY_MAX_ROWS)
+    return final_sql, {}, matched_template
+
+
+async def fetch_page(
+    sql: str,
+    offset: int = 0,
+    page_size: int = Config.QUERY_PAGE_SIZE,
+    params: Optional[Dict[str, Any]] = None,
+) -> Tuple[ResultSet, Optional[str]]:
+    """读取一页结果（多取一行判断是否还有下一页），返回 (行, 下一页令牌)"""
+    rows = await sql_result_cache.execute(
+        paginate_sql(sql, offset, page_size + 1), params
+    )
+
+    next_page_token = None
+    if len(rows) > page_size:
+        rows = rows.head(page_size)
+        next_page_token = encode_page_token(sql, offset + page_size, params)
+    return rows, next_page_token
+
+
+async def query_next_page(
+    page_token: str, result_format: str = Config.RESULT_WIRE_FORMAT
+) -> Dict[str, Any]:
+    """按分页令牌读取后续结果"""
     try:
-        if not required_params:
-            return sql_template
+        sql, offset, params = decode_page_token(page_token)
+        validate_sql_query(sql)
 
-        params, ambiguities = await ParameterResolver.resolve_parameters(
-            user_question, required_params
+        rows, next_page_token = await fetch_page(sql, offset, params=params)
+        return {
+            "success": True,
+            "data": {
+                "data": rows.to_wire(result_format),
+                "offset": offset,
+                "record_count": len(rows),
+                "next_page_token": next_page_token,
+            },
+            "message": "查询成功",
+        }
+
+    except Exception as e:
+        logger.error(f"分页查询失败: {e}")
+        return {
+            "success": False,
+            "data": {},
+            "error": {"code": 400, "message": f"分页查询失败: {str(e)}"},
+        }
+
+
+def build_visualization(query_result: ResultSet, sql: Optional[str] = None) -> Dict[str, Any]:
+    """列画像（单次向量化统计）后推断可视化类型、生成图表配置并压缩图表数据"""
+    profile = profile_columns(query_result)
+    viz_type = suggest_visualization_type(query_result, profile)
+    config = generate_chart_config(viz_type, query_result, profile)
+    chart_rows, reduction = reduce_chart_data(query_result, viz_type, config, profile, sql=sql)
+    if reduction:
+        config["columns"] = chart_rows.columns
+    return {
+        "type": viz_type,
+        "config": config,
+        "profile": profile,
+        "reduction": reduction,
+        "data": chart_rows,
+    }
+
+
+async def finalize_query(
+    query_id: str,
+    user_question: str,
+    user_embedding: List[float],
+    final_sql: str,
+    sql_params: Dict[str, Any],
+    matched_template: Optional[Dict[str, Any]],
+    query_result: ResultSet,
+    chart: Dict[str, Any],
+    answer: str,
+    query_started: float,
+) -> Dict[str, Any]:
+    """写入缓存并返回响应数据，模板保存与历史记录交由后台任务队列
+
+    query_started 为查询开始执行的 time.monotonic()；依赖表在复制延迟窗口内变更过时，
+    结果可能来自延迟的副本，不写入问题缓存与语义缓存。
+    """
+    if not matched_template and query_result:
+        background_tasks.submit(
+            f"save_template:{query_id}",
+            lambda: ChatBIAgent.save_template(user_question, final_sql),
         )
 
-        if ambiguities:
-            logger.warning(f"参数解析存在歧义: {ambiguities}")
+    await submit_query_history(
+        query_id=query_id,
+        user_input=user_question,
+        sql_query=(
+            f"{final_sql} -- params: {dumps_str(sql_params)}" if sql_params else final_sql
+        ),
+        result=query_result,
+        visualization_type=chart["type"],
+    )
+
+    logger.info(f"查询 {query_id} 处理完成，返回 {len(query_result)} 条记录")
+
+    # 图表数据为聚合/降采样结果时，原始行从第一行起通过分页获取；
+    # 没有最外层 ORDER BY 的SQL各次执行行序不定，不签发分页令牌
+    reduction = chart["reduction"]
+    shown = 0 if reduction and reduction["method"] != "page" else len(chart["data"])
+    next_page_token = None
+    if len(query_result) > shown and has_order_by(final_sql):
+        next_page_token = encode_page_token(final_sql, shown, sql_params)
+
+    # chart_data.data 保持列式结果，输出前由 render_response 转换为传输格式
+    data = {
+        "query_id": query_id,
+        "answer": answer,
+        "chart_data": chart,
+        "sql": final_sql,
+        "sql_params": sql_params,
+        "record_count": len(query_result),
+        "next_page_token": next_page_token,
+    }
+    if sql_result_cache.is_cacheable(final_sql, query_started):
+        tables = extract_tables(final_sql)
+        question_cache.set(user_question, data, tables=tables)
+        semantic_cache.add(user_question, user_embedding, data, tables=tables)
+    else:
+        logger.info(f"查询 {query_id} 的依赖表刚发生变更，不写入问题缓存与语义缓存")
+    return data
+
 
-        filled_sql = sql_template
-        for param_name, param_value in params.items():
-            placeholder = f"{{{param_name}}}"
-            filled_sql = filled_sql.replace(placeholder, str(param_value))
+def render_response(data: Dict[str, Any], result_format: str) -> Dict[str, Any]:
+    """将响应中的列式结果转换为指定传输格式（不修改缓存中的原对象）"""
+    chart_data = data["chart_data"]
+    return {
+        **data,
+        "chart_data": {**chart_data, "data": chart_data["data"].to_wire(result_format)},
+    }
 
-        return filled_sql
 
+async def submit_query_history(**history):
+    """提交查询历史到缓冲写入器"""
+    try:
+        await history_writer.write(**history)
     except Exception as e:
-        logger.error(f"模板参数填充失败: {e}")
-        return sql_template
+        logger.error(f"提交查询历史失败: {e}")
 
 
-def generate_chart_config(viz_type: str, data: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """生成图表配置"""
-    if not data:
-        return {}
-
-    columns = list(data[0].keys())
-    
-    config = {
-        "title": "数据可视化",
-        "columns": columns
+async def respond_from_cache(
+    query_id: str,
+    user_question: str,
+    cached: Dict[str, Any],
+    cache_type: str,
+    result_format: str = Config.RESULT_WIRE_FORMAT,
+) -> Dict[str, Any]:
+    """以缓存的响应作答，仅记录本次查询历史"""
+    cached.update({"query_id": query_id, "cached": cache_type})
+    await submit_query_history(
+        query_id=query_id,
+        user_input=user_question,
+        sql_query=cached["sql"],
+        result=cached["chart_data"]["data"],
+        visualization_type=cached["chart_data"]["type"],
+    )
+    return {
+        "success": True,
+        "data": render_response(cached, result_format),
+        "message": "查询成功",
     }
-    
-    if viz_type == "bar":
-        config.update({
-            "xField": columns[0] if columns else "",
-            "yField": columns[1] if len(columns) > 1 else "",
-        })
-    elif viz_type == "line":
-        config.update({
-            "xField": columns[0] if columns else "",
-            "yField": columns[1] if len(columns) > 1 else "",
-        })
-    elif viz_type == "pie":
-        config.update({
-            "angleField": columns[1] if len(columns) > 1 else "",
-            "colorField": columns[0] if columns else "",
-        })
-    
-    return config
+
+
+async def search_similar_template(
+    user_embedding: List[float], user_question: str
+) -> Optional[Dict[str, Any]]:
+    """在模板向量索引中检索 top-k 候选并重排，选出最合适的SQL模板"""
+    try:
+        candidates = await template_index.search(
+            user_embedding, limit=Config.TEMPLATE_SEARCH_TOP_K
+        )
+        return select_template(user_question, candidates)
+
+    except Exception as e:
+        logger.error(f"模板检索失败: {e}")
+        return None
+
+
+async def search_similar_templates_batch(
+    user_embeddings: List[List[float]], user_questions: List[str]
+) -> List[Optional[Dict[str, Any]]]:
+    """批量模板匹配（单次向量检索），用于离线评估"""
+    results = await template_index.search_batch(
+        user_embeddings, limit=Config.TEMPLATE_SEARCH_TOP_K
+    )
+    return [
+        select_template(question, candidates)
+        for question, candidates in zip(user_questions, results)
+    ]
+
+
+async def fill_template_with_parameters(
+    user_question: str, template: Dict[str, Any]
+) -> Tuple[str, Dict[str, Any]]:
+    """提取参数并绑定到编译后的SQL模板，返回 (SQL, 绑定参数)
+
+    参数缺失或类型不符时抛出 ValueError。
+    """
+    compiled = await template_compiler.get(template)
+    if not compiled.param_types:
+        return compiled.bind({})
+
+    params, ambiguities = await ParameterResolver.resolve(
+        user_question, compiled.param_types
+    )
+
+    if ambiguities:
+        logger.warning(f"参数解析存在歧义: {ambiguities}")
+
+    return compiled.bind(params)
@@ -0,0 +1,5 @@
+import os
+
+# 单元测试不连接数据库与模型服务，只需满足配置中的必填项
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("DB_PASSWORD", "test")
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from app.common.chart_reducer import (
+    OTHER_LABEL,
+    additive_measures,
+    lttb_indices,
+    reduce_chart_data,
+    reduce_top_n,
+)
+from app.database.result_set import ResultSet
+
+
+def category_result(count=30):
+    return ResultSet.from_records(
+        [
+            {"category": f"c{i:02d}", "total": float(i), "avg_price": 100.0 - i}
+            for i in range(count)
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("SELECT category, SUM(amount) AS total, AVG(price) AS avg_price FROM t GROUP BY category", {"total"}),
+        ("SELECT category, ROUND(SUM(amount), 2) total, COUNT(*) AS avg_price FROM t GROUP BY category", {"total", "avg_price"}),
+        ("SELECT category, COUNT(DISTINCT customer_id) AS total FROM t GROUP BY category", set()),
+        ("SELECT category, SUM(amount) / COUNT(*) AS total FROM t GROUP BY category", set()),
+    ],
+)
+def test_additive_measures_from_sql(sql, expected):
+    assert additive_measures(["total", "avg_price"], sql) == expected
+
+
+def test_additive_measures_from_column_names():
+    measures = ["total_amount", "order_count", "销售额", "avg_amount", "unit_price", "转化率", "score"]
+    assert additive_measures(measures) == {"total_amount", "order_count", "销售额"}
+
+
+def test_top_n_merges_other_for_additive_measures():
+    reduced = reduce_top_n(category_result(), "category", ["total"], 5, frozenset({"total"}))
+    records = reduced.to_records()
+    assert [r["category"] for r in records] == ["c29", "c28", "c27", "c26", OTHER_LABEL]
+    assert records[-1]["total"] == sum(range(26))
+
+
+def test_top_n_truncates_without_other_for_non_additive_measures():
+    data = category_result()
+    reduced = reduce_top_n(data, "category", ["total", "avg_price"], 5, frozenset({"total"}))
+    records = reduced.to_records()
+    assert [r["category"] for r in records] == ["c29", "c28", "c27", "c26", "c25"]
+    assert OTHER_LABEL not in [r["category"] for r in records]
+    assert records[0]["avg_price"] == 71.0
+
+
+def test_reduce_chart_data_uses_sql_to_decide_merge():
+    data = category_result()
+    profile = [
+        {"name": "category", "numeric": False, "is_time": False},
+        {"name": "avg_price", "numeric": True, "is_time": False},
+    ]
+    config = {"xField": "category", "yField": "avg_price"}
+    sql = "SELECT category, AVG(price) AS avg_price FROM t GROUP BY category"
+
+    reduced, reduction = reduce_chart_data(data, "bar", config, profile, top_n=10, sql=sql)
+    assert reduction["method"] == "top_n" and len(reduced) == 10
+    assert OTHER_LABEL not in reduced.column("category").raw_list()
+    assert reduced.column("avg_price").raw_list()[0] == 100.0
+
+
+def test_lttb_keeps_endpoints_and_peak():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[500] = 10.0
+    kept = lttb_indices(x, y, 50)
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999 and 500 in kept
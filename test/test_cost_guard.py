@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import pytest
+
+from app.config.app_config import Config
+from app.database import cost_guard as cost_guard_module
+from app.database.cost_guard import QueryCostGuard, summarize_plan
+
+
+def table(name, access_type, rows, produced=None):
+    return {
+        "table": {
+            "table_name": name,
+            "access_type": access_type,
+            "rows_examined_per_scan": rows,
+            "rows_produced_per_join": produced if produced is not None else rows,
+        }
+    }
+
+
+def plan(*tables, **extra):
+    block = {"select_id": 1, "cost_info": {"query_cost": "1000.00"}, **extra}
+    if len(tables) == 1:
+        block.update(tables[0])
+    else:
+        block["nested_loop"] = list(tables)
+    return {"query_block": block}
+
+
+FULL_SCAN = plan(table("sales", "ALL", 200000))
+CARTESIAN = plan(table("sales", "ALL", 3000), table("customer", "ALL", 3000, produced=9000000))
+INDEX_RANGE = plan(table("sales", "range", 5000))
+
+
+@pytest.fixture
+def guard(monkeypatch):
+    """按 SQL 返回预设执行计划的代价准入"""
+    plans = {}
+
+    async def execute_query(sql, params=None):
+        return [{"EXPLAIN": json.dumps(plans[sql.replace("EXPLAIN FORMAT=JSON ", "", 1)])}]
+
+    monkeypatch.setattr(Config, "QUERY_COST_GUARD_ENABLED", True)
+    monkeypatch.setattr(Config, "QUERY_MAX_ESTIMATED_ROWS", 5000000)
+    monkeypatch.setattr(Config, "QUERY_FULL_SCAN_ROWS", 100000)
+    monkeypatch.setattr(
+        cost_guard_module.BusinessRepository, "execute_query", staticmethod(execute_query)
+    )
+    instance = QueryCostGuard()
+    instance.plans_by_sql = plans
+    return instance
+
+
+def admit(guard, sql, plan_json):
+    guard.plans_by_sql[sql] = plan_json
+    return asyncio.run(guard.admit(sql))
+
+
+def test_summarize_cartesian_join_accumulates_fan_out():
+    summary = summarize_plan(CARTESIAN)
+    assert summary["estimated_rows"] == 9000000
+    assert [t["table_name"] for t in summary["tables"]] == ["sales", "customer"]
+    assert summary["query_cost"] == 1000.0
+
+
+def test_summarize_records_grouping():
+    summary = summarize_plan(plan(table("sales", "ALL", 10), grouping_operation={"using_filesort": False}))
+    assert summary["aggregates"] is True
+    assert summarize_plan(FULL_SCAN)["aggregates"] is False
+
+
+def test_cartesian_join_is_rejected(guard):
+    with pytest.raises(ValueError):
+        admit(guard, "SELECT * FROM sales, customer", CARTESIAN)
+    assert guard.rejected == 1
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT SUM(total_amount) FROM sales",
+        "SELECT product_id, COUNT(*) FROM sales GROUP BY product_id",
+        "SELECT * FROM sales ORDER BY sale_date DESC",
+        "SELECT DISTINCT customer_id FROM sales",
+    ],
+)
+def test_full_scan_that_reads_every_row_is_rejected(guard, sql):
+    with pytest.raises(ValueError):
+        admit(guard, sql, FULL_SCAN)
+
+
+def test_full_scan_inside_join_is_rejected(guard):
+    joined = plan(table("sales", "ALL", 200000), table("product", "eq_ref", 1, produced=200000))
+    with pytest.raises(ValueError):
+        admit(guard, "SELECT s.*, p.product_name FROM sales s JOIN product p ON s.product_id = p.product_id", joined)
+
+
+def test_detail_full_scan_and_index_range_are_admitted_unchanged(guard):
+    assert admit(guard, "SELECT * FROM sales", FULL_SCAN) == "SELECT * FROM sales"
+    sql = "SELECT SUM(total_amount) FROM sales WHERE sale_date >= '2024-01-01'"
+    assert admit(guard, sql, INDEX_RANGE) == sql
+    assert guard.admitted == 2 and guard.rejected == 0
+    assert "rewritten" not in guard.stats()
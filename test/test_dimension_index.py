@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.common import dimension_index as dimension_index_module
+from app.common.dimension_index import DimensionIndex
+
+T0 = datetime(2024, 1, 1, 8, 0, 0)
+T1 = datetime(2024, 1, 2, 8, 0, 0)
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    """内存中的维度表，按 SQL 中的表名返回行"""
+    data = {
+        "category": [{"id": 1, "value": "手机"}, {"id": 2, "value": "平板"}],
+        "product": [
+            {"id": 1, "value": "华为平板", "updated_at": T0},
+            {"id": 2, "value": "小米手机", "updated_at": T0},
+        ],
+        "customer": [{"id": 1, "value": "张三"}],
+    }
+
+    async def execute_query(sql, params=None):
+        for table, rows in data.items():
+            if f"FROM `{table}`" in sql:
+                since = (params or {}).get("since")
+                return [row for row in rows if since is None or row["updated_at"] >= since]
+        raise AssertionError(sql)
+
+    monkeypatch.setattr(
+        dimension_index_module.BusinessRepository, "execute_query", staticmethod(execute_query)
+    )
+    return data
+
+
+def test_tag_and_fuzzy_match(tables):
+    index = DimensionIndex()
+
+    entities = asyncio.run(index.tag("上个月华为平板的销量"))
+    assert [(e["column"], e["value"]) for e in entities] == [("product_name", "华为平板")]
+
+    assert asyncio.run(index.match("product_name", "华为平版卖了多少")) == "华为平板"
+    assert asyncio.run(index.match("category_name", "平板类的销售额")) == "平板"
+
+
+def test_refresh_rebuilds_only_changed_columns(tables):
+    index = DimensionIndex()
+
+    async def scenario():
+        await index.refresh(full=True)
+        before = dict(index._indexes)
+
+        # 只有库存等字段更新：取值不变，不重建
+        tables["product"][0]["updated_at"] = T1
+        await index.refresh()
+        assert index._indexes == before
+
+        tables["product"].append({"id": 3, "value": "荣耀笔记本", "updated_at": T1})
+        await index.refresh()
+        assert index._indexes["product_name"] is not before["product_name"]
+        assert index._indexes["category_name"] is before["category_name"]
+        assert index._indexes["username"] is before["username"]
+        return await index.tag("荣耀笔记本的订单")
+
+    entities = asyncio.run(scenario())
+    assert [e["value"] for e in entities] == ["荣耀笔记本"]
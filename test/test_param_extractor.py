@@ -0,0 +1,109 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.common.param_extractor import extract_date_ranges, extract_parameters
+
+TODAY = date(2026, 10, 18)
+
+
+def extract(question, **param_types):
+    return asyncio.run(extract_parameters(question, param_types, TODAY))
+
+
+def test_date_part_and_before_params():
+    params = extract(
+        "2024年3月的销售额",
+        sale_date_year="integer",
+        sale_date_month="integer",
+        sale_date_start="date",
+        sale_date_before="date",
+    )
+    assert params == {
+        "sale_date_year": 2024,
+        "sale_date_month": 3,
+        "sale_date_start": date(2024, 3, 1),
+        "sale_date_before": date(2024, 4, 1),
+    }
+
+
+@pytest.mark.parametrize(
+    "question, expected",
+    [("最近7天的订单", 7), ("近三个月的订单", 93), ("上个月的订单", None)],
+)
+def test_interval_day_param(question, expected):
+    assert extract(question, interval_day="integer").get("interval_day") == expected
+
+
+def test_interval_month_param():
+    assert extract("近三个月的订单", interval_month="integer") == {"interval_month": 3}
+
+
+def test_relative_month_range():
+    assert extract_date_ranges("上个月各分类销售额", TODAY)[0] == [
+        (date(2026, 9, 1), date(2026, 9, 30))
+    ]
+
+
+@pytest.mark.parametrize(
+    "question",
+    ["2023年Q4销售额", "2023Q4销售额", "2023-Q4销售额", "2023 q4销售额", "2023年第四季度销售额", "2023年4季度销售额"],
+)
+def test_absolute_quarter(question):
+    ranges, _ = extract_date_ranges(question, TODAY)
+    assert ranges == [(date(2023, 10, 1), date(2023, 12, 31))]
+
+
+@pytest.mark.parametrize(
+    "question, expected",
+    [
+        ("去年Q4的订单", [(date(2025, 10, 1), date(2025, 12, 31))]),
+        ("今年第一季度的订单", [(date(2026, 1, 1), date(2026, 3, 31))]),
+        ("上季度的订单", [(date(2026, 7, 1), date(2026, 9, 30))]),
+        ("2023年的订单", [(date(2023, 1, 1), date(2023, 12, 31))]),
+        ("2024年2月的订单", [(date(2024, 2, 1), date(2024, 2, 29))]),
+        ("2024-05-06的订单", [(date(2024, 5, 6), date(2024, 5, 6))]),
+        ("3月5日的订单", [(date(2026, 3, 5), date(2026, 3, 5))]),
+        ("昨天的订单", [(date(2026, 10, 17), date(2026, 10, 17))]),
+    ],
+)
+def test_date_rules(question, expected):
+    assert extract_date_ranges(question, TODAY)[0] == expected
+
+
+def test_two_ranges_keep_question_order():
+    ranges, remaining = extract_date_ranges("对比2024年3月和2025年3月的销售额", TODAY)
+    assert ranges == [
+        (date(2024, 3, 1), date(2024, 3, 31)),
+        (date(2025, 3, 1), date(2025, 3, 31)),
+    ]
+    assert "2024" not in remaining and "2025" not in remaining
+
+
+@pytest.mark.parametrize(
+    "question, param_types, expected",
+    [
+        ("客户123的订单", {"customer_id": "integer"}, {"customer_id": 123}),
+        ("金额大于500的订单", {"total_amount": "decimal"}, {"total_amount": 500}),
+        ("库存低于20的商品", {"stock_quantity": "integer"}, {"stock_quantity": 20}),
+        ("2024年3月的订单", {"customer_date": "date"}, {"customer_date": date(2024, 3, 1)}),
+        (
+            "价格在100到200之间的商品",
+            {"min_price": "decimal", "max_price": "decimal"},
+            {"min_price": 100, "max_price": 200},
+        ),
+        (
+            "2024年3月的订单",
+            {"startDate": "date", "endDate": "date"},
+            {"startDate": date(2024, 3, 1), "endDate": date(2024, 3, 31)},
+        ),
+    ],
+)
+def test_param_name_words_match_whole_tokens(question, param_types, expected):
+    assert extract(question, **param_types) == expected
+
+
+@pytest.mark.parametrize("question", ["第3季度的销售额", "三季度的销售额", "Q3的销售额"])
+def test_quarter_without_year_uses_current_year(question):
+    assert extract_date_ranges(question, TODAY)[0] == [(date(2026, 7, 1), date(2026, 9, 30))]
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from app.common import question_cache as question_cache_module
+from app.common.question_cache import QuestionCache, normalize_question
+from app.config.app_config import Config
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("价格大于1.5的商品", "价格大于15的商品"),
+        ("利润小于-5的订单", "利润小于5的订单"),
+        ("2024-03-01的订单", "20240301的订单"),
+        ("2024/3/1的订单", "202431的订单"),
+        ("销量前1 5的商品", "销量前15的商品"),
+    ],
+)
+def test_numbers_keep_their_punctuation(first, second):
+    assert normalize_question(first) != normalize_question(second)
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("各分类的销售额？", "各分类的销售额"),
+        ("ＴＯＰ１０ 客户！", "top10客户"),
+        ("  上个月，华为 的销量。", "上个月华为的销量"),
+        ("价格大于1.5。", "价格大于1.5"),
+        ("销量前1   5的商品", "销量前1 5的商品"),
+    ],
+)
+def test_equivalent_questions_share_a_key(first, second):
+    assert normalize_question(first) == normalize_question(second)
+
+
+def test_normalized_lookup_does_not_cross_numbers(monkeypatch):
+    async def no_version_check(force=False):
+        return set()
+
+    monkeypatch.setattr(Config, "QUESTION_CACHE_ENABLED", True)
+    monkeypatch.setattr(question_cache_module.table_version_tracker, "check", no_version_check)
+    cache = QuestionCache()
+    cache.set("价格大于1.5的商品", {"sql": "SELECT 1.5"}, tables=["product"])
+
+    async def lookup():
+        return (
+            await cache.get("价格大于 1.5 的商品？"),
+            await cache.get("价格大于15的商品"),
+        )
+
+    hit, miss = asyncio.run(lookup())
+    assert hit == {"sql": "SELECT 1.5"}
+    assert miss is None
@@ -0,0 +1,200 @@
+import asyncio
+
+import pytest
+
+from app.config.app_config import Config
+from app.database import result_cache as result_cache_module
+from app.database.result_cache import SQLResultCache
+from app.database.result_set import ResultSet
+
+SQL = "SELECT category, SUM(total_amount) AS total FROM sales GROUP BY category"
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """可控的业务库：记录执行次数，每次查询等待 release 事件"""
+    state = {"calls": 0, "release": None, "error": None}
+
+    async def execute_result_set(sql, params=None):
+        state["calls"] += 1
+        await state["release"].wait()
+        if state["error"] is not None:
+            raise state["error"]
+        return ResultSet.from_records([{"category": "A", "total": 1}])
+
+    async def no_version_check(force=False):
+        return set()
+
+    monkeypatch.setattr(Config, "SQL_RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr(
+        result_cache_module.BusinessRepository, "execute_result_set", staticmethod(execute_result_set)
+    )
+    monkeypatch.setattr(result_cache_module.table_version_tracker, "check", no_version_check)
+    return state
+
+
+def run(coroutine_factory):
+    async def main():
+        return await asyncio.wait_for(coroutine_factory(), timeout=2)
+
+    return asyncio.run(main())
+
+
+def test_concurrent_requests_share_one_execution(database):
+    async def scenario():
+        database["release"] = asyncio.Event()
+        cache = SQLResultCache()
+        first = asyncio.create_task(cache.execute(SQL))
+        second = asyncio.create_task(cache.execute(SQL))
+        await asyncio.sleep(0)
+        database["release"].set()
+        return await asyncio.gather(first, second), cache
+
+    (first, second), cache = run(scenario)
+    assert database["calls"] == 1
+    assert first is second
+    assert cache.stats()["entries"] == 1
+
+
+def test_waiter_survives_cancelled_leader(database):
+    async def scenario():
+        database["release"] = asyncio.Event()
+        cache = SQLResultCache()
+        leader = asyncio.create_task(cache.execute(SQL))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.execute(SQL))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        database["release"].set()
+        result = await waiter
+        return leader, result, cache
+
+    leader, result, cache = run(scenario)
+    assert leader.cancelled()
+    assert result.to_records() == [{"category": "A", "total": 1}]
+    # 发起方取消后等待方重新执行了一次查询
+    assert database["calls"] == 2
+    assert cache._inflight == {}
+
+
+def test_cancelled_waiter_does_not_affect_leader(database):
+    async def scenario():
+        database["release"] = asyncio.Event()
+        cache = SQLResultCache()
+        leader = asyncio.create_task(cache.execute(SQL))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.execute(SQL))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        await asyncio.sleep(0)
+        database["release"].set()
+        return await leader, waiter
+
+    result, waiter = run(scenario)
+    assert waiter.cancelled()
+    assert len(result) == 1
+    assert database["calls"] == 1
+
+
+def test_leader_error_propagates_to_waiters(database):
+    async def scenario():
+        database["release"] = asyncio.Event()
+        database["error"] = RuntimeError("boom")
+        cache = SQLResultCache()
+        tasks = [asyncio.create_task(cache.execute(SQL)) for _ in range(2)]
+        await asyncio.sleep(0)
+        database["release"].set()
+        return await asyncio.gather(*tasks, return_exceptions=True), cache
+
+    results, cache = run(scenario)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert database["calls"] == 1
+    assert cache._inflight == {}
+
+
+def test_result_not_cached_when_table_changes_during_query(database):
+    async def scenario():
+        database["release"] = asyncio.Event()
+        cache = SQLResultCache()
+        task = asyncio.create_task(cache.execute(SQL))
+        await asyncio.sleep(0)
+        cache._on_tables_changed({"SALES"})
+        database["release"].set()
+        await task
+        return cache
+
+    assert run(scenario).stats()["entries"] == 0
+
+
+@pytest.mark.parametrize("replicas, window, cached", [([object()], 60, 0), ([object()], 0, 1), ([], 60, 1)])
+def test_replica_lag_window_after_invalidation(database, monkeypatch, replicas, window, cached):
+    monkeypatch.setattr(result_cache_module, "replica_pools", replicas)
+    monkeypatch.setattr(Config, "DB_REPLICA_LAG_WINDOW", window)
+
+    async def scenario():
+        database["release"] = asyncio.Event()
+        database["release"].set()
+        cache = SQLResultCache()
+        cache._on_tables_changed({"sales"})
+        await cache.execute(SQL)
+        return cache
+
+    assert run(scenario).stats()["entries"] == cached
+
+
+def test_is_cacheable_follows_lag_window(monkeypatch):
+    import time
+
+    monkeypatch.setattr(result_cache_module, "replica_pools", [object()])
+    monkeypatch.setattr(Config, "DB_REPLICA_LAG_WINDOW", 60)
+    cache = SQLResultCache()
+    started = time.monotonic()
+    assert cache.is_cacheable(SQL, started)
+
+    cache._on_tables_changed({"orders"})
+    assert cache.is_cacheable(SQL, started)
+    cache._on_tables_changed({"sales"})
+    assert not cache.is_cacheable(SQL, started)
+    # 未配置副本时只看查询开始之后的变更
+    monkeypatch.setattr(result_cache_module, "replica_pools", [])
+    assert cache.is_cacheable(SQL, time.monotonic())
+
+
+@pytest.mark.parametrize("changed, cached", [(False, True), (True, False)])
+def test_finalize_query_skips_upper_caches_for_stale_results(database, monkeypatch, changed, cached):
+    import time
+
+    from app.server.service import query as query_service
+
+    writes = []
+
+    async def no_history(**history):
+        pass
+
+    monkeypatch.setattr(result_cache_module, "replica_pools", [object()])
+    monkeypatch.setattr(Config, "DB_REPLICA_LAG_WINDOW", 60)
+    monkeypatch.setattr(query_service, "submit_query_history", no_history)
+    monkeypatch.setattr(query_service.question_cache, "set", lambda *a, **k: writes.append("question"))
+    monkeypatch.setattr(query_service.semantic_cache, "add", lambda *a, **k: writes.append("semantic"))
+    cache = query_service.sql_result_cache
+    monkeypatch.setattr(cache, "_changed_at", {})
+
+    async def scenario():
+        database["release"] = asyncio.Event()
+        database["release"].set()
+        started = time.monotonic()
+        if changed:
+            cache._on_tables_changed({"sales"})
+        result = await cache.execute(SQL)
+        chart = {"type": "table", "reduction": None, "data": result}
+        return await query_service.finalize_query(
+            "q1", "各分类销售额", [0.1], SQL, {}, {"template_id": 1}, result, chart, "答案", started
+        )
+
+    data = run(scenario)
+    assert data["record_count"] == 1
+    assert writes == (["question", "semantic"] if cached else [])
+    cache.clear()
@@ -0,0 +1,158 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.agent.template_compiler import coerce_param, compile_template, parameterize_sql
+from app.config.app_config import Config
+
+
+def compile_with(sql, **types):
+    return compile_template(sql, tuple(sorted(types.items())))
+
+
+def test_quoted_placeholders_become_bind_params():
+    compiled = compile_with(
+        "SELECT * FROM sales WHERE sale_date >= '{start_date}' AND region = '{region}'",
+        start_date="date",
+    )
+    assert compiled.sql == (
+        "SELECT * FROM sales WHERE sale_date >= :start_date AND region = :region "
+        f"LIMIT {Config.QUERY_MAX_ROWS}"
+    )
+    assert compiled.param_types == {"start_date": "date", "region": "string"}
+
+
+def test_like_placeholder_is_concatenated():
+    compiled = compile_with("SELECT * FROM product WHERE product_name LIKE '%{keyword}%'")
+    assert "LIKE CONCAT('%', :keyword, '%')" in compiled.sql
+
+
+def test_line_comment_is_stripped_before_row_limit():
+    compiled = compile_with("SELECT * FROM sales WHERE d >= '{start_date}' -- by date")
+    assert "--" not in compiled.sql
+    assert compiled.sql.endswith(f":start_date LIMIT {Config.QUERY_MAX_ROWS}")
+
+
+def test_block_comment_is_stripped():
+    compiled = compile_with("SELECT * /* all columns */ FROM sales")
+    assert "/*" not in compiled.sql
+
+
+def test_plain_literals_before_placeholders_are_untouched():
+    compiled = compile_with(
+        "SELECT DATE_FORMAT(sale_date, '%Y-%m') AS m, 'it''s' AS x FROM sales "
+        "WHERE total_amount < {max_amount} AND sale_date < '{before}'"
+    )
+    assert "DATE_FORMAT(sale_date, '%Y-%m')" in compiled.sql
+    assert "'it''s'" in compiled.sql
+    assert "total_amount < :max_amount AND sale_date < :before" in compiled.sql
+
+
+def test_limit_placeholder_is_inlined_as_integer():
+    compiled = compile_with(
+        "SELECT * FROM product ORDER BY price DESC LIMIT {top_n} -- top", top_n="integer"
+    )
+    assert compiled.inline_params == ("top_n",)
+    sql, params = compiled.bind({"top_n": "5"})
+    assert sql.endswith("LIMIT 5")
+    assert params == {}
+
+
+def test_inlined_limit_is_capped():
+    compiled = compile_with("SELECT * FROM product LIMIT {top_n}", top_n="integer")
+    sql, _ = compiled.bind({"top_n": Config.QUERY_MAX_ROWS * 10})
+    assert sql.endswith(f"LIMIT {Config.QUERY_MAX_ROWS}")
+
+
+def test_bind_coerces_values():
+    compiled = compile_with(
+        "SELECT * FROM sales WHERE sale_date >= '{start_date}' AND total_amount > {min_amount}",
+        start_date="date",
+        min_amount="decimal",
+    )
+    _, params = compiled.bind({"start_date": "2024/03/01", "min_amount": "1,000.50"})
+    assert params == {"start_date": date(2024, 3, 1), "min_amount": Decimal("1000.50")}
+
+
+def test_bind_rejects_missing_and_invalid_values():
+    compiled = compile_with("SELECT * FROM sales WHERE sale_date >= '{start_date}'", start_date="date")
+    with pytest.raises(ValueError):
+        compiled.bind({})
+    with pytest.raises(ValueError):
+        compiled.bind({"start_date": "上个月"})
+
+
+def test_dangerous_template_is_rejected():
+    with pytest.raises(ValueError):
+        compile_with("DELETE FROM sales WHERE sale_id = {sale_id}")
+
+
+@pytest.mark.parametrize(
+    "value, param_type, expected",
+    [
+        ("42", "integer", 42),
+        ("3.0", "decimal", 3),
+        ("2024-01-02", "date", date(2024, 1, 2)),
+        (7, "string", "7"),
+    ],
+)
+def test_coerce_param(value, param_type, expected):
+    assert coerce_param(value, param_type) == expected
+
+
+def test_parameterize_replaces_comparison_literals():
+    sql, param_types = parameterize_sql(
+        "SELECT c.category_name, SUM(s.total_amount) AS total FROM sales s "
+        "JOIN product p ON s.product_id = p.product_id "
+        "JOIN category c ON p.category_id = c.category_id "
+        "WHERE YEAR(s.sale_date) = 2024 AND s.sale_date BETWEEN '2024-01-01' AND '2024-03-31' "
+        "AND c.category_name = '电子产品' AND p.product_name LIKE '%手机%' "
+        "GROUP BY c.category_name HAVING SUM(s.total_amount) > 1000 "
+        f"ORDER BY total DESC LIMIT {Config.QUERY_MAX_ROWS}"
+    )
+    assert param_types == {
+        "sale_date_year": "integer",
+        "sale_date_start": "date",
+        "sale_date_end": "date",
+        "category_name": "string",
+        "product_name": "string",
+        "min_total_amount": "decimal",
+    }
+    assert "YEAR(s.sale_date) = {sale_date_year}" in sql
+    assert "BETWEEN '{sale_date_start}' AND '{sale_date_end}'" in sql
+    assert "LIKE '%{product_name}%'" in sql
+    assert "s.product_id = p.product_id" in sql
+    assert "LIMIT" not in sql
+
+
+def test_parameterize_keeps_function_arguments_and_user_limit():
+    sql, param_types = parameterize_sql(
+        "SELECT ROUND(AVG(price), 2) AS avg_price, DATE_FORMAT(created_at, '%Y-%m') AS m "
+        "FROM product WHERE price < 99.5 AND created_at < '2025-01-01' "
+        "AND created_at >= DATE_SUB(NOW(), INTERVAL 30 DAY) GROUP BY m LIMIT 10"
+    )
+    assert "ROUND(AVG(price), 2)" in sql
+    assert "DATE_FORMAT(created_at, '%Y-%m')" in sql
+    assert param_types == {
+        "max_price": "decimal",
+        "created_at_before": "date",
+        "interval_day": "integer",
+        "limit": "integer",
+    }
+    assert sql.endswith("LIMIT {limit}")
+
+    compiled = compile_template(sql, tuple(sorted(param_types.items())))
+    bound_sql, params = compiled.bind(
+        {"max_price": "99.5", "created_at_before": "2025-01-01", "interval_day": 7, "limit": 5}
+    )
+    assert bound_sql.endswith("LIMIT 5")
+    assert params["max_price"] == Decimal("99.5")
+
+
+def test_parameterize_without_literals_only_strips_injected_limit():
+    sql, param_types = parameterize_sql(
+        f"SELECT category, SUM(total_amount) AS total FROM sales GROUP BY category LIMIT {Config.QUERY_MAX_ROWS}"
+    )
+    assert sql == "SELECT category, SUM(total_amount) AS total FROM sales GROUP BY category"
+    assert param_types == {}
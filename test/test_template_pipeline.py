@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from app.agent import template_manager
+from app.agent.template_manager import TemplateIngestionPipeline
+from app.database.validation import sql_fingerprint
+
+SQL = "SELECT category, SUM(total_amount) AS total FROM sales WHERE sale_date >= '{start_date}' GROUP BY category"
+
+
+class FakeStore:
+    """按指纹唯一的 sql_templates 与向量索引替身"""
+
+    def __init__(self):
+        self.rows = {}
+        self.vectors = {}
+        self.described = 0
+        self.index_error = None
+
+    async def get_templates_by_fingerprints(self, fingerprints):
+        return [dict(self.rows[fp]) for fp in fingerprints if fp in self.rows]
+
+    async def upsert_templates(self, templates):
+        for template in templates:
+            fingerprint = sql_fingerprint(template["sql_text"])
+            self.rows.setdefault(
+                fingerprint,
+                {"id": len(self.rows) + 1, "fingerprint": fingerprint, **template},
+            )
+        return await self.get_templates_by_fingerprints(
+            [sql_fingerprint(t["sql_text"]) for t in templates]
+        )
+
+    async def upsert_vectors(self, rows, embeddings):
+        if self.index_error is not None:
+            raise self.index_error
+        for row in rows:
+            self.vectors[row["template_id"]] = row["description"]
+
+    async def describe(self, question, sql_text):
+        self.described += 1
+        await asyncio.sleep(0)
+        return f"描述{self.described}"
+
+
+@pytest.fixture
+def store(monkeypatch):
+    fake = FakeStore()
+
+    async def embed(rows):
+        return [[0.0] for _ in rows]
+
+    repository = template_manager.SystemRepository
+    monkeypatch.setattr(repository, "get_templates_by_fingerprints", staticmethod(fake.get_templates_by_fingerprints))
+    monkeypatch.setattr(repository, "upsert_templates", staticmethod(fake.upsert_templates))
+    monkeypatch.setattr(template_manager.template_index, "upsert", fake.upsert_vectors)
+    monkeypatch.setattr(template_manager, "embed_templates", embed)
+    monkeypatch.setattr(template_manager, "generate_template_description", fake.describe)
+    return fake
+
+
+def item(sql=SQL):
+    return {"question": "今年各分类销售额", "sql_text": sql, "param_types": {"start_date": "date"}}
+
+
+def test_concurrent_pipelines_keep_one_template(store):
+    async def scenario():
+        # 两个进程各自的流水线同时提交同一模板（SQL格式不同，规范化后相同）
+        return await asyncio.gather(
+            TemplateIngestionPipeline().ingest([item()]),
+            TemplateIngestionPipeline().ingest([item(SQL.replace(" GROUP BY", "\n  GROUP BY"))]),
+        )
+
+    first, second = asyncio.run(scenario())
+    assert first == second == [1]
+    assert len(store.rows) == 1
+    # 两个向量写入都使用库中保留的描述
+    assert store.vectors == {1: store.rows[sql_fingerprint(SQL)]["description"]}
+
+
+def test_resubmit_indexes_template_left_out_of_the_index(store):
+    store.index_error = RuntimeError("milvus down")
+    with pytest.raises(RuntimeError):
+        asyncio.run(TemplateIngestionPipeline().ingest([item()]))
+    assert len(store.rows) == 1 and store.vectors == {}
+
+    # 进程重启后重新提交：不再生成描述，但补写向量
+    store.index_error = None
+    assert asyncio.run(TemplateIngestionPipeline().ingest([item()])) == [1]
+    assert store.vectors == {1: "描述1"}
+    assert store.described == 1
+
+
+def test_invalid_template_is_skipped(store):
+    bad = {"question": "删除订单", "sql_text": "DELETE FROM sales"}
+    assert asyncio.run(TemplateIngestionPipeline().ingest([bad])) == []
+    assert store.rows == {}
@@ -0,0 +1,24 @@
+from app.common.template_ranker import select_template
+
+
+def candidate(similarity, scenario="auto_generated", required_params=None):
+    return {
+        "template_id": 1,
+        "similarity": similarity,
+        "scenario": scenario,
+        "required_params": required_params or [],
+        "description": "年度销售额统计",
+    }
+
+
+def test_parameterless_auto_generated_template_needs_near_identical_question():
+    assert select_template("2023年销售额", [candidate(0.9)]) is None
+    assert select_template("2024年销售额", [candidate(0.99)]) is not None
+
+
+def test_parameterized_auto_generated_template_uses_default_threshold():
+    assert select_template("2023年销售额", [candidate(0.9, required_params=["sale_date_year"])])
+
+
+def test_curated_template_without_params_uses_default_threshold():
+    assert select_template("各分类销售额", [candidate(0.9, scenario="sales_analysis")])
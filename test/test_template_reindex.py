@@ -0,0 +1,76 @@
+import pytest
+from pymilvus import utility
+
+from app.common import template_reindex
+from app.common.template_reindex import _swap_alias
+
+
+class FakeMilvus:
+    """记录集合与别名操作的 pymilvus.utility 替身"""
+
+    def __init__(self, collections, aliases=None):
+        self.collections = list(collections)
+        self.aliases = dict(aliases or {})
+        self.dropped = []
+
+    def list_collections(self):
+        return list(self.collections)
+
+    def list_aliases(self, name):
+        return [alias for alias, target in self.aliases.items() if target == name]
+
+    def alter_alias(self, name, alias):
+        self.aliases[alias] = name
+
+    def create_alias(self, name, alias):
+        assert alias not in self.collections
+        self.aliases[alias] = name
+
+    def rename_collection(self, old, new):
+        self.collections[self.collections.index(old)] = new
+
+    def drop_collection(self, name):
+        self.collections.remove(name)
+        self.dropped.append(name)
+
+
+@pytest.fixture
+def milvus(monkeypatch):
+    def install(collections, aliases=None):
+        fake = FakeMilvus(collections, aliases)
+        for name in ("list_collections", "list_aliases", "alter_alias", "create_alias",
+                     "rename_collection", "drop_collection"):
+            monkeypatch.setattr(utility, name, getattr(fake, name))
+        monkeypatch.setattr(template_reindex.milvus_client, "invalidate_collection", lambda alias: None)
+        return fake
+
+    return install
+
+
+def test_first_migration_keep_old_renames_existing_collection(milvus):
+    fake = milvus(["sql_templates", "sql_templates_2"])
+    replaced = _swap_alias("sql_templates", "sql_templates_2", keep_old=True)
+
+    assert fake.dropped == []
+    assert replaced == [name for name in fake.collections if name.startswith("sql_templates_legacy_")]
+    assert fake.aliases == {"sql_templates": "sql_templates_2"}
+
+
+def test_first_migration_refuses_to_drop_without_flag(milvus):
+    fake = milvus(["sql_templates", "sql_templates_2"])
+    with pytest.raises(RuntimeError):
+        _swap_alias("sql_templates", "sql_templates_2", keep_old=False)
+    assert fake.dropped == [] and fake.aliases == {}
+
+    _swap_alias("sql_templates", "sql_templates_2", keep_old=False, drop_existing=True)
+    assert fake.dropped == ["sql_templates"]
+    assert fake.aliases == {"sql_templates": "sql_templates_2"}
+
+
+def test_alias_swap_drops_replaced_collection_unless_kept(milvus):
+    fake = milvus(["sql_templates_1", "sql_templates_2"], {"sql_templates": "sql_templates_1"})
+    assert _swap_alias("sql_templates", "sql_templates_2", keep_old=True) == ["sql_templates_1"]
+    assert fake.dropped == []
+
+    _swap_alias("sql_templates", "sql_templates_1", keep_old=False)
+    assert fake.dropped == ["sql_templates_2"]
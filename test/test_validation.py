@@ -0,0 +1,119 @@
+import pytest
+
+from app.database.validation import (
+    add_execution_time_hint,
+    check_sql_query,
+    enforce_row_limit,
+    extract_tables,
+    has_order_by,
+    paginate_sql,
+    split_limit,
+)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "DELETE FROM orders",
+        "SELECT * FROM orders; DROP TABLE orders",
+        "SELECT * FROM orders INTO OUTFILE '/tmp/x'",
+        "UPDATE orders SET status = 1",
+        "",
+    ],
+)
+def test_check_rejects_unsafe_sql(sql):
+    with pytest.raises(ValueError):
+        check_sql_query(sql)
+
+
+def test_check_accepts_select_with_keyword_like_columns():
+    sql = "SELECT updated_at, created_by FROM orders WHERE status = 'delete'"
+    assert check_sql_query(sql)
+    # 第二次命中缓存的结论
+    assert check_sql_query(sql) == check_sql_query(sql)
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("SELECT * FROM t", ("SELECT * FROM t", 0, None)),
+        ("SELECT * FROM t LIMIT 10;", ("SELECT * FROM t", 0, 10)),
+        ("SELECT * FROM t LIMIT 20, 10", ("SELECT * FROM t", 20, 10)),
+        ("SELECT * FROM t LIMIT 10 OFFSET 20", ("SELECT * FROM t", 20, 10)),
+        (
+            "SELECT * FROM (SELECT * FROM t LIMIT 5) s",
+            ("SELECT * FROM (SELECT * FROM t LIMIT 5) s", 0, None),
+        ),
+    ],
+)
+def test_split_limit(sql, expected):
+    assert split_limit(sql) == expected
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("SELECT * FROM t", "SELECT * FROM t LIMIT 100"),
+        ("SELECT * FROM t LIMIT 500", "SELECT * FROM t LIMIT 100"),
+        ("SELECT * FROM t LIMIT 10", "SELECT * FROM t LIMIT 10"),
+        ("SELECT * FROM t LIMIT 40, 500", "SELECT * FROM t LIMIT 40, 100"),
+        ("SELECT * FROM t LIMIT 500 OFFSET 40;", "SELECT * FROM t LIMIT 40, 100"),
+        (
+            "SELECT * FROM (SELECT * FROM t LIMIT 500) s ORDER BY id",
+            "SELECT * FROM (SELECT * FROM t LIMIT 500) s ORDER BY id LIMIT 100",
+        ),
+    ],
+)
+def test_enforce_row_limit(sql, expected):
+    assert enforce_row_limit(sql, 100) == expected
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("SELECT * FROM t ORDER BY id LIMIT 25", True),
+        ("select * from t order  by id;", True),
+        ("SELECT * FROM (SELECT * FROM t ORDER BY id) s", False),
+        ("SELECT category, SUM(amount) FROM t GROUP BY category", False),
+    ],
+)
+def test_has_order_by_only_counts_outer_query(sql, expected):
+    assert has_order_by(sql) is expected
+
+
+@pytest.mark.parametrize(
+    "sql, offset, limit, expected",
+    [
+        ("SELECT * FROM t ORDER BY id LIMIT 25", 20, 10, "SELECT * FROM t ORDER BY id LIMIT 20, 5"),
+        ("SELECT * FROM t ORDER BY id", 10, 10, "SELECT * FROM t ORDER BY id LIMIT 10, 10"),
+        ("SELECT * FROM t ORDER BY id LIMIT 100, 50", 20, 10, "SELECT * FROM t ORDER BY id LIMIT 120, 10"),
+        ("SELECT * FROM t ORDER BY id LIMIT 25", 30, 10, "SELECT * FROM t ORDER BY id LIMIT 30, 0"),
+    ],
+)
+def test_paginate_stays_inside_original_window(sql, offset, limit, expected):
+    assert paginate_sql(sql, offset, limit) == expected
+
+
+def test_paginate_rejects_unordered_sql():
+    with pytest.raises(ValueError):
+        paginate_sql("SELECT * FROM t LIMIT 25", 20, 10)
+    with pytest.raises(ValueError):
+        paginate_sql("SELECT * FROM (SELECT * FROM t ORDER BY id) s", 0, 10)
+
+
+def test_execution_time_hint_targets_outer_select_once():
+    sql = "SELECT a FROM t WHERE id IN (SELECT id FROM u)"
+    hinted = add_execution_time_hint(sql, 3000)
+    assert hinted == "SELECT /*+ MAX_EXECUTION_TIME(3000) */ a FROM t WHERE id IN (SELECT id FROM u)"
+    assert add_execution_time_hint(hinted, 3000) == hinted
+    assert add_execution_time_hint(sql, 0) == sql
+    # 结果被缓存，重复调用不重新解析
+    assert add_execution_time_hint(sql, 3000) is hinted
+
+
+def test_extract_tables_includes_joins_and_subqueries():
+    sql = (
+        "SELECT c.name, SUM(o.amount) FROM orders o JOIN customer c ON o.cid = c.id "
+        "WHERE o.pid IN (SELECT id FROM product) GROUP BY c.name"
+    )
+    assert extract_tables(sql) == {"orders", "customer", "product"}
@@ -0,0 +1,53 @@
+from app.common.chart_reducer import reduce_chart_data
+from app.common.column_profiler import profile_columns
+from app.common.visualization import generate_chart_config, suggest_visualization_type
+from app.database.result_set import ResultSet
+
+
+def customer_result(count=30):
+    # customer_id 与 order_count 反向，按 id 排名会选出完全不同的客户
+    return ResultSet.from_records(
+        [
+            {"customer_id": 1000 + i, "username": f"u{i:02d}", "order_count": count - i}
+            for i in range(count)
+        ]
+    )
+
+
+def test_profile_marks_key_columns():
+    data = ResultSet.from_records(
+        [{"id": 1, "customerId": 7, "订单编号": "A1", "total_amount": 9.5, "paid": 1}]
+    )
+    keys = {p["name"]: p["is_key"] for p in profile_columns(data)}
+    assert keys == {"id": True, "customerId": True, "订单编号": True, "total_amount": False, "paid": False}
+
+
+def test_chart_config_ignores_id_measures():
+    data = customer_result()
+    profile = profile_columns(data)
+    viz_type = suggest_visualization_type(data, profile)
+    config = generate_chart_config(viz_type, data, profile)
+    assert viz_type == "bar"
+    assert config["xField"] == "username"
+    assert config["yField"] == "order_count"
+    assert "yFields" not in config
+
+
+def test_top_n_does_not_rank_by_id():
+    data = customer_result()
+    profile = profile_columns(data)
+    config = generate_chart_config("bar", data, profile)
+    sql = "SELECT customer_id, username, COUNT(*) AS order_count FROM orders GROUP BY customer_id, username"
+
+    reduced, reduction = reduce_chart_data(data, "bar", config, profile, top_n=5, sql=sql)
+    assert reduction["method"] == "top_n"
+    assert reduced.columns == ["username", "order_count"]
+    assert reduced.column("username").raw_list()[:4] == ["u00", "u01", "u02", "u03"]
+
+
+def test_key_column_is_fallback_dimension():
+    data = ResultSet.from_records([{"product_id": i, "quantity": i * 2} for i in range(5)])
+    profile = profile_columns(data)
+    config = generate_chart_config(suggest_visualization_type(data, profile), data, profile)
+    assert config["xField"] == "product_id"
+    assert config["yField"] == "quantity"